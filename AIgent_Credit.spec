@@ -37,8 +37,9 @@ a = Analysis(
         'tkinter.filedialog',
         'merged_credit_report',
         'pdf_utils',
-        'Detailed_Credit_Report_Extractor',
-        'Non_Bank_Lender_Credit_Information',
+        'banking_extractor',
+        'nlci_extractor',
+        'section_cache',
         'load_file_version',
     ] + hiddenimports_pdfplumber,
     hookspath=[],
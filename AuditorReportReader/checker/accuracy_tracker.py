@@ -15,6 +15,12 @@ Commands:
   compare  <before> <after> --changes-only   Show only changed fields
   list                             List all snapshots
   history                          Accuracy trend across all snapshots
+  history --field <label>          One field's match rate across snapshots
+  history --company <name>         One company's score across snapshots
+
+Snapshots are JSON files in training/snapshots/; the commands read them
+through training/metrics.db (see metrics_store.py), an SQLite index that is
+refreshed from the folder on every run.
 """
 
 from __future__ import annotations
@@ -25,11 +31,14 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+from metrics_store import MetricsStore
+
 _HERE     = Path(__file__).parent.resolve()   # checker/
 _ROOT     = _HERE.parent                       # AuditorReportReader/
 _SCORES   = _ROOT / "training" / "scores.json"
 _RUNS_DIR = _ROOT / "training" / "runs"
 _SNAP_DIR = _ROOT / "training" / "snapshots"
+_DB       = _ROOT / "training" / "metrics.db"
 
 # Column widths
 _W_CO     = 28
@@ -88,6 +97,8 @@ def cmd_snapshot(label: str) -> None:
     safe = label.replace(" ", "-").replace("/", "-")
     dest = _SNAP_DIR / f"{safe}_{ts}.json"
     dest.write_text(json.dumps(snap, indent=2))
+    with _open_store():
+        pass                                # indexes the new file
     print(f"[snapshot] Saved : {dest.name}")
     print(f"           Score : {snap['overall_score']}%")
     print(f"           Scope : {len(snap['companies'])} companies  |  "
@@ -98,28 +109,23 @@ def cmd_snapshot(label: str) -> None:
 # Load snapshot by partial label
 # ---------------------------------------------------------------------------
 
-def _find_snapshot(label: str) -> Path:
-    if not _SNAP_DIR.exists() or not any(_SNAP_DIR.glob("*.json")):
+def _open_store() -> MetricsStore:
+    return MetricsStore(_DB, _SNAP_DIR)
+
+
+def _find_snapshot(store: MetricsStore, label: str):
+    if not store.snapshots():
         raise FileNotFoundError(
             "No snapshots found.\n"
             "Run: python checker/accuracy_tracker.py snapshot <label>"
         )
-    files = sorted(_SNAP_DIR.glob("*.json"), reverse=True)
-    low = label.lower()
-    for f in files:
-        if f.stem.lower().startswith(low + "_"):
-            return f
-    for f in files:
-        if low in f.stem.lower():
-            return f
-    raise FileNotFoundError(
-        f"No snapshot matching '{label}'.\n"
-        "Run: python checker/accuracy_tracker.py list"
-    )
-
-
-def _load_snapshot(label: str) -> dict:
-    return json.loads(_find_snapshot(label).read_text())
+    snap = store.find(label)
+    if snap is None:
+        raise FileNotFoundError(
+            f"No snapshot matching '{label}'.\n"
+            "Run: python checker/accuracy_tracker.py list"
+        )
+    return snap
 
 
 # ---------------------------------------------------------------------------
@@ -147,26 +153,6 @@ def _fmt_val(v) -> str:
     return str(v)
 
 
-def _field_key(f: dict) -> str:
-    return f"{f['year']}:{f['label']}"
-
-
-def _aggregate_fields(companies: dict) -> dict:
-    """Roll up per-field accuracy across all companies."""
-    agg: dict[str, dict] = {}
-    for info in companies.values():
-        for f in info.get("fields", []):
-            k = f["label"]
-            if k not in agg:
-                agg[k] = {"match": 0, "missing": 0, "wrong": 0, "total": 0}
-            agg[k]["total"] += 1
-            s = f.get("status", "")
-            if s == "MATCH":        agg[k]["match"]   += 1
-            elif s == "MISSING":    agg[k]["missing"]  += 1
-            elif s == "WRONG_VALUE":agg[k]["wrong"]    += 1
-    return agg
-
-
 def _field_score(e: dict) -> float:
     return round(100.0 * e["match"] / e["total"], 1) if e["total"] else 0.0
 
@@ -176,11 +162,14 @@ def _field_score(e: dict) -> float:
 # ---------------------------------------------------------------------------
 
 def cmd_compare(lbl_b: str, lbl_a: str, changes_only: bool = False) -> None:
-    snap_b = _load_snapshot(lbl_b)
-    snap_a = _load_snapshot(lbl_a)
+    with _open_store() as store:
+        _compare(store, _find_snapshot(store, lbl_b), _find_snapshot(store, lbl_a),
+                 changes_only)
+
 
+def _compare(store: MetricsStore, snap_b, snap_a, changes_only: bool) -> None:
     ts_b, ts_a = snap_b["timestamp"][:10], snap_a["timestamp"][:10]
-    n_b,  n_a  = len(snap_b["companies"]), len(snap_a["companies"])
+    n_b,  n_a  = snap_b["n_companies"],   snap_a["n_companies"]
     ob,   oa   = snap_b["overall_score"],  snap_a["overall_score"]
 
     # ── Section 1: Overall ───────────────────────────────────────────────────
@@ -200,10 +189,11 @@ def cmd_compare(lbl_b: str, lbl_a: str, changes_only: bool = False) -> None:
     print("─" * 66)
     print(f"  {'Company':<{_W_CO}}  {'Before':>{_W_PCT}}  {'After':>{_W_PCT}}   Δ")
 
-    all_cos = sorted(set(snap_b["companies"]) | set(snap_a["companies"]))
-    for co in all_cos:
-        bi = snap_b["companies"].get(co)
-        ai = snap_a["companies"].get(co)
+    cos_b = store.company_scores(snap_b["id"])
+    cos_a = store.company_scores(snap_a["id"])
+    for co in sorted(set(cos_b) | set(cos_a)):
+        bi = cos_b.get(co)
+        ai = cos_a.get(co)
         pb = bi["score_pct"] if bi else None
         pa = ai["score_pct"] if ai else None
         if pb is None:
@@ -220,8 +210,8 @@ def cmd_compare(lbl_b: str, lbl_a: str, changes_only: bool = False) -> None:
     print("─" * 66)
     print(f"  {'Field':<{_W_FL}}  {'Before':>{_W_PCT}}  {'After':>{_W_PCT}}   Δ")
 
-    agg_b = _aggregate_fields(snap_b["companies"])
-    agg_a = _aggregate_fields(snap_a["companies"])
+    agg_b = store.field_rollup(snap_b["id"])
+    agg_a = store.field_rollup(snap_a["id"])
     rows  = []
     for fl in sorted(set(agg_b) | set(agg_a)):
         sb = _field_score(agg_b[fl]) if fl in agg_b else None
@@ -250,68 +240,51 @@ def cmd_compare(lbl_b: str, lbl_a: str, changes_only: bool = False) -> None:
     fixes       : list[dict] = []
     regressions : list[dict] = []
 
-    for co in all_cos:
-        b_info   = snap_b["companies"].get(co, {})
-        a_info   = snap_a["companies"].get(co, {})
-        b_fields = {_field_key(f): f for f in b_info.get("fields", [])}
-        a_fields = {_field_key(f): f for f in a_info.get("fields", [])}
-
-        # Preserve original field order; append any new fields at the end
-        ordered_keys: list[str] = []
-        seen: set[str] = set()
-        for k in list(b_fields) + list(a_fields):
-            if k not in seen:
-                ordered_keys.append(k)
-                seen.add(k)
-
-        printed_header = False
-        for key in ordered_keys:
-            bf  = b_fields.get(key)
-            af  = a_fields.get(key)
-            bs  = bf["status"] if bf else "—"
-            as_ = af["status"] if af else "—"
-            changed = bs != as_
-
-            if changes_only and not changed:
-                continue
-
-            if not printed_header:
-                print()
-                bar = "─" * max(0, 58 - len(co))
-                print(f"  ── {co} {bar}")
-                print(f"  {'Year':<6}  {'Field':<{_W_FL}}  {'Before':<{_W_STATUS}}  {'After':<{_W_STATUS}}")
-                printed_header = True
-
-            src    = bf if bf else af
-            year   = src.get("year", "")
-            label  = src.get("label", key)
-            arrow  = ("↑ FIXED " if (changed and as_ == "MATCH") else
-                      "↓ BROKEN" if (changed and bs  == "MATCH") else
-                      "~ SHIFT " if  changed                     else
-                      "=")
-            print(f"  {year:<6}  {label:<{_W_FL}}  {bs:<{_W_STATUS}}  {as_:<{_W_STATUS}}  {arrow}")
-
-            # Show actual values when status changed
-            if changed and bf and af:
-                bv = _fmt_val(bf.get("filled"))
-                av = _fmt_val(af.get("filled"))
-                cv = _fmt_val(af.get("correct"))
-                if bv != av:
-                    print(f"  {'':6}  {'':>{_W_FL}}  filled: {bv}  →  {av}  (correct: {cv})")
-
-            # Collect for Section 5
-            if changed:
-                entry = {
-                    "company": co, "year": year, "label": label,
-                    "before": bs,  "after": as_,
-                    "filled_before": _fmt_val(bf.get("filled")) if bf else "—",
-                    "filled_after":  _fmt_val(af.get("filled")) if af else "—",
-                    "correct":       _fmt_val(af.get("correct")) if af else "—",
-                }
-                if as_ == "MATCH":
-                    fixes.append(entry)
-                elif bs == "MATCH":
-                    regressions.append(entry)
+    last_co = None
+    for pair in store.field_pairs(snap_b["id"], snap_a["id"], changes_only):
+        co  = pair["company"]
+        bf  = pair["before"]
+        af  = pair["after"]
+        bs  = bf["status"] if bf else "—"
+        as_ = af["status"] if af else "—"
+        changed = bs != as_
+
+        if co != last_co:
+            print()
+            bar = "─" * max(0, 58 - len(co))
+            print(f"  ── {co} {bar}")
+            print(f"  {'Year':<6}  {'Field':<{_W_FL}}  {'Before':<{_W_STATUS}}  {'After':<{_W_STATUS}}")
+            last_co = co
+
+        year   = pair["year"]
+        label  = pair["label"]
+        arrow  = ("↑ FIXED " if (changed and as_ == "MATCH") else
+                  "↓ BROKEN" if (changed and bs  == "MATCH") else
+                  "~ SHIFT " if  changed                     else
+                  "=")
+        print(f"  {year:<6}  {label:<{_W_FL}}  {bs:<{_W_STATUS}}  {as_:<{_W_STATUS}}  {arrow}")
+
+        # Show actual values when status changed
+        if changed and bf and af:
+            bv = _fmt_val(bf.get("filled"))
+            av = _fmt_val(af.get("filled"))
+            cv = _fmt_val(af.get("correct"))
+            if bv != av:
+                print(f"  {'':6}  {'':>{_W_FL}}  filled: {bv}  →  {av}  (correct: {cv})")
+
+        # Collect for Section 5
+        if changed:
+            entry = {
+                "company": co, "year": year, "label": label,
+                "before": bs,  "after": as_,
+                "filled_before": _fmt_val(bf.get("filled")) if bf else "—",
+                "filled_after":  _fmt_val(af.get("filled")) if af else "—",
+                "correct":       _fmt_val(af.get("correct")) if af else "—",
+            }
+            if as_ == "MATCH":
+                fixes.append(entry)
+            elif bs == "MATCH":
+                regressions.append(entry)
 
     # ── Section 5: Change summary ─────────────────────────────────────────────
     print()
@@ -343,7 +316,7 @@ def cmd_compare(lbl_b: str, lbl_a: str, changes_only: bool = False) -> None:
         print("\n  ↓ Broken: none  ✓")
 
     # Count unchanged fields (from before snapshot)
-    total_b = sum(len(snap_b["companies"].get(co, {}).get("fields", [])) for co in all_cos)
+    total_b = store.field_count(snap_b["id"])
     unchanged = max(0, total_b - len(fixes) - len(regressions))
     print(f"\n  =  Unchanged: {unchanged} fields")
     print()
@@ -359,18 +332,19 @@ def cmd_list() -> None:
         print("Run: python checker/accuracy_tracker.py snapshot <label>")
         return
 
-    files = sorted(_SNAP_DIR.glob("*.json"))
+    with _open_store() as store:
+        snaps = store.snapshots()
     print(f"\n  {'Label':<36}  {'Date':<12}  {'Overall':>8}  {'Companies':>10}  Matched")
     print("  " + "─" * 72)
-    for f in files:
-        try:
-            s = json.loads(f.read_text())
-            print(f"  {s.get('label','?'):<36}  "
-                  f"{s.get('timestamp','')[:10]:<12}  "
-                  f"{s.get('overall_score',0):>7.1f}%  "
-                  f"{len(s.get('companies',{})):>10}  "
-                  f"{s.get('total_matched',0)}/{s.get('total_fields',0)}")
-        except Exception:
+    for s in snaps:
+        print(f"  {s['label']:<36}  "
+              f"{s['timestamp'][:10]:<12}  "
+              f"{s['overall_score']:>7.1f}%  "
+              f"{s['n_companies']:>10}  "
+              f"{s['total_matched']}/{s['total_fields']}")
+    indexed = {s["file"] for s in snaps}
+    for f in sorted(_SNAP_DIR.glob("*.json")):
+        if f.name not in indexed:
             print(f"  {f.name}  (unreadable)")
     print()
 
@@ -379,35 +353,75 @@ def cmd_list() -> None:
 # History
 # ---------------------------------------------------------------------------
 
-def cmd_history() -> None:
+def _trend_flag(d: float) -> str:
+    if d > 0.05:
+        return f"  ↑ +{d:.1f}%"
+    if d < -0.05:
+        return f"  ↓ {d:.1f}%  ← regression"
+    return ""
+
+
+def _resolve(name: str, known: list[str], what: str) -> str:
+    """Exact (case-insensitive) match, else the only partial match."""
+    low = name.lower()
+    exact = [k for k in known if k.lower() == low]
+    if exact:
+        return exact[0]
+    partial = sorted(k for k in known if low in k.lower())
+    if len(partial) == 1:
+        return partial[0]
+    if partial:
+        raise ValueError(f"'{name}' matches several {what}s: {', '.join(partial)}")
+    raise ValueError(f"No {what} matching '{name}' in any snapshot")
+
+
+def cmd_history(field: str = "", company: str = "") -> None:
     if not _SNAP_DIR.exists() or not any(_SNAP_DIR.glob("*.json")):
         print("No snapshots saved yet.")
         return
 
-    snaps = []
-    for f in _SNAP_DIR.glob("*.json"):
-        try:
-            snaps.append(json.loads(f.read_text()))
-        except Exception:
-            pass
-    snaps.sort(key=lambda s: s.get("timestamp", ""))
+    with _open_store() as store:
+        if field:
+            label = _resolve(field, store.field_labels(), "field")
+            print(f"\n  Field: {label}")
+            print(f"\n  {'Snapshot':<36}  {'Date':<12}  {'Match':>8}  {'Fields':>10}")
+            print("  " + "─" * 66)
+            prev = None
+            for r in store.field_trend(label):
+                score = _field_score(r)
+                flag  = _trend_flag(score - prev) if prev is not None and r["total"] else ""
+                print(f"  {r['snapshot']:<36}  {r['timestamp'][:10]:<12}  "
+                      f"{score:>7.1f}%  {r['match']:>4}/{r['total']:<5}{flag}")
+                if r["total"]:
+                    prev = score
+            print()
+            return
+
+        if company:
+            name = _resolve(company, store.companies(), "company")
+            print(f"\n  Company: {name}")
+            print(f"\n  {'Snapshot':<36}  {'Date':<12}  {'Score':>8}  {'Matched':>10}")
+            print("  " + "─" * 66)
+            prev = None
+            for r in store.company_history(name):
+                score = r["score_pct"]
+                flag  = _trend_flag(score - prev) if prev is not None else ""
+                print(f"  {r['snapshot']:<36}  {r['timestamp'][:10]:<12}  "
+                      f"{score:>7.1f}%  {r['matched']:>4}/{r['total']:<5}{flag}")
+                prev = score
+            print()
+            return
+
+        snaps = store.snapshots(order="timestamp")
 
     print(f"\n  {'Snapshot':<36}  {'Date':<12}  {'Overall':>8}  {'Companies':>10}")
     print("  " + "─" * 66)
     prev = None
     for s in snaps:
-        label = s.get("label", "?")
-        ts    = s.get("timestamp", "")[:10]
-        score = s.get("overall_score", 0)
-        n_co  = len(s.get("companies", {}))
-        flag  = ""
-        if prev is not None:
-            d = score - prev
-            if d > 0.05:
-                flag = f"  ↑ +{d:.1f}%"
-            elif d < -0.05:
-                flag = f"  ↓ {d:.1f}%  ← regression"
-        print(f"  {label:<36}  {ts:<12}  {score:>7.1f}%  {n_co:>10}{flag}")
+        score = s["overall_score"]
+        flag  = _trend_flag(score - prev) if prev is not None else ""
+        print(f"  {s['label']:<36}  {s['timestamp'][:10]:<12}  {score:>7.1f}%  "
+              f"{s['n_companies']:>10}{flag}")
         prev = score
     print()
 
@@ -428,6 +442,8 @@ Examples:
   python checker/accuracy_tracker.py compare  "baseline" "after-trade-rec-fix" --changes-only
   python checker/accuracy_tracker.py list
   python checker/accuracy_tracker.py history
+  python checker/accuracy_tracker.py history --field "Trade Receivables"
+  python checker/accuracy_tracker.py history --company Mandrill
         """,
     )
     sub = parser.add_subparsers(dest="cmd", required=True)
@@ -442,7 +458,11 @@ Examples:
                        help="Show only fields that changed status in Section 4")
 
     sub.add_parser("list",    help="List all saved snapshots")
-    sub.add_parser("history", help="Show accuracy trend across all snapshots")
+    p_hist = sub.add_parser("history", help="Show accuracy trend across all snapshots")
+    p_hist.add_argument("--field",   default="",
+                        help="Trend of one field's match rate (label, partial match)")
+    p_hist.add_argument("--company", default="",
+                        help="Score history of one company (partial match)")
 
     args = parser.parse_args()
 
@@ -454,7 +474,11 @@ Examples:
     elif args.cmd == "list":
         cmd_list()
     elif args.cmd == "history":
-        cmd_history()
+        try:
+            cmd_history(field=args.field, company=args.company)
+        except ValueError as exc:
+            print(f"[ERROR] {exc}")
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+"""
+batch_manifest.py — Append-only JSONL checkpoint for long batch runs.
+
+Used by training_manager `run`, sharepoint_pipeline and
+downloader/sp_to_training so an interrupted batch can pick up where it
+stopped (`--resume`) instead of starting over.
+
+One line per state change of one unit of work (a case or a company):
+
+  {"unit": "Greatocean", "status": "started", "inputs": {...}, "ts": "...", ...}
+  {"unit": "Greatocean", "status": "filled",  "filled_path": "...", ...}
+  {"unit": "Greatocean", "status": "done",    "result": {...}, ...}
+
+Each line carries the unit's full merged state, so the last line per unit is
+all a resume needs.  status is "started", a stage name, "done" or "failed";
+on resume only "done" units whose inputs are unchanged are skipped — failed
+and in-flight ones run again, reusing the outputs recorded so far.
+
+The manifest always accumulates across runs (a single-case run does not
+forget the rest of the batch); callers consult it only under --resume.
+Lines are flushed and fsync'd as they are written; a torn final line from a
+crash is ignored on load, and the file is compacted to one line per unit
+whenever it is opened.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+def file_hash(path) -> str:
+    """MD5 of a file's bytes (same digest as json_cache.pdf_hash)."""
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BatchManifest:
+    """Checkpoint log for one batch.  Safe to call from several threads."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._state: dict[str, dict] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        lines = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue    # torn write from a crash
+                if isinstance(rec, dict) and "unit" in rec:
+                    self._state[rec["unit"]] = rec
+        if lines > len(self._state):
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text("".join(json.dumps(r, default=str) + "\n"
+                                   for r in self._state.values()), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def _append(self, unit: str, status: str, fields: dict) -> dict:
+        with self._lock:
+            rec = {**self._state.get(unit, {}), **fields,
+                   "unit": unit, "status": status,
+                   "ts": datetime.now().isoformat(timespec="seconds")}
+            if status != "failed":
+                rec.pop("error", None)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._state[unit] = rec
+            return rec
+
+    # ── queries ───────────────────────────────────────────────────────────────
+
+    def last(self, unit: str) -> Optional[dict]:
+        """Latest recorded state of unit, or None."""
+        return self._state.get(unit)
+
+    def completed(self, unit: str, inputs: dict) -> Optional[dict]:
+        """The unit's record if it finished with these same inputs, else None."""
+        rec = self._state.get(unit)
+        if rec and rec.get("status") == "done" and rec.get("inputs") == inputs:
+            return rec
+        return None
+
+    def resumable(self, unit: str, inputs: dict) -> Optional[dict]:
+        """The record of an unfinished unit with these inputs (outputs to reuse)."""
+        rec = self._state.get(unit)
+        if rec and rec.get("status") != "done" and rec.get("inputs") == inputs:
+            return rec
+        return None
+
+    # ── transitions ───────────────────────────────────────────────────────────
+
+    def start(self, unit: str, inputs: dict, **outputs) -> dict:
+        """Unit picked up: a fresh record, carrying only the outputs passed here
+        (e.g. a run directory reused from the interrupted attempt)."""
+        with self._lock:
+            self._state.pop(unit, None)
+        return self._append(unit, "started", {"inputs": inputs, **outputs})
+
+    def stage(self, unit: str, stage: str, **outputs) -> dict:
+        """A stage of unit finished; outputs (paths, ...) are merged into its record."""
+        return self._append(unit, stage, outputs)
+
+    def done(self, unit: str, **outputs) -> dict:
+        return self._append(unit, "done", outputs)
+
+    def fail(self, unit: str, error) -> dict:
+        return self._append(unit, "failed", {"error": str(error)})
+
+    def counts(self) -> dict:
+        """{status: number of units} over the latest state of every unit."""
+        out: dict[str, int] = {}
+        for rec in self._state.values():
+            out[rec["status"]] = out.get(rec["status"], 0) + 1
+        return out
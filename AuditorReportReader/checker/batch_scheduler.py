@@ -0,0 +1,109 @@
+"""
+batch_scheduler.py — Order batch cases by estimated cost before dispatch.
+
+Used by training_manager `run` (order_cases) and sharepoint_pipeline's OCR
+queue (dispatch_key).  Cost per PDF is estimated from:
+  - page count                     (pdfplumber, no rendering)
+  - whether OCR is needed          (text layer usable on a sample of pages)
+  - OCR page-cache hits            (.ocr_cache/pages/<md5>/ at the run dpi)
+  - LLM cache hits                 (.llm_cache/<md5>/ has entries)
+
+Order: fully cached cases first, cheapest first, so their results appear
+straight away; then everything else longest-first (LPT), so a 120-page
+scan starts at the beginning of the batch instead of stretching the end.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Callable, Iterable
+
+# Rough seconds per unit, single core — only the ratios matter for ordering.
+OCR_PAGE_S        = 3.0     # render + preprocess + Tesseract at 300 dpi
+TEXT_PAGE_S       = 0.01    # pdfplumber text layer
+LLM_UNCACHED_S    = 10.0    # four concurrent Gemini calls
+FILL_AND_DIFF_S   = 1.0
+
+_SAMPLE_PAGES = 3
+
+
+def pdf_profile(pdf_path: str, dpi: int = 300, pdf_hash: str | None = None) -> dict:
+    """Cheap facts about one PDF: pages, needs_ocr, ocr_cached_pages, llm_cached.
+    pdf_hash: the PDF's md5 when the caller already has it (skips re-hashing)."""
+    import pdfplumber
+    from utils import json_cache
+    from pipeline import pdf_ocr
+
+    profile = {"pages": 0, "needs_ocr": True, "ocr_cached_pages": 0, "llm_cached": False}
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            profile["pages"] = len(pdf.pages)
+            sample = [(p.extract_text() or "") for p in pdf.pages[:_SAMPLE_PAGES]]
+        profile["needs_ocr"] = not any(pdf_ocr.text_layer_usable(t) for t in sample)
+    except Exception:
+        return profile      # unreadable here; let the real run report it
+
+    file_hash = pdf_hash or json_cache.pdf_hash(pdf_path)
+    profile["llm_cached"] = json_cache.has_entries(file_hash)
+    if profile["needs_ocr"]:
+        cached = pdf_ocr.cached_pages(pdf_path, dpi, pdf_hash=file_hash)
+        profile["ocr_cached_pages"] = sum(1 for n in cached if n <= profile["pages"])
+    return profile
+
+
+def estimate_cost(profile: dict) -> float:
+    """Estimated single-worker seconds for one case."""
+    pages = profile.get("pages", 0)
+    if profile.get("needs_ocr", True):
+        uncached = max(0, pages - profile.get("ocr_cached_pages", 0))
+        cost = uncached * OCR_PAGE_S + (pages - uncached) * TEXT_PAGE_S
+    else:
+        cost = pages * TEXT_PAGE_S
+    if not profile.get("llm_cached"):
+        cost += LLM_UNCACHED_S
+    return cost + FILL_AND_DIFF_S
+
+
+def is_cached(profile: dict) -> bool:
+    """Nothing left to OCR and every LLM call likely served from cache."""
+    ocr_done = (not profile.get("needs_ocr", True)
+                or profile.get("ocr_cached_pages", 0) >= profile.get("pages", 0) > 0)
+    return ocr_done and bool(profile.get("llm_cached"))
+
+
+def dispatch_key(pdf_path: str, dpi: int = 300, pdf_hash: str | None = None) -> tuple:
+    """
+    Sort key for one case, lowest first: cached cases (cheapest first), then
+    the rest longest-first.  For priority queues that see cases one by one.
+    """
+    profile = pdf_profile(str(pdf_path), dpi, pdf_hash)
+    cost = estimate_cost(profile)
+    return (0, cost) if is_cached(profile) else (1, -cost)
+
+
+def order_cases(items: Iterable, pdf_of: Callable[[object], str],
+                dpi: int = 300, verbose: bool = True,
+                hash_of: Callable[[object], str] | None = None) -> list:
+    """
+    Return items in dispatch order: cached cases (cheapest first), then the
+    rest longest-first.  pdf_of(item) gives the item's PDF path, hash_of(item)
+    its md5 if already known; the plan is printed when verbose, labelled by
+    the PDF's folder (case / company name).
+    """
+    scored = []
+    for i, item in enumerate(items):
+        profile = pdf_profile(str(pdf_of(item)), dpi, hash_of(item) if hash_of else None)
+        scored.append((is_cached(profile), estimate_cost(profile), i, item, profile))
+
+    cached = sorted((s for s in scored if s[0]), key=lambda s: (s[1], s[2]))
+    fresh = sorted((s for s in scored if not s[0]), key=lambda s: (-s[1], s[2]))
+    ordered = cached + fresh
+
+    if verbose and ordered:
+        print(f"\n  [Schedule] {len(cached)} cached, {len(fresh)} to process (longest first)")
+        for is_c, cost, _, item, profile in ordered:
+            kind = "ocr" if profile["needs_ocr"] else "text"
+            tag = "cached" if is_c else f"~{cost:.0f}s"
+            label = os.path.basename(os.path.dirname(str(pdf_of(item))))
+            print(f"    {label:<32} {profile['pages']:>4} p  {kind:<4}  {tag}")
+    return [s[3] for s in ordered]
@@ -10,16 +10,27 @@ Outputs a structured diff with accuracy score and mismatch categories:
   WRONG_VALUE  — genuinely different number
   TYPE_MISMATCH— one is text, other is numeric
 
+Both workbooks are read with openpyxl's read-only streaming reader and only
+column B plus the year columns are pulled out.  The parsed reference side
+({year: {label: value}}) is cached under ANSWER_CACHE_DIR (default
+AuditorReportReader/.answer_cache), keyed by the workbook's file hash, so
+re-diffing a corpus against unchanged correct.xlsx / CAWF files skips
+parsing them altogether.
+
 Usage (standalone):
   python diff_checker.py <filled.xlsx> <correct.xlsx> [case_name]
 """
 
+import hashlib
+import json
+import os
 import re
 import sys
 from typing import Dict, List, Optional, Tuple
 
 import openpyxl
-from openpyxl.utils import get_column_letter
+
+from batch_manifest import file_hash
 
 _MAIN_SHEET = "Summary of Information"
 
@@ -194,21 +205,10 @@ def _classify(f_val, c_val) -> str:
     return "WRONG_VALUE"
 
 
-def _build_label_map(ws) -> Dict[str, List[int]]:
-    m: Dict[str, List[int]] = {}
-    for row in ws.iter_rows(min_col=2, max_col=2):
-        cell = row[0]
-        if cell.value and str(cell.value).strip():
-            key = _norm_label(str(cell.value))
-            m.setdefault(key, []).append(cell.row)
-    return m
-
-
-def _find_year_cols(ws) -> Dict[str, int]:
-    """Return {year_str: col_index} by scanning row 4 for year patterns."""
+def _find_year_cols(header_row: tuple) -> Dict[str, int]:
+    """Return {year_str: col_index} from the values of row 4 (col C onwards)."""
     year_cols: Dict[str, int] = {}
-    for col in range(3, ws.max_column + 1):
-        raw = ws.cell(4, col).value
+    for col, raw in enumerate(header_row[2:], start=3):
         if raw is None:
             continue
         val = str(raw)
@@ -223,6 +223,87 @@ def _find_year_cols(ws) -> Dict[str, int]:
     return year_cols
 
 
+def _json_value(v):
+    """Cell value as stored in the answer cache (dates etc. become text)."""
+    return v if v is None or isinstance(v, (str, int, float, bool)) else str(v)
+
+
+def parse_workbook(path: str, sheet: Optional[str] = None) -> dict:
+    """
+    Read the fields of one workbook into
+      {"sheet", "sheetnames", "years": {year: col}, "values": {year: {label: value}}}
+    or {"error": ...} if an explicitly requested sheet does not exist.
+
+    Streams the sheet (read_only, values_only) and keeps only column B and the
+    year columns found in row 4; for a label appearing on several rows the
+    first one wins.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = sheet or detect_sheet(wb)
+        if sheet not in wb.sheetnames:
+            return {"error": f"Sheet '{sheet}' not found in {path}. "
+                             f"Available: {wb.sheetnames}"}
+        ws = wb[sheet]
+        ws.reset_dimensions()       # some writers store a stale <dimension>
+
+        header = next(ws.iter_rows(min_row=4, max_row=4, values_only=True), ())
+        year_cols = _find_year_cols(header)
+        wanted = {_norm_label(label): label for label, _ in _FIELDS}
+        last_col = max([2, *year_cols.values()])
+
+        values: Dict[str, Dict[str, object]] = {year: {} for year in year_cols}
+        seen = set()
+        for row in ws.iter_rows(max_col=last_col, values_only=True):
+            if len(row) < 2 or not row[1] or not str(row[1]).strip():
+                continue
+            label = wanted.get(_norm_label(row[1]))
+            if label is None or label in seen:
+                continue
+            seen.add(label)
+            for year, col in year_cols.items():
+                values[year][label] = _json_value(row[col - 1]) if col <= len(row) else None
+        return {"sheet": sheet, "sheetnames": list(wb.sheetnames),
+                "years": year_cols, "values": values}
+    finally:
+        wb.close()
+
+
+# Bump when parse_workbook's output changes, so stale cache entries are ignored.
+_ANSWER_CACHE_VERSION = 1
+
+_ANSWER_CACHE_DIR = os.environ.get("ANSWER_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".answer_cache",
+)
+
+
+def load_answers(path: str, sheet: Optional[str] = None) -> dict:
+    """
+    parse_workbook() for a reference workbook, cached by file hash — the
+    correct answers do not change between runs, so they are parsed once.
+    """
+    key = hashlib.sha256(json.dumps(
+        [_ANSWER_CACHE_VERSION, sheet, [label for label, _ in _FIELDS]]).encode()).hexdigest()[:12]
+    cache_path = os.path.join(_ANSWER_CACHE_DIR, f"{file_hash(path)}-{key}.json")
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    parsed = parse_workbook(path, sheet)
+    if "error" not in parsed:
+        try:
+            os.makedirs(_ANSWER_CACHE_DIR, exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(parsed, f, ensure_ascii=False)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass                        # a read-only checkout still works, uncached
+    return parsed
+
+
 # ---------------------------------------------------------------------------
 # main compare function
 # ---------------------------------------------------------------------------
@@ -239,68 +320,44 @@ def compare(filled_path: str, correct_path: str,
 
     Returns structured dict with per-field results and summary.
     """
-    wb_f = openpyxl.load_workbook(filled_path, data_only=True)
-    wb_c = openpyxl.load_workbook(correct_path, data_only=True)
-
-    sheet_f = filled_sheet  or detect_sheet(wb_f)
-    sheet_c = correct_sheet or detect_sheet(wb_c)
-
-    if sheet_f not in wb_f.sheetnames:
-        return {"error": f"Sheet '{sheet_f}' not found in {filled_path}. "
-                         f"Available: {wb_f.sheetnames}"}
-    if sheet_c not in wb_c.sheetnames:
-        return {"error": f"Sheet '{sheet_c}' not found in {correct_path}. "
-                         f"Available: {wb_c.sheetnames}"}
-
+    parsed_f = parse_workbook(filled_path, filled_sheet)
+    if "error" in parsed_f:
+        return parsed_f
+    parsed_c = load_answers(correct_path, correct_sheet)
+    if "error" in parsed_c:
+        return parsed_c
+
+    sheet_f, sheet_c = parsed_f["sheet"], parsed_c["sheet"]
     if sheet_f != _MAIN_SHEET or sheet_c != _MAIN_SHEET:
         print(f"    [sheets]   filled='{sheet_f}'  correct='{sheet_c}'")
 
-    ws_f = wb_f[sheet_f]
-    ws_c = wb_c[sheet_c]
-
-    years_f = _find_year_cols(ws_f)
-    years_c = _find_year_cols(ws_c)
+    years_f, vals_f = parsed_f["years"], parsed_f["values"]
+    years_c, vals_c = parsed_c["years"], parsed_c["values"]
 
     # Only compare years where the filled file has actual numeric data
     # (skip template columns that exist as headers but were never populated)
-    lm_f_pre = _build_label_map(ws_f)
-    lm_c_pre = _build_label_map(ws_c)
-    populated_years_f = set()
-    for year, col in years_f.items():
-        numeric_count = sum(
-            1 for label, _ in _FIELDS
-            if lm_f_pre.get(_norm_label(label))
-            and _to_float(ws_f.cell(lm_f_pre[_norm_label(label)][0], col).value) is not None
-        )
-        if numeric_count >= 3:
-            populated_years_f.add(year)
+    populated_years_f = {
+        year for year, row in vals_f.items()
+        if sum(1 for v in row.values() if _to_float(v) is not None) >= 3
+    }
 
     common_years = sorted(set(populated_years_f) & set(years_c))
 
-    lm_f = lm_f_pre
-    lm_c = lm_c_pre
-
     fields_out = []
     total = matched = 0
     categories: Dict[str, List[str]] = {}
 
     for year in common_years:
-        col_f = years_f[year]
-        col_c = years_c[year]
-
         for label, field_key in _FIELDS:
-            norm = _norm_label(label)
-            rows_c = lm_c.get(norm, [])
-            if not rows_c:
+            if label not in vals_c[year]:
                 continue
 
-            c_val = ws_c.cell(rows_c[0], col_c).value
+            c_val = vals_c[year][label]
             # Skip if correct file has no expected value
             if c_val in (None, "", 0, 0.0):
                 continue
 
-            rows_f = lm_f.get(norm, [])
-            f_val = ws_f.cell(rows_f[0], col_f).value if rows_f else None
+            f_val = vals_f[year].get(label)
 
             total += 1
 
@@ -403,7 +460,7 @@ if __name__ == "__main__":
         if len(sys.argv) < 3:
             print("Usage: python diff_checker.py --detect <excel.xlsx>")
             sys.exit(1)
-        wb   = openpyxl.load_workbook(sys.argv[2], data_only=True)
+        wb   = openpyxl.load_workbook(sys.argv[2], read_only=True, data_only=True)
         name = detect_sheet(wb)
         print(f"Detected sheet: '{name}'")
         print(f"All sheets:     {wb.sheetnames}")
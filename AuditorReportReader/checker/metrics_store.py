@@ -0,0 +1,245 @@
+"""
+metrics_store.py — SQLite index over accuracy_tracker snapshots.
+
+Snapshot JSON files in training/snapshots/ stay the record (they are small,
+diffable and committed); this store is a derived index so list / history /
+compare answer with indexed queries instead of loading every snapshot:
+
+  snapshots       one row per snapshot file (label, timestamp, overall score)
+  company_scores  one row per (snapshot, company)
+  field_results   one row per (snapshot, company, year, field) with its status
+
+Opening the store syncs it with the snapshot folder: new or modified files
+are (re)ingested (so existing snapshots need no migration step) and rows of
+deleted files are dropped.  The database can be removed at any time and is
+rebuilt on the next run.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id            INTEGER PRIMARY KEY,
+    file          TEXT NOT NULL UNIQUE,
+    mtime         REAL NOT NULL,         -- of the JSON file when ingested
+    label         TEXT NOT NULL,
+    timestamp     TEXT NOT NULL,
+    overall_score REAL NOT NULL,
+    total_matched INTEGER NOT NULL,
+    total_fields  INTEGER NOT NULL,
+    n_companies   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS company_scores (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    company     TEXT NOT NULL,
+    score_pct   REAL NOT NULL,
+    matched     INTEGER NOT NULL,
+    total       INTEGER NOT NULL,
+    by_category TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, company)
+);
+CREATE TABLE IF NOT EXISTS field_results (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    company     TEXT NOT NULL,
+    seq         INTEGER NOT NULL,      -- position in the company's diff.json
+    year        TEXT NOT NULL,
+    label       TEXT NOT NULL,
+    field       TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    filled      TEXT,                  -- JSON-encoded cell values
+    correct     TEXT
+);
+-- compare: join two snapshots field by field; also unique per snapshot
+CREATE UNIQUE INDEX IF NOT EXISTS ix_field_key
+    ON field_results (snapshot_id, company, year, label);
+-- compare: per-field roll-up of one snapshot
+CREATE INDEX IF NOT EXISTS ix_field_status
+    ON field_results (snapshot_id, label, status);
+-- history --field: one field's trend across snapshots
+CREATE INDEX IF NOT EXISTS ix_field_trend
+    ON field_results (label, snapshot_id, status);
+-- history --company: one company's scores across snapshots
+CREATE INDEX IF NOT EXISTS ix_company_history
+    ON company_scores (company, snapshot_id);
+CREATE INDEX IF NOT EXISTS ix_snapshot_time
+    ON snapshots (timestamp);
+"""
+
+
+class MetricsStore:
+    """Connection to the metrics database, synced with snap_dir on open."""
+
+    def __init__(self, db_path, snap_dir):
+        self.db_path  = Path(db_path)
+        self.snap_dir = Path(snap_dir)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.db_path))
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(_SCHEMA)
+        self.sync()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── ingest ────────────────────────────────────────────────────────────────
+
+    def sync(self) -> int:
+        """Index new or modified snapshot files, forget deleted ones;
+        returns the number of files ingested."""
+        on_disk = ({p.name: p.stat().st_mtime for p in self.snap_dir.glob("*.json")}
+                   if self.snap_dir.exists() else {})
+        indexed = {r["file"]: r["mtime"]
+                   for r in self.db.execute("SELECT file, mtime FROM snapshots")}
+        with self.db:
+            for name in set(indexed) - set(on_disk):
+                self.db.execute("DELETE FROM snapshots WHERE file = ?", (name,))
+        added = 0
+        for name in sorted(n for n, mtime in on_disk.items() if indexed.get(n) != mtime):
+            try:
+                snap = json.loads((self.snap_dir / name).read_text())
+            except (OSError, ValueError):
+                continue                    # unreadable file: left out of the index
+            self.ingest(name, snap, on_disk[name])
+            added += 1
+        return added
+
+    def ingest(self, file: str, snap: dict, mtime: float = 0.0) -> int:
+        """Insert one snapshot dict (accuracy_tracker.build_snapshot format)."""
+        companies = snap.get("companies", {})
+        with self.db:
+            self.db.execute("DELETE FROM snapshots WHERE file = ?", (file,))
+            cur = self.db.execute(
+                "INSERT INTO snapshots (file, mtime, label, timestamp, overall_score, "
+                "total_matched, total_fields, n_companies) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (file, mtime, snap.get("label", "?"), snap.get("timestamp", ""),
+                 snap.get("overall_score", 0), snap.get("total_matched", 0),
+                 snap.get("total_fields", 0), len(companies)))
+            sid = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO company_scores VALUES (?, ?, ?, ?, ?, ?)",
+                [(sid, co, info["score_pct"], info["matched"], info["total"],
+                  json.dumps(info.get("by_category", {})))
+                 for co, info in companies.items()])
+            self.db.executemany(
+                "INSERT OR IGNORE INTO field_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(sid, co, seq, str(f.get("year", "")), f["label"], f.get("field", ""),
+                  f.get("status", ""), json.dumps(f.get("filled")), json.dumps(f.get("correct")))
+                 for co, info in companies.items()
+                 for seq, f in enumerate(info.get("fields", []))])
+        return sid
+
+    # ── snapshots ─────────────────────────────────────────────────────────────
+
+    def snapshots(self, order: str = "file") -> list[sqlite3.Row]:
+        """All snapshots, ordered by file name or by timestamp."""
+        col = "timestamp" if order == "timestamp" else "file"
+        return self.db.execute(f"SELECT * FROM snapshots ORDER BY {col}").fetchall()
+
+    def find(self, label: str) -> Optional[sqlite3.Row]:
+        """Newest snapshot whose file stem is '<label>_…', else one containing label."""
+        rows = self.db.execute("SELECT * FROM snapshots ORDER BY file DESC").fetchall()
+        low = label.lower()
+        for r in rows:
+            if Path(r["file"]).stem.lower().startswith(low + "_"):
+                return r
+        for r in rows:
+            if low in Path(r["file"]).stem.lower():
+                return r
+        return None
+
+    # ── per-snapshot queries ──────────────────────────────────────────────────
+
+    def company_scores(self, snapshot_id: int) -> dict[str, sqlite3.Row]:
+        rows = self.db.execute(
+            "SELECT * FROM company_scores WHERE snapshot_id = ?", (snapshot_id,))
+        return {r["company"]: r for r in rows}
+
+    def field_rollup(self, snapshot_id: int) -> dict[str, dict]:
+        """{label: {match, missing, wrong, total}} across all companies."""
+        rows = self.db.execute(
+            "SELECT label, COUNT(*) AS total, "
+            "       SUM(status = 'MATCH') AS match, "
+            "       SUM(status = 'MISSING') AS missing, "
+            "       SUM(status = 'WRONG_VALUE') AS wrong "
+            "FROM field_results WHERE snapshot_id = ? GROUP BY label", (snapshot_id,))
+        return {r["label"]: {k: r[k] for k in ("match", "missing", "wrong", "total")}
+                for r in rows}
+
+    def field_count(self, snapshot_id: int) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM field_results WHERE snapshot_id = ?",
+                               (snapshot_id,)).fetchone()[0]
+
+    def field_pairs(self, before_id: int, after_id: int,
+                    changes_only: bool = False) -> list[dict]:
+        """
+        Every (company, year, label) of either snapshot with both sides:
+        {company, year, label, before, after} where before/after are
+        {status, filled, correct} or None.  Rows come per company in the
+        before snapshot's field order, fields new in after at the end.
+        """
+        changed = "AND b.status IS NOT a.status" if changes_only else ""
+        rows = self.db.execute(f"""
+            SELECT b.company, b.year, b.label, 0 AS side, b.seq,
+                   b.status AS b_status, b.filled AS b_filled, b.correct AS b_correct,
+                   a.status AS a_status, a.filled AS a_filled, a.correct AS a_correct
+            FROM field_results b
+            LEFT JOIN field_results a
+                   ON a.snapshot_id = :after AND a.company = b.company
+                  AND a.year = b.year AND a.label = b.label
+            WHERE b.snapshot_id = :before {changed}
+            UNION ALL
+            SELECT a.company, a.year, a.label, 1 AS side, a.seq,
+                   NULL, NULL, NULL, a.status, a.filled, a.correct
+            FROM field_results a
+            WHERE a.snapshot_id = :after AND NOT EXISTS (
+                SELECT 1 FROM field_results b
+                WHERE b.snapshot_id = :before AND b.company = a.company
+                  AND b.year = a.year AND b.label = a.label)
+            ORDER BY 1, 4, 5
+        """, {"before": before_id, "after": after_id}).fetchall()
+
+        def side(r, p):
+            if r[f"{p}_status"] is None:
+                return None
+            return {"status":  r[f"{p}_status"],
+                    "filled":  json.loads(r[f"{p}_filled"]),
+                    "correct": json.loads(r[f"{p}_correct"])}
+
+        return [{"company": r["company"], "year": r["year"], "label": r["label"],
+                 "before": side(r, "b"), "after": side(r, "a")} for r in rows]
+
+    # ── trends ────────────────────────────────────────────────────────────────
+
+    def field_labels(self) -> list[str]:
+        return [r[0] for r in self.db.execute("SELECT DISTINCT label FROM field_results")]
+
+    def companies(self) -> list[str]:
+        return [r[0] for r in self.db.execute("SELECT DISTINCT company FROM company_scores")]
+
+    def field_trend(self, label: str) -> list[sqlite3.Row]:
+        """Match rate of one field (exact label) in every snapshot."""
+        return self.db.execute(
+            "SELECT s.label AS snapshot, s.timestamp, COUNT(f.status) AS total, "
+            "       COALESCE(SUM(f.status = 'MATCH'), 0) AS match "
+            "FROM snapshots s LEFT JOIN field_results f "
+            "       ON f.label = ? AND f.snapshot_id = s.id "
+            "GROUP BY s.id ORDER BY s.timestamp", (label,)).fetchall()
+
+    def company_history(self, company: str) -> list[sqlite3.Row]:
+        """One company's (exact name) score in every snapshot that includes it."""
+        return self.db.execute(
+            "SELECT s.label AS snapshot, s.timestamp, c.score_pct, c.matched, c.total "
+            "FROM company_scores c JOIN snapshots s ON s.id = c.snapshot_id "
+            "WHERE c.company = ? ORDER BY s.timestamp", (company,)).fetchall()
@@ -22,6 +22,15 @@ Usage:
   # Force fresh Gemini calls (ignore LLM cache):
   python checker/sharepoint_pipeline.py --no-cache
 
+  # Four workers per network / LLM stage, two per CPU stage:
+  python checker/sharepoint_pipeline.py --jobs 4
+
+  # Explicit per-stage worker counts (stages: discover, download, ocr, llm, fill, compare):
+  python checker/sharepoint_pipeline.py --jobs 4 --stage-workers download=8,llm=6
+
+  # After a crash: reuse results of companies already compared on the same files:
+  python checker/sharepoint_pipeline.py --resume
+
 Required env var:
   GEMINI_API_KEY   — for PDF extraction (not needed with --list-only)
 """
@@ -31,8 +40,13 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import re
 import sys
+import threading
+import time
+from functools import partial
 from pathlib import Path
+from typing import Optional
 
 _HERE      = Path(__file__).parent.resolve()   # checker/
 _ROOT      = _HERE.parent                       # AuditorReportReader/
@@ -49,31 +63,39 @@ if _env.exists():
             _k, _, _v = _line.partition("=")
             os.environ.setdefault(_k.strip(), _v.strip())
 
+import batch_scheduler
 import sp_rest
+from batch_manifest import BatchManifest, file_hash
+from stage_pipeline import Stage, run_stages
 
 
 # ---------------------------------------------------------------------------
 # Auditor extraction
 # ---------------------------------------------------------------------------
+# OCR → Gemini → Excel fill as separate functions so the batch pipeline can
+# run them as separate stages; _run_auditor chains them for one PDF.
 
-def _run_auditor(pdf_path: Path, out_path: Path,
-                 api_key: str, model: str, no_cache: bool = False) -> None:
-    import re as _re
-    from utils import json_cache
+_TEMPLATE = _ROOT / "Financial Statements Template.xlsx"
+
+
+def _check_template() -> None:
+    if not _TEMPLATE.exists():
+        raise FileNotFoundError(f"Template not found: {_TEMPLATE}")
+
+
+def _ocr_stage(pdf_path: Path) -> tuple:
+    """OCR (or text layer) → (pages, first year mentioned)."""
     from pipeline.pdf_ocr import extract_pages, full_text
-    from pipeline.gemini_extractor import GeminiExtractor
-    from pipeline.validator import run_checks
-    from pipeline.excel_filler import write_output
 
-    template = _ROOT / "Financial Statements Template.xlsx"
-    if not template.exists():
-        raise FileNotFoundError(f"Template not found: {template}")
+    pages = extract_pages(str(pdf_path), dpi=300)
+    m = re.search(r"\b(20\d{2})\b", full_text(pages))
+    return pages, (m.group(1) if m else "")
 
-    pages    = extract_pages(str(pdf_path), dpi=300)
-    all_text = full_text(pages)
 
-    m = _re.search(r"\b(20\d{2})\b", all_text)
-    target_year = m.group(1) if m else ""
+def _llm_stage(pdf_path: Path, pages: list, target_year: str,
+               api_key: str, model: str, no_cache: bool = False) -> dict:
+    from utils import json_cache
+    from pipeline.gemini_extractor import GeminiExtractor
 
     file_hash = json_cache.pdf_hash(str(pdf_path))
     if no_cache:
@@ -85,13 +107,18 @@ def _run_auditor(pdf_path: Path, out_path: Path,
         pages=pages, target_year=target_year, hints={},
         api_key=api_key, model=model,
     )
-    results = extractor.extract_all(pdf_hash_val=file_hash)
+    return extractor.extract_all(pdf_hash_val=file_hash)
+
+
+def _fill_stage(results: dict, target_year: str, out_path: Path) -> None:
+    from pipeline.validator import run_checks
+    from pipeline.excel_filler import write_output
 
     financial_data = results["financial_data"]
     prior_data     = results.get("prior_financial_data") or {}
 
     write_output(
-        template_path=str(template),
+        template_path=str(_TEMPLATE),
         output_path=str(out_path),
         target_year=results.get("detected_year") or target_year,
         audit_checks=results["audit_checks"],
@@ -108,65 +135,87 @@ def _run_auditor(pdf_path: Path, out_path: Path,
     )
 
 
+def _run_auditor(pdf_path: Path, out_path: Path,
+                 api_key: str, model: str, no_cache: bool = False) -> None:
+    _check_template()
+    pages, target_year = _ocr_stage(pdf_path)
+    results = _llm_stage(pdf_path, pages, target_year, api_key, model, no_cache)
+    _fill_stage(results, target_year, out_path)
+
+
 # ---------------------------------------------------------------------------
 # Per-company pipeline
 # ---------------------------------------------------------------------------
+# Each company is a job dict flowing through stage_pipeline.run_stages:
+#
+#   discover → download → ocr → llm → fill → compare
+#
+# with its own worker count per stage and small bounded queues between them,
+# so one company's downloads overlap another's OCR and Gemini calls.  A stage
+# that settles the outcome early (no PDF, unchanged under --resume) stores
+# job["result"] and returns None.  The OCR queue serves cached, then longest
+# PDFs first (batch_scheduler.dispatch_key).  It holds the whole batch, so that
+# order covers every downloaded company rather than the two next in line;
+# downloads still wait on their own bounded input queue and workers.
 
-def process_company(company: dict, out_dir: Path,
-                    api_key: str, model: str, no_cache: bool = False) -> dict:
-    """
-    company dict has keys: Name, ServerRelativeUrl (SharePoint REST API format).
-    """
-    name         = company["Name"]
-    company_path = company["ServerRelativeUrl"]
+STAGES = ("discover", "download", "ocr", "llm", "fill", "compare")
 
-    print(f"\n{'='*64}")
-    print(f"  {name}")
-    print(f"{'='*64}")
+_print_lock = threading.Lock()
 
-    company_out = out_dir / name
-    company_out.mkdir(parents=True, exist_ok=True)
 
-    top_folders = sp_rest.list_subfolders(company_path)
-    pdf_path  = None
-    cawf_path = None
-    issues    = []
+def _say(msg: str) -> None:
+    """print() from stage workers without lines interleaving mid-way."""
+    with _print_lock:
+        print(msg, flush=True)
+
+
+def stage_workers(jobs: int, overrides: str = "") -> dict:
+    """
+    Workers per stage: jobs for network / Gemini stages, min(jobs, 2) for
+    CPU stages (pdf_ocr already spreads one PDF over every core); overrides
+    like "download=8,llm=6" replace individual counts.
+    """
+    workers = {"discover": jobs, "download": jobs, "ocr": min(jobs, 2),
+               "llm": jobs, "fill": min(jobs, 2), "compare": min(jobs, 2)}
+    for part in filter(None, (p.strip() for p in overrides.split(","))):
+        stage, _, n = part.partition("=")
+        if stage.strip() not in workers or not n.strip().isdigit() or int(n) < 1:
+            raise ValueError(f"bad --stage-workers entry '{part}' "
+                             f"(expected <stage>=<n>, stages: {', '.join(STAGES)})")
+        workers[stage.strip()] = int(n)
+    return workers
+
+
+def _discover_job(job: dict) -> Optional[dict]:
+    """Find the latest audited PDF and CAWF Excel in the company's folders."""
+    name   = job["name"]
+    issues = []
+    top_folders = sp_rest.list_subfolders(job["company"]["ServerRelativeUrl"])
 
     # ── 1. Latest audited PDF (independent — missing PDF does not skip CAWF) ──
+    pdf_item = None
     fin = sp_rest.find_subfolder(top_folders, sp_rest.FOLDER_FIN_STMT)
     if not fin:
         issues.append(f"no '{sp_rest.FOLDER_FIN_STMT}' folder (checked fuzzy)")
-        print(f"  [skip pdf] no Financial Statements folder found")
     else:
-        print(f"    [folder]   {fin['Name']}")
         # Try "Audited Account" subfolder; fall back to searching fin directly
         audited_folders = sp_rest.list_subfolders(fin["ServerRelativeUrl"])
         audited = sp_rest.find_subfolder(audited_folders, sp_rest.FOLDER_AUDITED)
         if audited:
-            print(f"    [folder]   {audited['Name']}")
             search_path = audited["ServerRelativeUrl"]
         else:
-            print(f"    [note]     no '{sp_rest.FOLDER_AUDITED}' subfolder — searching '{fin['Name']}' directly")
+            _say(f"  [discover] {name}: no '{sp_rest.FOLDER_AUDITED}' subfolder — "
+                  f"searching '{fin['Name']}' directly")
             search_path = fin["ServerRelativeUrl"]
-        pdf_files = sp_rest.list_files(search_path)
-        pdf_item  = sp_rest.get_latest_file(pdf_files, exts={".pdf"})
+        pdf_item = sp_rest.get_latest_file(sp_rest.list_files(search_path), exts={".pdf"})
         if not pdf_item:
             issues.append("no PDF found")
-            print(f"  [skip pdf] no PDF found")
-        else:
-            pdf_path = company_out / pdf_item["Name"]
-            if pdf_path.exists():
-                print(f"    [cached]   {pdf_path.name}")
-            else:
-                size_kb = int(pdf_item.get("Length", 0)) // 1024
-                print(f"    [download] {pdf_item['Name']}  ({size_kb} KB)")
-                sp_rest.download(pdf_item["ServerRelativeUrl"], pdf_path)
 
     # ── 2. Latest CAWF Excel (always attempted) ───────────────────────────────
+    cawf_item = None
     uw = sp_rest.find_subfolder(top_folders, sp_rest.FOLDER_CREDIT_UW)
     if not uw:
         issues.append(f"no '{sp_rest.FOLDER_CREDIT_UW}' folder")
-        print(f"  [skip xlsx] no '{sp_rest.FOLDER_CREDIT_UW}' folder")
     else:
         uw_files  = sp_rest.list_files(uw["ServerRelativeUrl"])
         cawf_item = (
@@ -176,62 +225,90 @@ def process_company(company: dict, out_dir: Path,
         )
         if not cawf_item:
             issues.append("no Excel in Credit Underwriting")
-            print(f"  [skip xlsx] no Excel in Credit Underwriting")
+
+    if pdf_item is None or cawf_item is None:
+        job["result"] = {"company": name,
+                         "skipped": "; ".join(issues) or "no PDF or CAWF Excel found"}
+        return None
+    job["pdf_item"], job["cawf_item"] = pdf_item, cawf_item
+    return job
+
+
+def _download_job(job: dict, manifest: BatchManifest, resume: bool) -> Optional[dict]:
+    """Fetch both files (skipped when unchanged), then check the run manifest."""
+    name = job["name"]
+    company_out = job["out_dir"] / name
+    company_out.mkdir(parents=True, exist_ok=True)
+    for key, item in (("pdf_path", job["pdf_item"]), ("cawf_path", job["cawf_item"])):
+        dest = company_out / item["Name"]
+        size_kb = int(item.get("Length", 0)) // 1024
+        if sp_rest.download(item["ServerRelativeUrl"], dest, meta=item):
+            _say(f"  [download] {name}: {item['Name']}  ({size_kb} KB)")
         else:
-            cawf_path = company_out / cawf_item["Name"]
-            if cawf_path.exists():
-                print(f"    [cached]   {cawf_path.name}")
-            else:
-                size_kb = int(cawf_item.get("Length", 0)) // 1024
-                print(f"    [download] {cawf_item['Name']}  ({size_kb} KB)")
-                sp_rest.download(cawf_item["ServerRelativeUrl"], cawf_path)
-
-    if pdf_path is None:
-        msg = "; ".join(issues) if issues else "no PDF found"
-        return {"company": name, "skipped": msg}
-
-    if cawf_path is None:
-        msg = "; ".join(issues) if issues else "no CAWF Excel found"
-        return {"company": name, "skipped": msg,
-                "pdf": str(pdf_path)}
-
-    # ── 3. Run auditor extraction ─────────────────────────────────────────────
-    filled_path = company_out / f"{pdf_path.stem}_filled.xlsx"
-    print(f"  [extract]  running pipeline on {pdf_path.name} ...")
-    try:
-        _run_auditor(pdf_path, filled_path, api_key, model, no_cache=no_cache)
-        print(f"  [extract]  done → {filled_path.name}")
-    except Exception as exc:
-        print(f"  [extract]  FAILED: {exc}")
-        return {"company": name, "error": f"extraction failed: {exc}",
-                "pdf": str(pdf_path)}
-
-    # ── 4. Compare filled Excel vs CAWF ──────────────────────────────────────
-    print(f"  [compare]  {filled_path.name}  vs  {cawf_path.name}")
+            _say(f"  [cached]   {name}: {dest.name}")
+        job[key] = dest
+
+    # ── Checkpoint: skip companies already compared on the same files ───────
+    job["inputs"] = {"pdf": file_hash(job["pdf_path"]), "cawf": file_hash(job["cawf_path"])}
+    rec = manifest.completed(name, job["inputs"]) if resume else None
+    if rec:
+        _say(f"  [resume]   {name}: unchanged since last run — skipped")
+        job["result"], job["resumed"] = rec["result"], True
+        return None
+    manifest.start(name, job["inputs"], pdf=str(job["pdf_path"]), cawf=str(job["cawf_path"]))
+    return job
+
+
+def _ocr_job(job: dict) -> dict:
+    _say(f"  [ocr]      {job['name']}: {job['pdf_path'].name}")
+    job["pages"], job["year"] = _ocr_stage(job["pdf_path"])
+    return job
+
+
+def _llm_job(job: dict, api_key: str, model: str, no_cache: bool) -> dict:
+    _say(f"  [llm]      {job['name']}: {len(job['pages'])} page(s)")
+    job["results"] = _llm_stage(job["pdf_path"], job.pop("pages"), job["year"],
+                                api_key, model, no_cache)
+    return job
+
+
+def _fill_job(job: dict) -> dict:
+    job["filled_path"] = job["pdf_path"].with_name(f"{job['pdf_path'].stem}_filled.xlsx")
+    _fill_stage(job.pop("results"), job["year"], job["filled_path"])
+    return job
+
+
+def _compare_job(job: dict) -> dict:
     import diff_checker
-    result = diff_checker.compare(str(filled_path), str(cawf_path))
 
+    name = job["name"]
+    paths = {"pdf": str(job["pdf_path"]), "filled": str(job["filled_path"]),
+             "cawf": str(job["cawf_path"])}
+    result = diff_checker.compare(paths["filled"], paths["cawf"])
     if "error" in result:
-        print(f"  [compare]  {result['error']}")
-        print(f"  [note]     The CAWF Excel needs a 'Summary of Information' sheet")
-        print(f"             in Financial Statements Template format.")
-        return {"company": name, "error": result["error"],
-                "pdf": str(pdf_path), "filled": str(filled_path),
-                "cawf": str(cawf_path)}
-
-    diff_checker.print_report(result, case_name=name)
+        _say(f"  [compare]  {name}: {result['error']}")
+        _say(f"  [note]     The CAWF Excel needs a 'Summary of Information' sheet")
+        _say(f"             in Financial Statements Template format.")
+        job["result"] = {"company": name, "error": result["error"], **paths}
+        return job
 
     s = result["summary"]
-    return {
+    job["diff"] = result
+    job["result"] = {
         "company":     name,
         "score_pct":   s["score_pct"],
         "matched":     s["matched"],
         "total":       s["total"],
         "by_category": s["by_category"],
-        "pdf":         str(pdf_path),
-        "filled":      str(filled_path),
-        "cawf":        str(cawf_path),
+        **paths,
     }
+    return job
+
+
+def _print_stage_times(busy: dict, wall: float) -> None:
+    cells = "  ".join(f"{stage} {busy[stage]:.1f}s" for stage in STAGES)
+    print(f"  Stage busy time: {cells}")
+    print(f"  Wall clock: {wall:.1f}s  (stages overlap across companies)")
 
 
 # ---------------------------------------------------------------------------
@@ -248,16 +325,35 @@ def main() -> None:
     parser.add_argument("--no-cache",  action="store_true",
                         help="Force fresh Gemini calls (ignore LLM cache)")
     parser.add_argument("--model",     default="gemini-2.5-flash-lite")
+    parser.add_argument("--jobs",      type=int, default=1,
+                        help="Workers per network / Gemini stage; CPU stages get min(jobs, 2) "
+                             "(default 1 — stages still overlap across companies)")
+    parser.add_argument("--stage-workers", default="",
+                        help="Per-stage overrides, e.g. download=8,llm=6 "
+                             f"(stages: {', '.join(STAGES)})")
+    parser.add_argument("--refresh",   action="store_true",
+                        help="Re-list every SharePoint folder instead of reusing cached listings")
+    parser.add_argument("--resume",    action="store_true",
+                        help="Reuse results recorded in <out>/manifest.jsonl for companies "
+                             "whose PDF and CAWF are unchanged; retry the rest")
     parser.add_argument("--out",       default=str(_ROOT / "output" / "sharepoint_run"),
                         help="Output directory for downloads and filled Excels")
     args = parser.parse_args()
 
+    try:
+        workers = stage_workers(max(1, args.jobs), args.stage_workers)
+    except ValueError as exc:
+        print(f"[ERROR] {exc}")
+        sys.exit(1)
+
     api_key = os.environ.get("GEMINI_API_KEY", "")
     if not api_key and not args.list_only:
         print("[ERROR] Set GEMINI_API_KEY in your .env file before running extraction.")
         sys.exit(1)
 
     out_dir = Path(args.out)
+    if args.refresh:
+        sp_rest.use_listing_cache(False)
 
     # ── List company subfolders ───────────────────────────────────────────────
     print(f"[SharePoint] Listing {sp_rest.ROOT_FOLDER} ...")
@@ -282,19 +378,60 @@ def main() -> None:
             print(f"  • {f['Name']:<40}  modified {mod}")
         return
 
-    # ── Process each company ──────────────────────────────────────────────────
-    results = []
-    for item in company_folders:
-        try:
-            r = process_company(item, out_dir, api_key, args.model,
-                                no_cache=args.no_cache)
-        except PermissionError as exc:
-            print(f"[ERROR] {exc}")
-            sys.exit(1)
-        except Exception as exc:
-            print(f"  [ERROR] {item['Name']}: {exc}")
-            r = {"company": item["Name"], "error": str(exc)}
-        results.append(r)
+    try:
+        _check_template()
+    except FileNotFoundError as exc:
+        print(f"[ERROR] {exc}")
+        sys.exit(1)
+
+    # ── Run every company through the staged pipeline ─────────────────────────
+    manifest = BatchManifest(out_dir / "manifest.jsonl")
+    jobs = [{"name": f["Name"], "company": f, "out_dir": out_dir} for f in company_folders]
+    stages = [
+        Stage("discover", _discover_job, workers["discover"]),
+        Stage("download", partial(_download_job, manifest=manifest, resume=args.resume),
+              workers["download"]),
+        Stage("ocr", _ocr_job, workers["ocr"],
+              priority=lambda job: batch_scheduler.dispatch_key(
+                  job["pdf_path"], pdf_hash=job["inputs"]["pdf"]),
+              queue_size=len(jobs)),
+        Stage("llm", partial(_llm_job, api_key=api_key, model=args.model,
+                             no_cache=args.no_cache), workers["llm"]),
+        Stage("fill", _fill_job, workers["fill"]),
+        Stage("compare", _compare_job, workers["compare"]),
+    ]
+    print(f"[Pipeline] " + ", ".join(f"{s.name} ×{s.workers}" for s in stages))
+
+    finished = []
+
+    def on_done(job: dict) -> None:
+        name = job["name"]
+        if "result" not in job:
+            job["result"] = {"company": name, "error": job.get("error", "unknown error")}
+        r = job["result"]
+        if "inputs" in job and not job.get("resumed"):
+            if "score_pct" in r:
+                manifest.done(name, result=r)
+            else:
+                manifest.fail(name, r.get("error", ""))
+        finished.append(name)
+        tag = f"[{len(finished)}/{len(jobs)}]"
+        with _print_lock:
+            if "diff" in job:
+                import diff_checker
+                diff_checker.print_report(job["diff"], case_name=name)
+            if "skipped" in r:
+                print(f"  {tag} {name}: SKIPPED — {r['skipped']}")
+            elif "error" in r:
+                print(f"  {tag} {name}: ERROR — {r['error']}")
+            else:
+                print(f"  {tag} {name}: {r['score_pct']:.1f}%")
+
+    t0 = time.perf_counter()
+    busy = run_stages(jobs, stages, on_done)
+    wall = time.perf_counter() - t0
+    results = [job["result"] for job in jobs]
+    sp_rest.save_sync_cache()
 
     # ── Save JSON summary ─────────────────────────────────────────────────────
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -316,7 +453,9 @@ def main() -> None:
             bar = "█" * int(pct / 5)
             print(f"  {name:<38}  {pct:5.1f}%  {bar}")
     print(f"{'='*64}")
-    print(f"\n  Full results: {summary_path}")
+    _print_stage_times(busy, wall)
+    print(f"\n  SharePoint sync: {sp_rest.format_sync_stats()}")
+    print(f"  Full results: {summary_path}")
 
 
 if __name__ == "__main__":
@@ -7,19 +7,43 @@ How it works:
   3. No Azure app, no SP_CLIENT_ID — just the sharing link
 
 Set SP_SHARING_LINK in your .env file and this module self-authenticates on import.
+
+Throughput:
+  - One pooled Session (SP_POOL_SIZE connections, default 16) shared by all
+    threads; map_concurrent() runs listings / downloads on SP_WORKERS threads
+    (default 8, never more than the pool size).
+  - No fixed sleeps: 429 / 503 responses pause every thread for Retry-After
+    (or an exponential backoff) and widen the gap between requests; each
+    success narrows it again (AIMD), so the crawl settles just under the
+    server's limit.
+  - Downloads stream to a .part file next to the destination and are renamed
+    into place, so an interrupted run never leaves a truncated PDF behind.
+  - Incremental sync: folder listings are cached and reused while the parent
+    reports the folder unchanged; files are re-downloaded only when their
+    SharePoint metadata changed (see "Sync cache" below).
+  - RangedFile reads just the byte ranges a parser asks for (HTTP Range), so
+    peeking at a PDF's first pages does not download the whole file.
 """
 
 from __future__ import annotations
 
+import atexit
 import difflib
+import email.utils
+import hashlib
+import io
+import json
 import os
 import re
+import threading
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 # ---------------------------------------------------------------------------
 # Site constants
@@ -40,13 +64,21 @@ EXCEL_EXTS       = {".xlsx", ".xlsm", ".xls"}
 # Session — shared across all calls, holds FedAuth cookies after authenticate()
 # ---------------------------------------------------------------------------
 
+_POOL_SIZE   = int(os.environ.get("SP_POOL_SIZE", "16"))
+_WORKERS     = int(os.environ.get("SP_WORKERS", "8"))
+_MAX_RETRIES = 6
+
 _SESSION = requests.Session()
 _SESSION.headers.update({
     "Accept":     "application/json;odata=verbose",
     "User-Agent": "Mozilla/5.0 AppleWebKit/537.36 Chrome/120.0",
 })
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=_POOL_SIZE)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
 
 _authenticated = False
+_auth_lock     = threading.Lock()
 
 
 def authenticate(sharing_link: str) -> None:
@@ -67,26 +99,104 @@ def authenticate(sharing_link: str) -> None:
 def _ensure_auth() -> None:
     if _authenticated:
         return
-    link = os.environ.get("SP_SHARING_LINK", "")
-    if link:
-        print("[SharePoint] Authenticating via sharing link ...")
-        authenticate(link)
-    else:
-        raise PermissionError(
-            "SharePoint returned 403.\n"
-            "Add SP_SHARING_LINK to your .env file:\n"
-            "  SP_SHARING_LINK=https://magnisave-my.sharepoint.com/:f:/g/..."
-        )
+    with _auth_lock:            # worker threads wait for one authentication
+        if _authenticated:
+            return
+        link = os.environ.get("SP_SHARING_LINK", "")
+        if link:
+            print("[SharePoint] Authenticating via sharing link ...")
+            authenticate(link)
+        else:
+            raise PermissionError(
+                "SharePoint returned 403.\n"
+                "Add SP_SHARING_LINK to your .env file:\n"
+                "  SP_SHARING_LINK=https://magnisave-my.sharepoint.com/:f:/g/..."
+            )
 
 
 # ---------------------------------------------------------------------------
 # Core request
 # ---------------------------------------------------------------------------
 
+class _Throttle:
+    """
+    Process-wide adaptive pacing shared by every thread.
+
+    Requests are spaced `interval` seconds apart (0 until SharePoint pushes
+    back).  A 429/503 pauses everyone until Retry-After and doubles the
+    interval — once per pause, since the other threads' requests that were
+    already in flight hit the same limit; every success trims it by 10%.
+    """
+
+    MIN_STEP = 0.05
+    MAX_INTERVAL = 5.0
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.interval = 0.0
+        self._next_at = 0.0
+        self._calm_at = 0.0
+        self.throttled = 0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = self._clock()
+            at = max(now, self._next_at)
+            self._next_at = at + self.interval
+        if at > now:
+            self._sleep(at - now)
+
+    def success(self) -> None:
+        with self._lock:
+            self.interval = 0.0 if self.interval < self.MIN_STEP else self.interval * 0.9
+
+    def backoff(self, delay: float) -> None:
+        with self._lock:
+            self.throttled += 1
+            now = self._clock()
+            if now >= self._calm_at:
+                self.interval = min(self.MAX_INTERVAL, max(self.MIN_STEP, self.interval * 2))
+            self._next_at = max(self._next_at, now + delay)
+            self._calm_at = self._next_at + self.interval
+
+
+_THROTTLE = _Throttle()
+
+
+def _retry_after(resp, attempt: int) -> float:
+    """Seconds to wait from Retry-After (seconds or HTTP date), else 2^attempt."""
+    value = resp.headers.get("Retry-After", "")
+    if value.strip().isdigit():
+        return float(value)
+    if value:
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return min(60.0, 2.0 ** attempt)
+
+
+def _request(url: str, timeout: float, stream: bool = False,
+             headers: Optional[dict] = None) -> requests.Response:
+    """GET through the shared session and throttle, retrying 429/503."""
+    for attempt in range(_MAX_RETRIES + 1):
+        _THROTTLE.wait()
+        resp = _SESSION.get(url, timeout=timeout, stream=stream, headers=headers)
+        if resp.status_code not in (429, 503) or attempt == _MAX_RETRIES:
+            break
+        _THROTTLE.backoff(_retry_after(resp, attempt))
+        resp.close()
+    if resp.ok:
+        _THROTTLE.success()
+    return resp
+
+
 def _get(path: str) -> dict:
     _ensure_auth()
     url  = f"{_SP_API}/{path}"
-    resp = _SESSION.get(url, timeout=30)
+    resp = _request(url, timeout=30)
     if resp.status_code in (401, 403):
         raise PermissionError(
             "SharePoint returned 403 — sharing link may have expired.\n"
@@ -96,6 +206,212 @@ def _get(path: str) -> dict:
         raise RuntimeError(f"SharePoint API error {resp.status_code}: {url}\n{resp.text[:300]}")
     return resp.json()
 
+
+def map_concurrent(fn: Callable, items: Iterable, workers: int = 0) -> list:
+    """
+    fn(item) for every item on a bounded thread pool (workers, default
+    SP_WORKERS, capped at the connection-pool size); results in input order.
+    An exception from fn is returned in place of that item's result, so one
+    bad folder does not sink the crawl — callers check isinstance(r, Exception).
+    """
+    items = list(items)
+    workers = max(1, min(workers or _WORKERS, _POOL_SIZE, len(items) or 1))
+
+    def call(item):
+        try:
+            return fn(item)
+        except Exception as exc:
+            return exc
+
+    if workers == 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sp") as pool:
+        return list(pool.map(call, items))
+
+
+# ---------------------------------------------------------------------------
+# Sync cache — folder listings + downloaded-file manifest
+# ---------------------------------------------------------------------------
+# <SP_CACHE_DIR, else AuditorReportReader/.sp_cache>/
+#   listings.json  {"folders:<path>" | "files:<path>": {fetched, modified, items}}
+#   files.json     {ServerRelativeUrl: {length, modified,
+#                                       paths: {local path: {md5, size, mtime_ns}}}}
+#   memo.json      {"<namespace>:<ServerRelativeUrl>": {length, modified, value}}
+#                  — results derived from a file (e.g. a page peek), see memo_by_meta()
+#
+# A cached listing is reused when this run's listing of the parent reports the
+# folder's TimeLastModified unchanged, up to SP_LISTING_MAX_AGE (default 24h)
+# as a safety net for changes SharePoint does not bubble up.  Folders with no
+# parent listing this run (the root) are reused for SP_LISTING_TTL (default
+# 10 min).  A file is re-downloaded only when its Length / TimeLastModified
+# changed or the local copy was altered.
+
+_SYNC_DIR        = Path(os.environ.get("SP_CACHE_DIR")
+                        or Path(__file__).resolve().parent.parent / ".sp_cache")
+_LISTING_TTL     = float(os.environ.get("SP_LISTING_TTL", "600"))
+_LISTING_MAX_AGE = float(os.environ.get("SP_LISTING_MAX_AGE", "86400"))
+
+
+def _md5(path: Path) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _SyncCache:
+    """Listing cache + file manifest, persisted as JSON under root."""
+
+    def __init__(self, root: Path, ttl: float = _LISTING_TTL,
+                 max_age: float = _LISTING_MAX_AGE):
+        self.root = Path(root)
+        self.ttl, self.max_age = ttl, max_age
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.listings = self._read("listings.json")
+        self.files = self._read("files.json")
+        self.memo = self._read("memo.json")
+        self.seen_modified: dict[str, str] = {}   # folder → TimeLastModified per this run
+        self.stats = {"listed": 0, "listing_hits": 0, "downloaded": 0, "unchanged": 0,
+                      "memo_hits": 0}
+
+    def _read(self, name: str) -> dict:
+        try:
+            return json.loads((self.root / name).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            for name, data in (("listings.json", self.listings), ("files.json", self.files),
+                               ("memo.json", self.memo)):
+                tmp = self.root / f"{name}.{os.getpid()}.tmp"
+                tmp.write_text(json.dumps(data), encoding="utf-8")
+                os.replace(tmp, self.root / name)
+            self._dirty = False
+
+    # ── listings ─────────────────────────────────────────────────────────────
+
+    def listing(self, kind: str, path: str, fetch: Callable[[], list]) -> list[dict]:
+        key = f"{kind}:{path}"
+        with self._lock:
+            entry = self.listings.get(key)
+            seen = self.seen_modified.get(path)
+        if self.enabled and entry and self._fresh(entry, seen):
+            items = entry["items"]
+            self._count("listing_hits")
+        else:
+            items = fetch()
+            self._count("listed")
+            with self._lock:
+                self.listings[key] = {"fetched": time.time(), "modified": seen, "items": items}
+                self._dirty = True
+        if kind == "folders":
+            with self._lock:
+                for f in items:
+                    if f.get("TimeLastModified"):
+                        self.seen_modified[f["ServerRelativeUrl"]] = f["TimeLastModified"]
+        return items
+
+    def _fresh(self, entry: dict, seen: Optional[str]) -> bool:
+        age = time.time() - entry.get("fetched", 0)
+        if seen is not None:
+            return entry.get("modified") == seen and age < self.max_age
+        return age < self.ttl
+
+    # ── files ────────────────────────────────────────────────────────────────
+
+    def unchanged(self, url: str, meta: dict, dest: Path) -> bool:
+        """dest is the current copy of url as described by meta (listing item)."""
+        st = dest.stat()
+        length, modified = str(meta.get("Length", "")), meta.get("TimeLastModified", "")
+        with self._lock:
+            rec = self.files.get(url)
+            local = (rec or {}).get("paths", {}).get(str(dest))
+        if rec is None or local is None:
+            # File fetched before the manifest existed: adopt it if the size matches.
+            if length and st.st_size == int(length):
+                self.record(url, meta, dest)
+                self._count("unchanged")
+                return True
+            return False
+        if rec["length"] != length or rec["modified"] != modified:
+            return False
+        if (local["size"], local["mtime_ns"]) != (st.st_size, st.st_mtime_ns):
+            if _md5(dest) != local["md5"]:
+                return False
+            self.record(url, meta, dest)    # touched, not changed
+        self._count("unchanged")
+        return True
+
+    def record(self, url: str, meta: dict, dest: Path) -> None:
+        st = dest.stat()
+        local = {"md5": _md5(dest), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        length, modified = str(meta.get("Length", "")), meta.get("TimeLastModified", "")
+        with self._lock:
+            rec = self.files.get(url)
+            if not rec or (rec["length"], rec["modified"]) != (length, modified):
+                rec = self.files[url] = {"length": length, "modified": modified, "paths": {}}
+            rec["paths"][str(dest)] = local
+            self._dirty = True
+
+    # ── memo ─────────────────────────────────────────────────────────────────
+
+    def memoized(self, namespace: str, item: dict, compute: Callable[[], object]):
+        key = f"{namespace}:{item['ServerRelativeUrl']}"
+        stamp = (str(item.get("Length", "")), item.get("TimeLastModified", ""))
+        with self._lock:
+            entry = self.memo.get(key)
+        if entry and (entry["length"], entry["modified"]) == stamp:
+            self._count("memo_hits")
+            return entry["value"]
+        value = compute()
+        with self._lock:
+            self.memo[key] = {"length": stamp[0], "modified": stamp[1], "value": value}
+            self._dirty = True
+        return value
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+
+_SYNC = _SyncCache(_SYNC_DIR)
+atexit.register(lambda: _SYNC.save())
+
+
+def use_listing_cache(enabled: bool) -> None:
+    """Turn listing reuse off (fresh listings, still recorded) or back on."""
+    _SYNC.enabled = enabled
+
+
+def memo_by_meta(namespace: str, item: dict, compute: Callable[[], object]):
+    """
+    compute() once per version of a SharePoint file: the JSON-serialisable
+    result is kept against the item's Length + TimeLastModified and returned
+    as-is until either changes.  Exceptions are not cached.
+    """
+    return _SYNC.memoized(namespace, item, compute)
+
+
+def save_sync_cache() -> None:
+    """Persist listings + file manifest now (also done at exit)."""
+    _SYNC.save()
+
+
+def format_sync_stats() -> str:
+    s = _SYNC.stats
+    out = (f"{s['listed']} folder listing(s) fetched, {s['listing_hits']} from cache; "
+           f"{s['downloaded']} file(s) downloaded, {s['unchanged']} unchanged")
+    if s["memo_hits"]:
+        out += f"; {s['memo_hits']} peek(s) reused"
+    return out
+
 # ---------------------------------------------------------------------------
 # Navigation helpers
 # ---------------------------------------------------------------------------
@@ -103,22 +419,28 @@ def _get(path: str) -> dict:
 def list_subfolders(server_rel_path: str) -> list[dict]:
     """Return all subfolders. Each item has Name + ServerRelativeUrl."""
     encoded = urllib.parse.quote(server_rel_path)
-    data    = _get(
-        f"web/GetFolderByServerRelativeUrl('{encoded}')"
-        f"/Folders?$select=Name,ServerRelativeUrl,TimeLastModified&$orderby=Name"
-    )
-    return data.get("d", {}).get("results", [])
+
+    def fetch():
+        data = _get(
+            f"web/GetFolderByServerRelativeUrl('{encoded}')"
+            f"/Folders?$select=Name,ServerRelativeUrl,TimeLastModified&$orderby=Name"
+        )
+        return data.get("d", {}).get("results", [])
+    return _SYNC.listing("folders", server_rel_path, fetch)
 
 
 def list_files(server_rel_path: str) -> list[dict]:
     """Return all files sorted by modified date descending."""
     encoded = urllib.parse.quote(server_rel_path)
-    data    = _get(
-        f"web/GetFolderByServerRelativeUrl('{encoded}')"
-        f"/Files?$select=Name,ServerRelativeUrl,TimeLastModified,Length"
-        f"&$orderby=TimeLastModified desc"
-    )
-    return data.get("d", {}).get("results", [])
+
+    def fetch():
+        data = _get(
+            f"web/GetFolderByServerRelativeUrl('{encoded}')"
+            f"/Files?$select=Name,ServerRelativeUrl,TimeLastModified,Length"
+            f"&$orderby=TimeLastModified desc"
+        )
+        return data.get("d", {}).get("results", [])
+    return _SYNC.listing("files", server_rel_path, fetch)
 
 
 def _norm(s: str) -> str:
@@ -211,22 +533,139 @@ def get_latest_audited_file(files: list[dict], exts: set) -> Optional[dict]:
     return pdfs[0]
 
 
-def download(server_rel_url: str, dest: Path, force: bool = False) -> bool:
+class RangeNotSupported(RuntimeError):
+    """A ranged read is not possible (no 206 reply, or over its byte budget)."""
+
+
+class RangedFile(io.RawIOBase):
+    """
+    Read-only, seekable view of a SharePoint file that fetches block_size
+    blocks on demand with HTTP Range requests — enough for pdfplumber to read
+    the trailer, xref and first pages without downloading the whole PDF.
+    Blocks are small because pdfplumber resolves every page object up front,
+    and those are scattered through the file; the first pages' content is
+    then read in contiguous runs.
+
+    Raises RangeNotSupported (and records it in .failed) when the server
+    replies without 206, or when more than max_bytes (default: half the file,
+    at least 2 MB) would be fetched — a non-linearized PDF whose first pages
+    are scattered; callers then fall back to a full download.
+    """
+
+    def __init__(self, server_rel_url: str, length: int, block_size: int = 16384,
+                 max_bytes: int = 0):
+        super().__init__()
+        if length <= 0:
+            raise RangeNotSupported(f"unknown length: {server_rel_url}")
+        encoded = urllib.parse.quote(server_rel_url)
+        self.url = f"{_SP_API}/web/GetFileByServerRelativeUrl('{encoded}')/$value"
+        self.length = length
+        self.block_size = block_size
+        self.max_bytes = max_bytes or max(2 * 1024 * 1024, length // 2)
+        self.fetched = 0
+        self.requests = 0
+        self.failed: Optional[Exception] = None
+        self._blocks: dict[int, bytes] = {}
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.length}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        if self._pos >= self.length:
+            return 0
+        end = min(self._pos + len(b), self.length)
+        first, last = self._pos // self.block_size, (end - 1) // self.block_size
+        # One request per run of consecutive missing blocks; cached blocks are not refetched.
+        run_start = None
+        for i in range(first, last + 2):
+            if i <= last and i not in self._blocks:
+                if run_start is None:
+                    run_start = i
+            elif run_start is not None:
+                self._fetch(run_start, i - 1)
+                run_start = None
+        data = b"".join(self._blocks[i] for i in range(first, last + 1))
+        offset = self._pos - first * self.block_size
+        n = end - self._pos
+        b[:n] = data[offset:offset + n]
+        self._pos = end
+        return n
+
+    def _fetch(self, first: int, last: int) -> None:
+        start = first * self.block_size
+        stop = min(self.length, (last + 1) * self.block_size)   # exclusive
+        try:
+            if self.fetched + (stop - start) > self.max_bytes:
+                raise RangeNotSupported(f"ranged peek over {self.max_bytes} bytes")
+            _ensure_auth()
+            resp = _request(self.url, timeout=60, stream=True,
+                            headers={"Range": f"bytes={start}-{stop - 1}"})
+            with resp:
+                # A 200 would be the whole file: stop before reading its body.
+                if resp.status_code != 206:
+                    raise RangeNotSupported(f"no ranged reply (HTTP {resp.status_code})")
+                data = resp.content
+            if len(data) != stop - start:
+                raise RangeNotSupported(f"short ranged reply ({len(data)} bytes)")
+        except Exception as exc:
+            self.failed = exc
+            raise
+        self.requests += 1
+        self.fetched += stop - start
+        for i in range(first, last + 1):
+            lo = (i - first) * self.block_size
+            self._blocks[i] = data[lo:lo + self.block_size]
+
+
+def download(server_rel_url: str, dest: Path, force: bool = False,
+             meta: Optional[dict] = None) -> bool:
     """
     Download a file by server-relative URL to dest.
-    Returns True if downloaded, False if skipped (already exists and not force).
+    Returns True if downloaded, False if skipped.  With meta (the file's
+    listing item) an existing dest is skipped only while the file manifest
+    shows it is the copy of that Length / TimeLastModified; without meta,
+    whenever dest exists.  force always downloads.
+    Streams into <dest>.<pid>.<thread>.part and renames it over dest once complete.
     """
     _ensure_auth()
+    dest = Path(dest)
     if dest.exists() and not force:
-        return False
+        if meta is None or _SYNC.unchanged(server_rel_url, meta, dest):
+            return False
     encoded = urllib.parse.quote(server_rel_url)
     url     = f"{_SP_API}/web/GetFileByServerRelativeUrl('{encoded}')/$value"
-    resp    = _SESSION.get(url, timeout=120, stream=True)
+    resp    = _request(url, timeout=120, stream=True)
+    if resp.status_code in (401, 403):
+        resp.close()
+        raise PermissionError(
+            "SharePoint returned 403 — sharing link may have expired.\n"
+            "Update SP_SHARING_LINK in your .env file."
+        )
     if not resp.ok:
+        resp.close()
         raise RuntimeError(f"Download failed ({resp.status_code}): {server_rel_url}")
     dest.parent.mkdir(parents=True, exist_ok=True)
-    with dest.open("wb") as f:
-        for chunk in resp.iter_content(chunk_size=65536):
-            f.write(chunk)
-    time.sleep(0.2)
+    part = dest.with_name(f"{dest.name}.{os.getpid()}.{threading.get_ident()}.part")
+    try:
+        with resp, part.open("wb") as f:
+            for chunk in resp.iter_content(chunk_size=65536):
+                f.write(chunk)
+        os.replace(part, dest)
+    finally:
+        part.unlink(missing_ok=True)
+    if meta is not None:
+        _SYNC.record(server_rel_url, meta, dest)
+        _SYNC._count("downloaded")
     return True
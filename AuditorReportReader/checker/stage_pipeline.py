@@ -0,0 +1,114 @@
+"""
+stage_pipeline.py — Bounded-queue producer/consumer pipeline for batch jobs.
+
+Used by sharepoint_pipeline: each company is a job dict that flows through
+a chain of stages (discover → download → OCR → LLM → fill → compare).  Every
+stage has its own worker threads and a bounded input queue, so
+
+  - network stages (listing, downloads) overlap CPU stages (OCR, fill) of
+    other companies,
+  - a fast upstream stage blocks once the next queue is full (backpressure),
+  - on_done fires as each job completes, not at the end of the batch.
+
+Stage contract:
+  fn(job) -> job     pass the (mutated) job to the next stage
+  fn(job) -> None    job finished early (fn stored its outcome on the job)
+  raises             job["error"] = "<stage>: <message>", finished
+
+A stage may give a priority(job) → sortable key; its queue then serves the
+lowest key first among the jobs waiting (e.g. batch_scheduler.dispatch_key).
+Only waiting jobs are compared, so such a stage usually also sets a larger
+queue_size (up to the whole batch) to choose from more than a couple.
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+_STOP = (float("inf"),)     # sorts after every real priority key
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[dict], Optional[dict]]
+    workers: int = 1
+    priority: Optional[Callable[[dict], tuple]] = None
+    queue_size: Optional[int] = None    # input queue bound; default run_stages' queue_size
+
+
+def run_stages(jobs: Iterable[dict], stages: list[Stage],
+               on_done: Callable[[dict], None], queue_size: int = 2) -> dict:
+    """
+    Push every job through stages; on_done(job) is called once per job
+    (serialised — safe to print from).  Returns per-stage busy seconds.
+    """
+    seq = itertools.count()
+    queues = [queue.PriorityQueue(maxsize=max(1, s.queue_size or queue_size)) for s in stages]
+    done_lock = threading.Lock()
+    busy = {s.name: 0.0 for s in stages}
+
+    def finish(job: dict) -> None:
+        with done_lock:
+            try:
+                on_done(job)
+            except Exception as exc:      # a reporting bug must not stall the pipeline
+                print(f"  [pipeline] on_done failed for {job.get('name', '?')}: {exc}")
+
+    def put(i: int, job: dict) -> None:
+        # The key can do I/O (dispatch_key profiles the PDF): a failure settles
+        # the job like a stage exception instead of killing the calling worker.
+        try:
+            key = stages[i].priority(job) if stages[i].priority else (0,)
+        except Exception as exc:
+            job["error"] = f"{stages[i].name}: priority: {exc}"
+            finish(job)
+            return
+        queues[i].put((key, next(seq), job))
+
+    def worker(i: int) -> None:
+        stage = stages[i]
+        while True:
+            _, _, job = queues[i].get()
+            if job is None:
+                return
+            t0 = time.perf_counter()
+            try:
+                out = stage.fn(job)
+            except Exception as exc:
+                job["error"] = f"{stage.name}: {exc}"
+                out = None
+            finally:
+                with done_lock:
+                    busy[stage.name] += time.perf_counter() - t0
+            if out is None:
+                finish(job)
+            elif i + 1 < len(stages):
+                put(i + 1, out)
+            else:
+                finish(out)
+
+    groups = []
+    for i, stage in enumerate(stages):
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True,
+                                    name=f"{stage.name}-{n}")
+                   for n in range(max(1, stage.workers))]
+        for t in threads:
+            t.start()
+        groups.append(threads)
+
+    for job in jobs:
+        put(0, job)
+    # Drain stage by stage: once a stage's workers have all stopped, nothing
+    # more can reach the next queue, so its workers can be told to stop too.
+    for i, threads in enumerate(groups):
+        for _ in threads:
+            queues[i].put((_STOP, next(seq), None))
+        for t in threads:
+            t.join()
+    return busy
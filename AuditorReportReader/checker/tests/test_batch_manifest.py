@@ -0,0 +1,82 @@
+"""
+Tests for checker/batch_manifest.py.
+Run with:  python test_batch_manifest.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))  # checker/
+import json
+import tempfile
+import unittest
+
+from batch_manifest import BatchManifest
+
+INPUTS = {"pdf": "aaa", "correct": "bbb"}
+
+
+class TestBatchManifest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "run_manifest.jsonl"
+
+    def test_completed_and_resumable(self):
+        m = BatchManifest(self.path)
+        m.start("Done", INPUTS, run_dir="/runs/1_Done")
+        m.stage("Done", "filled", filled=True)
+        m.done("Done", score_pct=91.5)
+        m.start("Crashed", INPUTS, run_dir="/runs/1_Crashed")
+        m.stage("Crashed", "filled", filled=True)
+        m.start("Failed", INPUTS)
+        m.fail("Failed", ValueError("boom"))
+
+        m = BatchManifest(self.path)
+        self.assertEqual(m.completed("Done", INPUTS)["score_pct"], 91.5)
+        self.assertTrue(m.completed("Done", INPUTS)["filled"])
+        self.assertIsNone(m.completed("Done", {**INPUTS, "pdf": "changed"}))
+        self.assertIsNone(m.resumable("Done", INPUTS))
+        self.assertIsNone(m.completed("Crashed", INPUTS))
+        self.assertEqual(m.resumable("Crashed", INPUTS)["run_dir"], "/runs/1_Crashed")
+        self.assertIsNone(m.resumable("Crashed", {**INPUTS, "correct": "changed"}))
+        self.assertEqual(m.resumable("Failed", INPUTS)["error"], "boom")
+        self.assertIsNone(m.last("Unknown"))
+        self.assertEqual(m.counts(), {"done": 1, "filled": 1, "failed": 1})
+
+        # A restart carries only what start() is given; a later stage drops the error.
+        m.start("Failed", INPUTS, run_dir="/runs/2_Failed")
+        self.assertEqual(m.last("Failed")["status"], "started")
+        self.assertNotIn("error", m.last("Failed"))
+
+    def test_torn_last_line_is_ignored(self):
+        m = BatchManifest(self.path)
+        m.start("A", INPUTS)
+        m.done("A", score_pct=80.0)
+        m.start("B", INPUTS)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"unit": "B", "status": "do')          # crash mid-write
+
+        m = BatchManifest(self.path)
+        self.assertEqual(m.completed("A", INPUTS)["score_pct"], 80.0)
+        self.assertEqual(m.last("B")["status"], "started")
+        m.done("B", score_pct=70.0)
+        self.assertEqual(BatchManifest(self.path).completed("B", INPUTS)["score_pct"], 70.0)
+
+    def test_compacts_to_one_line_per_unit_on_open(self):
+        m = BatchManifest(self.path)
+        for unit in ("A", "B"):
+            m.start(unit, INPUTS)
+            m.stage(unit, "filled", filled=True)
+            m.done(unit, score_pct=50.0)
+        self.assertEqual(len(self.path.read_text().splitlines()), 6)
+
+        BatchManifest(self.path)
+        lines = [json.loads(l) for l in self.path.read_text().splitlines()]
+        self.assertEqual([(r["unit"], r["status"]) for r in lines], [("A", "done"), ("B", "done")])
+        self.assertTrue(all(r["filled"] and r["inputs"] == INPUTS for r in lines))
+        self.assertEqual(list(self.path.parent.iterdir()), [self.path])   # no temp file left
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,90 @@
+"""
+Tests for checker/batch_scheduler.py (PDF profiles stubbed).
+Run with:  python test_batch_scheduler.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))  # checker/
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "extractor"))  # utils/, pipeline/
+import contextlib
+import io
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import batch_scheduler as bs
+
+# case name → profile; PDFs live at <case>/report.pdf
+PROFILES = {
+    "scan120":    {"pages": 120, "needs_ocr": True,  "ocr_cached_pages": 0,  "llm_cached": False},
+    "scan40":     {"pages": 40,  "needs_ocr": True,  "ocr_cached_pages": 0,  "llm_cached": False},
+    "half_ocr":   {"pages": 60,  "needs_ocr": True,  "ocr_cached_pages": 30, "llm_cached": False},
+    "digital":    {"pages": 50,  "needs_ocr": False, "ocr_cached_pages": 0,  "llm_cached": False},
+    "done_scan":  {"pages": 80,  "needs_ocr": True,  "ocr_cached_pages": 80, "llm_cached": True},
+    "done_text":  {"pages": 20,  "needs_ocr": False, "ocr_cached_pages": 0,  "llm_cached": True},
+    "ocr_only":   {"pages": 10,  "needs_ocr": True,  "ocr_cached_pages": 10, "llm_cached": False},
+}
+
+
+def _profile(pdf_path, dpi=300, pdf_hash=None):
+    return PROFILES[Path(pdf_path).parent.name]
+
+
+class TestBatchScheduler(unittest.TestCase):
+
+    def test_estimate_cost(self):
+        self.assertAlmostEqual(bs.estimate_cost(PROFILES["scan40"]),
+                               40 * bs.OCR_PAGE_S + bs.LLM_UNCACHED_S + bs.FILL_AND_DIFF_S)
+        self.assertAlmostEqual(bs.estimate_cost(PROFILES["half_ocr"]),
+                               30 * bs.OCR_PAGE_S + 30 * bs.TEXT_PAGE_S
+                               + bs.LLM_UNCACHED_S + bs.FILL_AND_DIFF_S)
+        self.assertAlmostEqual(bs.estimate_cost(PROFILES["done_text"]),
+                               20 * bs.TEXT_PAGE_S + bs.FILL_AND_DIFF_S)
+        self.assertTrue(bs.is_cached(PROFILES["done_scan"]))
+        self.assertFalse(bs.is_cached(PROFILES["ocr_only"]))     # LLM still to call
+        self.assertFalse(bs.is_cached({"pages": 0, "needs_ocr": True, "llm_cached": True}))
+
+    def test_order_cases_cached_cheapest_then_longest_first(self):
+        items = [f"{name}/report.pdf" for name in PROFILES]
+        with patch.object(bs, "pdf_profile", side_effect=_profile), \
+                contextlib.redirect_stdout(io.StringIO()) as out:
+            ordered = bs.order_cases(items, lambda p: p)
+        self.assertEqual([Path(p).parent.name for p in ordered],
+                         ["done_text", "done_scan",
+                          "scan120", "scan40", "half_ocr", "digital", "ocr_only"])
+        self.assertIn("2 cached, 5 to process", out.getvalue())
+
+    def test_ties_keep_input_order_and_dispatch_key_agrees(self):
+        items = [f"{name}/report.pdf" for name in ("scan40b", "done_text", "scan40", "scan120")]
+        with patch.dict(PROFILES, {"scan40b": PROFILES["scan40"]}), \
+                patch.object(bs, "pdf_profile", side_effect=_profile):
+            ordered = bs.order_cases(items, lambda p: p, verbose=False)
+            by_key = sorted(items, key=bs.dispatch_key)
+        self.assertEqual(ordered, ["done_text/report.pdf", "scan120/report.pdf",
+                                   "scan40b/report.pdf", "scan40/report.pdf"])
+        self.assertEqual(by_key, ordered)
+
+    def test_known_digest_is_not_recomputed(self):
+        from pipeline import pdf_ocr
+        from utils import json_cache
+        pdf = MagicMock()
+        pdf.__enter__.return_value = SimpleNamespace(
+            pages=[SimpleNamespace(extract_text=lambda: "")] * 4)
+        with patch("pdfplumber.open", return_value=pdf), \
+                patch.object(json_cache, "pdf_hash", side_effect=AssertionError("re-hashed")), \
+                patch.object(json_cache, "has_entries", return_value=True) as has_entries, \
+                patch.object(pdf_ocr, "cached_pages", return_value={1, 2, 3, 4}) as cached_pages:
+            profile = bs.pdf_profile("scan/report.pdf", pdf_hash="d41d8cd9")
+            ordered = bs.order_cases(["a/report.pdf", "b/report.pdf"], lambda p: p,
+                                     verbose=False, hash_of=lambda p: "md5-" + p[0])
+        self.assertEqual(profile, {"pages": 4, "needs_ocr": True, "ocr_cached_pages": 4,
+                                   "llm_cached": True})
+        self.assertEqual(cached_pages.call_args_list[0].kwargs["pdf_hash"], "d41d8cd9")
+        self.assertEqual([c.args for c in has_entries.call_args_list],
+                         [("d41d8cd9",), ("md5-a",), ("md5-b",)])
+        self.assertEqual(ordered, ["a/report.pdf", "b/report.pdf"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,74 @@
+"""
+Tests for checker/diff_checker.py.
+Run with:  python test_diff_checker.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))  # checker/
+import tempfile
+import unittest
+from unittest import mock
+
+import openpyxl
+
+import diff_checker
+
+
+def _workbook(path: Path, values: dict, sheet: str = "Summary of Information") -> None:
+    """Template-shaped sheet: labels in column B, FY2023 / FY2024 headers in row 4."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = sheet
+    ws.cell(4, 3, "FY2023")
+    ws.cell(4, 4, "FY2024")
+    for row, (label, (v23, v24)) in enumerate(values.items(), start=6):
+        ws.cell(row, 2, label)
+        ws.cell(row, 3, v23)
+        ws.cell(row, 4, v24)
+    wb.save(path)
+
+
+class TestCompare(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.tmp = Path(self._tmp.name)
+        patcher = mock.patch.object(diff_checker, "_ANSWER_CACHE_DIR", str(self.tmp / "cache"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_compare_classifies_and_caches_reference(self):
+        correct = {"Revenue": (1000, 2000), "Cost of sales": (400, 800),
+                   "Gross Profit": (600, 1200), "Taxes": (50, 90)}
+        filled  = {"Revenue": (1000, 2000), "Cost of sales": (-400, 800),
+                   "Gross Profit": (600, 1_200_000), "Taxes": (None, 90)}
+        _workbook(self.tmp / "correct.xlsx", correct)
+        _workbook(self.tmp / "filled.xlsx", filled, sheet="Summary")
+
+        with mock.patch("builtins.print"):
+            first = diff_checker.compare(str(self.tmp / "filled.xlsx"), str(self.tmp / "correct.xlsx"))
+        s = first["summary"]
+        self.assertEqual(first["years_compared"], ["2023", "2024"])
+        self.assertEqual((s["matched"], s["total"]), (5, 8))
+        self.assertEqual(s["by_category"], {"MATCH": 5, "SIGN_FLIP": 1,
+                                            "SCALE_x1000": 1, "MISSING": 1})
+
+        # Second run: the reference workbook is not opened again.
+        with mock.patch.object(diff_checker, "parse_workbook",
+                               wraps=diff_checker.parse_workbook) as parse, \
+             mock.patch("builtins.print"):
+            again = diff_checker.compare(str(self.tmp / "filled.xlsx"), str(self.tmp / "correct.xlsx"))
+        self.assertEqual(again, first)
+        self.assertEqual([c.args[0] for c in parse.call_args_list], [str(self.tmp / "filled.xlsx")])
+
+    def test_missing_sheet_is_an_error(self):
+        _workbook(self.tmp / "a.xlsx", {"Revenue": (1, 2)})
+        result = diff_checker.compare(str(self.tmp / "a.xlsx"), str(self.tmp / "a.xlsx"),
+                                      correct_sheet="Nope")
+        self.assertIn("Sheet 'Nope' not found", result["error"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
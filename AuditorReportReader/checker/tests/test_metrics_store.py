@@ -0,0 +1,82 @@
+"""
+Tests for checker/metrics_store.py.
+Run with:  python test_metrics_store.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))  # checker/
+import json
+import os
+import tempfile
+import unittest
+
+from metrics_store import MetricsStore
+
+
+def _snapshot(label: str, ts: str, companies: dict) -> dict:
+    """companies: {name: [(year, label, status, filled), ...]}"""
+    out = {}
+    for co, fields in companies.items():
+        matched = sum(1 for f in fields if f[2] == "MATCH")
+        out[co] = {"score_pct": round(100.0 * matched / len(fields), 1),
+                   "matched": matched, "total": len(fields), "by_category": {},
+                   "fields": [{"year": y, "label": l, "field": l.lower(), "status": s,
+                               "filled": v, "correct": 100} for y, l, s, v in fields]}
+    return {"label": label, "timestamp": ts, "overall_score": 0.0,
+            "total_matched": 0, "total_fields": 0, "companies": out}
+
+
+class TestMetricsStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.snaps = Path(self._tmp.name) / "snapshots"
+        self.snaps.mkdir()
+        self.db = Path(self._tmp.name) / "metrics.db"
+        self._write("base_20260101_000000.json", _snapshot("base", "2026-01-01T00:00:00", {
+            "Acme": [("2023", "Revenue", "MATCH", 100), ("2023", "Taxes", "MISSING", None)],
+            "Gone": [("2023", "Revenue", "MATCH", 100)],
+        }))
+        self._write("fix_20260201_000000.json", _snapshot("fix", "2026-02-01T00:00:00", {
+            "Acme": [("2023", "Revenue", "WRONG_VALUE", 7), ("2023", "Taxes", "MATCH", 100),
+                     ("2024", "Revenue", "MATCH", 100)],
+        }))
+
+    def _write(self, name: str, snap: dict) -> None:
+        (self.snaps / name).write_text(json.dumps(snap))
+
+    def test_compare_queries(self):
+        with MetricsStore(self.db, self.snaps) as store:
+            base, fix = store.find("base"), store.find("fix")
+            self.assertEqual(store.field_rollup(base["id"])["Revenue"],
+                             {"match": 2, "missing": 0, "wrong": 0, "total": 2})
+            pairs = store.field_pairs(base["id"], fix["id"], changes_only=True)
+            self.assertEqual(
+                [(p["company"], p["year"], p["label"],
+                  p["before"] and p["before"]["status"], p["after"] and p["after"]["status"])
+                 for p in pairs],
+                [("Acme", "2023", "Revenue", "MATCH", "WRONG_VALUE"),
+                 ("Acme", "2023", "Taxes", "MISSING", "MATCH"),
+                 ("Acme", "2024", "Revenue", None, "MATCH"),
+                 ("Gone", "2023", "Revenue", "MATCH", None)])
+            self.assertEqual(pairs[0]["after"]["filled"], 7)
+            self.assertEqual([(r["match"], r["total"]) for r in store.field_trend("Revenue")],
+                             [(2, 2), (1, 2)])
+
+    def test_sync_follows_snapshot_folder(self):
+        MetricsStore(self.db, self.snaps).close()
+        os.remove(self.snaps / "fix_20260201_000000.json")
+        self._write("base_20260101_000000.json", _snapshot("base", "2026-01-01T00:00:00", {
+            "Acme": [("2023", "Revenue", "MISSING", None)]}))
+        os.utime(self.snaps / "base_20260101_000000.json", (1, 1))   # mtime surely differs
+
+        with MetricsStore(self.db, self.snaps) as store:
+            self.assertEqual([s["label"] for s in store.snapshots()], ["base"])
+            self.assertEqual(store.companies(), ["Acme"])
+            self.assertEqual([r["score_pct"] for r in store.company_history("Acme")], [0.0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
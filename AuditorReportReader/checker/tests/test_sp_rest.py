@@ -0,0 +1,301 @@
+"""
+Tests for checker/sp_rest.py against a local fake SharePoint REST server.
+Run with:  python test_sp_rest.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))  # checker/
+import json
+import re
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import sp_rest
+
+
+def _text_pdf(pages: int, pad: int) -> bytes:
+    """A text PDF of `pages` pages, each followed by an unreferenced pad-byte stream."""
+    objs = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+            3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for i in range(pages):
+        page, content, filler = 4 + 3 * i, 5 + 3 * i, 6 + 3 * i
+        text = f"BT /F1 12 Tf 72 720 Td (Audited Financial Statements 2023 page {i + 1}) Tj ET"
+        objs[page] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                      f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content} 0 R >>").encode()
+        objs[content] = f"<< /Length {len(text)} >>\nstream\n{text}\nendstream".encode()
+        objs[filler] = f"<< /Length {pad} >>\nstream\n".encode() + b"\0" * pad + b"\nendstream"
+        kids.append(f"{page} 0 R")
+    objs[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), {}
+    for num in sorted(objs):
+        offsets[num] = len(out)
+        out += f"{num} 0 obj\n".encode() + objs[num] + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offsets[n]:010d} 00000 n \n".encode() for n in sorted(objs))
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+class _FakeSharePoint(BaseHTTPRequestHandler):
+    """
+    /_api/web/GetFolderByServerRelativeUrl('<path>')/Folders|Files  → listing
+    /_api/web/GetFileByServerRelativeUrl('<path>')/$value          → file body
+    Every `throttle_every`-th request gets a 429 with Retry-After: 0; a file
+    named *truncated* promises more bytes than it sends; Range requests get a
+    206 slice while `ranges` is on.
+    """
+
+    folders = {}          # path → [subfolder names]
+    files = {}            # path → bytes
+    modified = {}         # folder or file path → TimeLastModified
+    throttle_every = 0
+    delay_s = 0.0
+    ranges = True
+    lock = threading.Lock()
+    requests = 0
+    active = 0
+    max_active = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body=b"", headers=None):
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass        # client hung up early (e.g. a RangedFile giving up on a 200)
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            n = cls.requests
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(cls.delay_s)
+            if cls.throttle_every and n % cls.throttle_every == 0:
+                return self._send(429, b"slow down", {"Retry-After": "0"})
+            url = urllib.parse.unquote(self.path)
+            m = re.search(r"GetFolderByServerRelativeUrl\('(.*)'\)/(Folders|Files)", url)
+            if m:
+                path, kind = m.groups()
+                if kind == "Folders":
+                    items = [{"Name": f, "ServerRelativeUrl": f"{path}/{f}",
+                              "TimeLastModified": cls.modified.get(f"{path}/{f}", "2024-01-01")}
+                             for f in cls.folders.get(path, [])]
+                else:
+                    items = [{"Name": p.rsplit("/", 1)[1], "ServerRelativeUrl": p,
+                              "Length": str(len(b)),
+                              "TimeLastModified": cls.modified.get(p, "2024-01-01")}
+                             for p, b in cls.files.items() if p.rsplit("/", 1)[0] == path]
+                return self._send(200, json.dumps({"d": {"results": items}}).encode())
+            m = re.search(r"GetFileByServerRelativeUrl\('(.*)'\)/\$value", url)
+            if m and m.group(1) in cls.files:
+                body = cls.files[m.group(1)]
+                if "truncated" in m.group(1):
+                    return self._send(200, body[: len(body) // 2],
+                                      {"Content-Length": str(len(body))})
+                rng = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+                if rng and cls.ranges:
+                    lo, hi = int(rng.group(1)), int(rng.group(2))
+                    return self._send(206, body[lo:hi + 1],
+                                      {"Content-Range": f"bytes {lo}-{hi}/{len(body)}"})
+                return self._send(200, body)
+            self._send(404, b"not found")
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+class TestSpRest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeSharePoint)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls._saved = (sp_rest._SP_API, sp_rest._authenticated, sp_rest._THROTTLE)
+        sp_rest._SP_API = f"http://127.0.0.1:{cls.server.server_port}/_api"
+        sp_rest._authenticated = True
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        sp_rest._SP_API, sp_rest._authenticated, sp_rest._THROTTLE = cls._saved
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.addCleanup(setattr, sp_rest, "_SYNC", sp_rest._SYNC)
+        sp_rest._SYNC = sp_rest._SyncCache(Path(self._tmp.name) / "sync")
+        sp_rest._THROTTLE = sp_rest._Throttle()
+        srv = _FakeSharePoint
+        srv.requests = srv.active = srv.max_active = 0
+        srv.throttle_every, srv.delay_s = 0, 0.0
+        srv.modified = {}
+        srv.ranges = True
+        srv.folders = {"/root": [f"Co{i:02d}" for i in range(20)]}
+        srv.folders.update({f"/root/Co{i:02d}": ["Financial Statements", "Credit Underwriting"]
+                            for i in range(20)})
+        srv.files = {"/root/Co00/Financial Statements/report.pdf": b"%PDF-" + b"x" * 200_000,
+                     "/root/Co00/Financial Statements/truncated.pdf": b"%PDF-" + b"y" * 200_000}
+
+    def test_concurrent_crawl_survives_429s(self):
+        _FakeSharePoint.throttle_every = 3
+        _FakeSharePoint.delay_s = 0.02
+        companies = sp_rest.list_subfolders("/root")
+        listings = sp_rest.map_concurrent(
+            lambda c: sp_rest.list_subfolders(c["ServerRelativeUrl"]), companies, workers=8)
+
+        self.assertEqual(len(companies), 20)
+        for listing in listings:
+            self.assertNotIsInstance(listing, Exception)
+            self.assertEqual([f["Name"] for f in listing],
+                             ["Financial Statements", "Credit Underwriting"])
+        self.assertGreater(sp_rest._THROTTLE.throttled, 0)
+        self.assertGreater(_FakeSharePoint.max_active, 1)
+
+    def test_download_is_atomic(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = Path(tmp) / "out" / "report.pdf"
+            self.assertTrue(sp_rest.download("/root/Co00/Financial Statements/report.pdf", dest))
+            self.assertEqual(dest.stat().st_size, 200_005)
+            self.assertFalse(sp_rest.download("/root/Co00/Financial Statements/report.pdf", dest))
+
+            bad = Path(tmp) / "out" / "truncated.pdf"
+            with self.assertRaises(Exception):
+                sp_rest.download("/root/Co00/Financial Statements/truncated.pdf", bad)
+            self.assertFalse(bad.exists())
+            self.assertEqual(sorted(p.name for p in bad.parent.iterdir()), ["report.pdf"])
+
+    def _sync(self, dest_dir: Path) -> bool:
+        """One company's crawl + download; True if the PDF was (re)downloaded."""
+        fin = sp_rest.find_subfolder(sp_rest.list_subfolders("/root/Co00"), "Financial Statements")
+        item = sp_rest.get_latest_file(sp_rest.list_files(fin["ServerRelativeUrl"]), {".pdf"},
+                                       name_contains="report")
+        return sp_rest.download(item["ServerRelativeUrl"], dest_dir / "report.pdf", meta=item)
+
+    def test_incremental_sync_skips_unchanged_folders_and_files(self):
+        sync_dir = Path(self._tmp.name) / "sync"
+        dest_dir = Path(self._tmp.name) / "inbox"
+        sp_rest.list_subfolders("/root")
+        self.assertTrue(self._sync(dest_dir))
+        sp_rest.save_sync_cache()
+
+        # Re-run (fresh process state, cache on disk): nothing changed → no requests.
+        sp_rest._SYNC = sp_rest._SyncCache(sync_dir)
+        before = _FakeSharePoint.requests
+        sp_rest.list_subfolders("/root")
+        self.assertFalse(self._sync(dest_dir))
+        self.assertEqual(_FakeSharePoint.requests, before)
+
+        # Same file name, new content: the changed folders are re-listed and the
+        # file is refreshed; the root listing is re-read once its TTL lapses.
+        path = "/root/Co00/Financial Statements/report.pdf"
+        _FakeSharePoint.files[path] = b"%PDF-v2"
+        _FakeSharePoint.modified.update({path: "2025-06-01", "/root/Co00": "2025-06-01",
+                                         "/root/Co00/Financial Statements": "2025-06-01"})
+        sp_rest._SYNC = sp_rest._SyncCache(sync_dir, ttl=0)
+        sp_rest.list_subfolders("/root")
+        self.assertTrue(self._sync(dest_dir))
+        self.assertEqual((dest_dir / "report.pdf").read_bytes(), b"%PDF-v2")
+        self.assertEqual(sp_rest._SYNC.stats["listed"], 3)
+
+    def test_ranged_file_reads_first_pages_only(self):
+        import pdfplumber
+        path = "/root/Co00/Financial Statements/big.pdf"
+        body = _text_pdf(pages=30, pad=100_000)
+        _FakeSharePoint.files[path] = body
+
+        with sp_rest.RangedFile(path, len(body)) as rf:
+            with pdfplumber.open(rf) as pdf:
+                text = "".join(p.extract_text() for p in pdf.pages[:3])
+        self.assertIn("Audited Financial Statements 2023 page 3", text)
+        self.assertIsNone(rf.failed)
+        self.assertLess(rf.fetched, len(body) // 4)
+
+        _FakeSharePoint.ranges = False      # server ignores Range → caller must fall back
+        with sp_rest.RangedFile(path, len(body)) as rf:
+            with self.assertRaises(sp_rest.RangeNotSupported):
+                rf.read(10)
+
+    def test_ranged_read_fetches_only_missing_blocks(self):
+        path = "/root/Co00/Financial Statements/report.pdf"
+        body = _FakeSharePoint.files[path]
+        with sp_rest.RangedFile(path, len(body), block_size=1000) as rf:
+            rf.seek(1000); rf.read(1000)            # block 1
+            rf.seek(3500); rf.read(10)              # block 3
+            rf.seek(0)
+            data = rf.read(6000)                    # blocks 0-5: fetches 0, 2 and 4-5
+        self.assertEqual(data, body[:6000])
+        self.assertEqual((rf.requests, rf.fetched), (5, 6000))
+
+
+    def test_resume_key_follows_selected_files_not_the_company_folder(self):
+        sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "downloader"))
+        import sp_to_training
+
+        pdf = "/root/Co01/Financial Statements/Audited 2023.pdf"
+        xlsx = "/root/Co01/Credit Underwriting/CAWF Co01.xlsx"
+        _FakeSharePoint.files.update({pdf: b"%PDF-v1", xlsx: b"xlsx"})
+        company = {"Name": "Co01", "ServerRelativeUrl": "/root/Co01",
+                   "TimeLastModified": "2024-01-01"}
+        sp_rest.use_listing_cache(False)        # this test's own _SYNC, dropped in cleanup
+
+        def key():
+            sel = sp_to_training.select_company_files(company)
+            self.assertEqual((sel["pdf"]["ServerRelativeUrl"], sel["cawf"]["ServerRelativeUrl"]),
+                             (pdf, xlsx))
+            return sp_to_training.selection_inputs(sel)
+
+        before = key()
+        self.assertEqual(before["pdf"], {"name": "Audited 2023.pdf", "length": "7",
+                                         "modified": "2024-01-01"})
+        # The report is replaced in place; the company folder's stamp does not move.
+        _FakeSharePoint.files[pdf] = b"%PDF-v2 restated"
+        _FakeSharePoint.modified[pdf] = "2025-03-01"
+        after = key()
+        self.assertNotEqual(after, before)
+        self.assertEqual(after["cawf"], before["cawf"])
+        self.assertEqual(company["TimeLastModified"], "2024-01-01")
+
+
+    def test_peek_without_text_is_not_memoised(self):
+        sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "downloader"))
+        import sp_to_training
+
+        good = "/root/Co00/Financial Statements/fs.pdf"
+        blank = "/root/Co00/Financial Statements/scan.pdf"
+        _FakeSharePoint.files.update({good: _text_pdf(pages=2, pad=10), blank: b"%PDF-1.4 scan"})
+        files = {f["ServerRelativeUrl"]: f
+                 for f in sp_rest.list_files("/root/Co00/Financial Statements")}
+
+        def peek(path):
+            f = files[path]
+            return sp_rest.memo_by_meta("peek", f, lambda: sp_to_training._peek_remote(f))
+
+        with patch.dict(sys.modules, {"pytesseract": None}):    # no OCR fallback here
+            with self.assertRaises(ValueError):
+                peek(blank)
+            self.assertEqual(peek(good), {"fs": True, "year": 2023, "mode": "ranged"})
+        self.assertEqual(sorted(sp_rest._SYNC.memo), [f"peek:{good}"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,117 @@
+"""
+Tests for checker/stage_pipeline.py.
+Run with:  python test_stage_pipeline.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))  # checker/
+import threading
+import time
+import unittest
+
+from stage_pipeline import Stage, run_stages
+
+
+class TestRunStages(unittest.TestCase):
+
+    def test_stages_overlap_and_every_job_finishes_once(self):
+        active, peak, lock = set(), [0], threading.Lock()
+
+        def work(name):
+            def fn(job):
+                with lock:
+                    active.add(name)
+                    peak[0] = max(peak[0], len(active))
+                time.sleep(0.02)
+                with lock:
+                    active.discard(name)
+                job.setdefault("trail", []).append(name)
+                if name == "a" and job["id"] == 3:
+                    return None                     # settled early
+                if name == "b" and job["id"] == 4:
+                    raise ValueError("boom")
+                return job
+            return fn
+
+        jobs = [{"id": i} for i in range(8)]
+        done = []
+        busy = run_stages(jobs, [Stage("a", work("a")), Stage("b", work("b")),
+                                 Stage("c", work("c"))], done.append, queue_size=1)
+
+        self.assertEqual(sorted(j["id"] for j in done), list(range(8)))
+        self.assertEqual(jobs[3]["trail"], ["a"])
+        self.assertEqual(jobs[4]["error"], "b: boom")
+        self.assertEqual(jobs[0]["trail"], ["a", "b", "c"])
+        self.assertGreater(peak[0], 1)              # different stages ran at once
+        self.assertGreater(busy["a"], 0.1)
+
+    def test_priority_queue_serves_lowest_key_first(self):
+        gate = threading.Event()
+        order = []
+
+        def ocr(job):
+            if job["id"] == 0:
+                gate.wait(5)        # hold the only worker while the rest queue up
+            order.append(job["id"])
+            return job
+
+        jobs = [{"id": i, "cost": c} for i, c in enumerate([9, 1, 5, 3])]
+        t = threading.Thread(target=run_stages, args=(
+            jobs, [Stage("ocr", ocr, priority=lambda j: (-j["cost"],))], lambda job: None),
+            kwargs={"queue_size": 8})
+        t.start()
+        time.sleep(0.1)
+        gate.set()
+        t.join(5)
+        self.assertEqual(order, [0, 2, 3, 1])      # then biggest cost first
+
+    def test_big_job_arriving_late_is_still_served_first(self):
+        """Fast upstream, busy priority stage: with the default bound of 2 the
+        costly last job cannot even enter the queue; with room for the batch
+        it overtakes everything that queued before it."""
+        def run(ocr_queue):
+            gate, order = threading.Event(), []
+
+            def ocr(job):
+                if job["id"] == 0:
+                    gate.wait(0.5)      # bounded queue: job 6 never gets in, so time out
+                order.append(job["id"])
+                return job
+
+            def download(job):
+                if job["id"] == 6:
+                    gate.set()          # the costly one arrives after the queue filled up
+                return job
+
+            jobs = [{"id": i, "cost": c} for i, c in enumerate([1, 1, 2, 3, 4, 5, 99])]
+            run_stages(jobs, [Stage("download", download),
+                              Stage("ocr", ocr, priority=lambda j: (-j["cost"],),
+                                    queue_size=ocr_queue)], lambda job: None, queue_size=2)
+            return order
+
+        self.assertEqual(run(ocr_queue=7), [0, 6, 5, 4, 3, 2, 1])
+        self.assertNotEqual(run(ocr_queue=None)[1], 6)
+
+    def test_failing_priority_settles_the_job(self):
+        def key(job):
+            if job["id"] == 2:
+                raise OSError("pdf vanished")
+            return (job["id"],)
+
+        done = []
+        jobs = [{"id": i} for i in range(6)]
+        t = threading.Thread(target=run_stages, args=(
+            jobs, [Stage("download", lambda j: j), Stage("ocr", lambda j: j, priority=key,
+                                                         queue_size=1)], done.append),
+            kwargs={"queue_size": 1})
+        t.start()
+        t.join(5)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(sorted(j["id"] for j in done), list(range(6)))
+        self.assertEqual(jobs[2]["error"], "ocr: priority: pdf vanished")
+        self.assertNotIn("error", jobs[3])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,175 @@
+"""
+Tests for the checker/training_manager.py case schedulers (stages stubbed).
+Run with:  python test_training_manager.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))  # checker/
+import contextlib
+import io
+import json
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import training_manager
+from batch_manifest import BatchManifest, file_hash
+
+NAMES = ["Alpha", "Bravo", "Charlie", "Delta"]
+
+
+class TestRunCases(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+        self.spans, self._lock = [], threading.Lock()
+        self.failing = set()
+
+    def _case(self, name: str) -> dict:
+        case_dir = self.root / "cases" / name
+        run_dir = self.root / "runs" / f"20260101_000000_{name}"
+        case_dir.mkdir(parents=True, exist_ok=True)
+        run_dir.mkdir(parents=True, exist_ok=True)
+        return {"name": name, "ts": "20260101_000000", "case_dir": case_dir,
+                "run_dir": run_dir, "pdf_path": case_dir / "report.pdf",
+                "correct_path": case_dir / "correct.xlsx",
+                "filled_path": run_dir / "filled.xlsx", "skip_extract": False}
+
+    def _stage(self, stage: str, name: str, seconds: float = 0.03):
+        t0 = time.perf_counter()
+        time.sleep(seconds)
+        with self._lock:
+            self.spans.append((stage, name, t0, time.perf_counter()))
+        if (stage, name) in self.failing:
+            raise RuntimeError(f"{stage} boom")
+
+    # stubs with the real stage signatures
+
+    def _ocr(self, pdf_path):
+        name = Path(pdf_path).parent.name
+        self._stage("ocr", name)
+        return [{"page": 1, "text": name}], "2024"
+
+    def _llm(self, pdf_path, pages, year, api_key, model, no_cache=False):
+        self._stage("llm", pages[0]["text"])
+        return {"name": pages[0]["text"], "year": year}
+
+    def _fill(self, results, year, output_path):
+        self._stage("fill", results["name"], 0.01)
+        Path(output_path).write_text(results["name"])
+
+    def _diff(self, case):
+        self._stage("diff", case["name"], 0.01)
+        n = len(case["name"])
+        return {"summary": {"score_pct": 10.0 * n, "matched": n, "total": 10,
+                            "by_category": {"income": n}}}
+
+    def _run(self, jobs: int, scores: Path, manifest: BatchManifest) -> tuple:
+        cases = [self._case(n) for n in NAMES]
+        for case in cases:
+            manifest.start(case["name"], {"pdf": case["name"]}, run_dir=str(case["run_dir"]))
+        with patch.object(training_manager, "_SCORES", scores), \
+                patch.object(training_manager, "_check_template"), \
+                patch.object(training_manager, "_ocr_stage", self._ocr), \
+                patch.object(training_manager, "_llm_stage", self._llm), \
+                patch.object(training_manager, "_fill_stage", self._fill), \
+                patch.object(training_manager, "_diff_stage", self._diff), \
+                patch.object(training_manager.diff_checker, "print_report"), \
+                contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            if jobs > 1:
+                return training_manager._run_cases_parallel(cases, "key", "model", False,
+                                                            jobs, manifest)
+            return training_manager._run_cases_serial(cases, "key", "model", False, manifest)
+
+    def test_parallel_overlaps_stages_and_matches_serial_scores(self):
+        serial = self.root / "serial_scores.json"
+        parallel = self.root / "parallel_scores.json"
+        self._run(1, serial, BatchManifest(self.root / "serial.jsonl"))
+        self.spans.clear()
+        diffs, timings = self._run(4, parallel, BatchManifest(self.root / "parallel.jsonl"))
+
+        self.assertEqual(json.loads(parallel.read_text()), json.loads(serial.read_text()))
+        self.assertEqual(sorted(n for n, _ in diffs), NAMES)
+        self.assertTrue(all("llm" in timings[n] and "total" in timings[n] for n in NAMES))
+        # some case's LLM stage ran while another case was still in OCR
+        ocr = [s for s in self.spans if s[0] == "ocr"]
+        llm = [s for s in self.spans if s[0] == "llm"]
+        self.assertTrue(any(a[1] != b[1] and a[2] < b[3] and b[2] < a[3]
+                            for a in ocr for b in llm))
+
+    def test_failed_case_does_not_stop_the_others(self):
+        self.failing = {("llm", "Bravo"), ("ocr", "Delta")}
+        for jobs in (1, 3):
+            with self.subTest(jobs=jobs):
+                scores = self.root / f"scores_{jobs}.json"
+                manifest = BatchManifest(self.root / f"manifest_{jobs}.jsonl")
+                diffs, timings = self._run(jobs, scores, manifest)
+
+                self.assertEqual(sorted(n for n, _ in diffs), ["Alpha", "Charlie"])
+                self.assertEqual(sorted(json.loads(scores.read_text())), ["Alpha", "Charlie"])
+                self.assertTrue(timings["Bravo"]["failed"] and timings["Delta"]["failed"])
+                self.assertEqual(manifest.last("Bravo")["status"], "failed")
+                self.assertEqual(manifest.last("Bravo")["error"], "llm boom")
+                self.assertEqual(manifest.last("Alpha")["status"], "done")
+                self.assertTrue(manifest.last("Alpha")["filled"])
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        root = Path(self._tmp.name)
+        for attr, sub in (("_CASES", "cases"), ("_RUNS", "runs")):
+            patcher = patch.object(training_manager, attr, root / sub)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+            (root / sub).mkdir()
+        self.manifest_path = root / "run_manifest.jsonl"
+        for name in ("Acme", "Beta"):
+            case_dir = root / "cases" / name
+            case_dir.mkdir()
+            (case_dir / "report.pdf").write_bytes(b"%PDF-" + name.encode())
+            (case_dir / "correct.xlsx").write_bytes(b"xlsx-" + name.encode())
+
+    def _prepare(self, name, resume=True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return training_manager._prepare_case(name, BatchManifest(self.manifest_path), resume)
+
+    def test_interrupted_case_reuses_its_run_dir(self):
+        first = self._prepare("Acme", resume=False)
+        self.assertEqual(first["pdf_hash"], file_hash(first["pdf_path"]))   # for the scheduler
+        (first["run_dir"] / "filled.xlsx").write_bytes(b"filled")
+        BatchManifest(self.manifest_path).stage("Acme", "filled", filled=True)
+        # crash here: no diff, no done
+
+        again = self._prepare("Acme")
+        self.assertEqual(again["run_dir"], first["run_dir"])
+        self.assertEqual(again["ts"], first["ts"])
+        self.assertTrue(again["skip_extract"])          # straight to the diff
+        self.assertEqual(len(list(training_manager._RUNS.iterdir())), 1)
+
+        # Interrupted before filled.xlsx was written: same directory, extract again.
+        (first["run_dir"] / "filled.xlsx").unlink()
+        BatchManifest(self.manifest_path).stage("Acme", "filled", filled=True)
+        self.assertFalse(self._prepare("Acme")["skip_extract"])
+
+    def test_done_case_is_skipped_until_its_inputs_change(self):
+        case = self._prepare("Beta", resume=False)
+        BatchManifest(self.manifest_path).done("Beta", score_pct=88.0)
+        self.assertIsNone(self._prepare("Beta"))
+
+        (case["case_dir"] / "correct.xlsx").write_bytes(b"xlsx-Beta-v2")
+        rerun = self._prepare("Beta")
+        self.assertIsNotNone(rerun)
+        self.assertFalse(rerun["skip_extract"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -13,6 +13,8 @@ Individual commands:
   python training_manager.py list
   python training_manager.py run --case Foo
   python training_manager.py run --case Foo --no-cache
+  python training_manager.py run --jobs 4          ← overlap OCR / Gemini / diff across cases
+  python training_manager.py run --resume          ← after a crash: skip finished cases
   python training_manager.py report
   python training_manager.py diff --case Foo     ← re-diff last run without re-extracting
 
@@ -26,6 +28,9 @@ import os
 import re
 import shutil
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -46,7 +51,9 @@ if _env.exists():
             _k, _, _v = _line.partition("=")
             os.environ.setdefault(_k.strip(), _v.strip())
 
+import batch_scheduler
 import diff_checker
+from batch_manifest import BatchManifest, file_hash
 
 # ---------------------------------------------------------------------------
 # directory layout
@@ -58,6 +65,7 @@ _RUNS       = _TRAINING / "runs"
 _INBOX      = _TRAINING / "inbox"
 _SCORES     = _TRAINING / "scores.json"
 _PATTERNS   = _TRAINING / "patterns.json"
+_MANIFEST   = _TRAINING / "run_manifest.jsonl"
 
 _TEMPLATE   = _ROOT / "Financial Statements Template.xlsx"
 
@@ -78,7 +86,9 @@ def _load_scores() -> dict:
 
 
 def _save_scores(scores: dict):
-    _SCORES.write_text(json.dumps(scores, indent=2, default=str))
+    tmp = _SCORES.with_name(f"{_SCORES.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(scores, indent=2, default=str))
+    os.replace(tmp, _SCORES)
 
 
 def _load_patterns() -> dict:
@@ -165,22 +175,22 @@ def cmd_inbox():
 # ---------------------------------------------------------------------------
 # extraction runner
 # ---------------------------------------------------------------------------
+# One case = OCR → Gemini → Excel fill → diff.  The stages are separate
+# functions so `run --jobs N` can overlap them across cases (see
+# _run_cases_parallel); _run_extraction chains the first three for one PDF.
 
-def _run_extraction(pdf_path: str, output_path: str,
-                    api_key: str, model: str, no_cache: bool = False):
-    """Run the full AuditorReportReader pipeline on one PDF."""
-    from utils import json_cache
-    from pipeline.pdf_ocr import extract_pages, full_text
-    from pipeline.gemini_extractor import GeminiExtractor
-    from pipeline.validator import run_checks
-    from pipeline.excel_filler import write_output
-
+def _check_template():
     if not _TEMPLATE.exists():
         raise FileNotFoundError(
             f"Template not found: {_TEMPLATE}\n"
             "Place 'Financial Statements Template.xlsx' next to training_manager.py"
         )
 
+
+def _ocr_stage(pdf_path: str) -> tuple:
+    """OCR (or text layer) → (pages, regex-detected target year)."""
+    from pipeline.pdf_ocr import extract_pages, full_text
+
     pages = extract_pages(str(pdf_path), dpi=300)
     all_text = full_text(pages)
 
@@ -194,6 +204,14 @@ def _run_extraction(pdf_path: str, output_path: str,
     )
     if m:
         target_year = next(g for g in m.groups() if g)
+    return pages, target_year
+
+
+def _llm_stage(pdf_path: str, pages: list, target_year: str,
+               api_key: str, model: str, no_cache: bool = False) -> dict:
+    """The four Gemini calls (rate-limited process-wide by utils/llm_client)."""
+    from utils import json_cache
+    from pipeline.gemini_extractor import GeminiExtractor
 
     file_hash = json_cache.pdf_hash(str(pdf_path))
     if no_cache:
@@ -205,7 +223,13 @@ def _run_extraction(pdf_path: str, output_path: str,
         pages=pages, target_year=target_year, hints={},
         api_key=api_key, model=model,
     )
-    results = extractor.extract_all(pdf_hash_val=file_hash)
+    return extractor.extract_all(pdf_hash_val=file_hash)
+
+
+def _fill_stage(results: dict, target_year: str, output_path: str):
+    """Validation checks + write the filled template."""
+    from pipeline.validator import run_checks
+    from pipeline.excel_filler import write_output
 
     audit_checks = results["audit_checks"]
     financial_data = results["financial_data"]
@@ -237,89 +261,262 @@ def _run_extraction(pdf_path: str, output_path: str,
     )
 
 
+def _run_extraction(pdf_path: str, output_path: str,
+                    api_key: str, model: str, no_cache: bool = False):
+    """Run the full AuditorReportReader pipeline on one PDF."""
+    _check_template()
+    pages, target_year = _ocr_stage(pdf_path)
+    results = _llm_stage(pdf_path, pages, target_year, api_key, model, no_cache)
+    _fill_stage(results, target_year, output_path)
+
+
+def _diff_stage(case: dict) -> dict:
+    """Keep a copy for re-diffing later, diff against correct.xlsx, save diff.json."""
+    shutil.copy2(str(case["filled_path"]), case["case_dir"] / "last_filled.xlsx")
+    diff_results = diff_checker.compare(str(case["filled_path"]), str(case["correct_path"]))
+    (case["run_dir"] / "diff.json").write_text(json.dumps(diff_results, indent=2, default=str))
+    return diff_results
+
+
 # ---------------------------------------------------------------------------
 # run command
 # ---------------------------------------------------------------------------
 
-def cmd_run(case_name: str = "", api_key: str = "",
-            model: str = "gemini-2.5-flash-lite", no_cache: bool = False):
-    """Run extraction + diff on all cases (or one specific case)."""
-    _ensure_dirs()
+_scores_lock = threading.Lock()
 
-    if not api_key:
-        api_key = os.environ.get("GEMINI_API_KEY", "")
-    if not api_key:
-        print("[ERROR] Gemini API key required. Set GEMINI_API_KEY or use --api-key.")
-        return
 
-    # Determine which cases to run
-    if case_name:
-        cases = [case_name]
-    else:
-        cases = sorted(d.name for d in _CASES.iterdir() if d.is_dir())
+def _record_score(case: dict, diff_results: dict):
+    """Merge one case's score into scores.json as soon as it completes.
 
-    if not cases:
-        print("[Training] No cases found. Use 'add' or 'inbox' first.")
-        return
+    Re-reads the file under a lock and replaces it atomically, so a crash
+    mid-run keeps every finished case and never leaves a torn file."""
+    s = diff_results.get("summary", {})
+    with _scores_lock:
+        scores = _load_scores()
+        scores[case["name"]] = {
+            "last_run":     case["ts"],
+            "score_pct":    s.get("score_pct", 0),
+            "matched":      s.get("matched", 0),
+            "total":        s.get("total", 0),
+            "by_category":  s.get("by_category", {}),
+            "run_dir":      str(case["run_dir"]),
+        }
+        _save_scores(scores)
 
-    scores = _load_scores()
-    all_diffs = []
 
-    for name in cases:
-        case_dir = _CASES / name
-        pdf_path = case_dir / "report.pdf"
-        correct_path = case_dir / "correct.xlsx"
+def _prepare_case(name: str, manifest: BatchManifest,
+                  resume: bool = False) -> Optional[dict]:
+    """
+    Build the case dict and mark it started in the run manifest.  With resume,
+    a case that finished on these same inputs is skipped (None), and one that
+    was interrupted reuses its run directory — going straight to the diff if
+    filled.xlsx was already written.
+    """
+    case_dir = _CASES / name
+    pdf_path = case_dir / "report.pdf"
+    correct_path = case_dir / "correct.xlsx"
+
+    if not pdf_path.exists():
+        print(f"\n  [SKIP] {name}: report.pdf missing"); return None
+    if not correct_path.exists():
+        print(f"\n  [SKIP] {name}: correct.xlsx missing"); return None
 
-        if not pdf_path.exists():
-            print(f"\n  [SKIP] {name}: report.pdf missing"); continue
-        if not correct_path.exists():
-            print(f"\n  [SKIP] {name}: correct.xlsx missing"); continue
+    inputs = {"pdf": file_hash(pdf_path), "correct": file_hash(correct_path)}
+    prev = manifest.resumable(name, inputs) if resume else None
+    if resume and manifest.completed(name, inputs):
+        print(f"  [resume] {name}: already done — skipped")
+        return None
 
+    if prev and prev.get("run_dir") and Path(prev["run_dir"]).is_dir():
+        ts, run_dir = prev["ts_run"], Path(prev["run_dir"])
+    else:
+        prev = None
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         run_dir = _RUNS / f"{ts}_{name}"
-        run_dir.mkdir()
-        filled_path = run_dir / "filled.xlsx"
-
+        run_dir.mkdir(exist_ok=True)
+    case = {
+        "name": name, "ts": ts, "case_dir": case_dir, "run_dir": run_dir,
+        "pdf_path": pdf_path, "pdf_hash": inputs["pdf"], "correct_path": correct_path,
+        "filled_path": run_dir / "filled.xlsx",
+        "skip_extract": bool(prev and prev.get("filled")
+                             and (run_dir / "filled.xlsx").exists()),
+    }
+    if prev:
+        stage = "diff only" if case["skip_extract"] else "re-extracting"
+        print(f"  [resume] {name}: interrupted run {run_dir.name} — {stage}")
+    manifest.start(name, inputs, ts_run=ts, run_dir=str(run_dir))
+    return case
+
+
+def _timed(timings: dict, stage: str, fn, *args):
+    t0 = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[stage] = time.perf_counter() - t0
+
+
+def _run_cases_serial(cases: list, api_key: str, model: str, no_cache: bool,
+                      manifest: BatchManifest) -> tuple:
+    all_diffs, timings = [], {}
+    for case in cases:
+        name = case["name"]
         print(f"\n{'='*64}")
         print(f"  Case: {name}")
         print(f"{'='*64}")
+        t = timings[name] = {}
+        t0 = time.perf_counter()
 
         # Extract
         try:
-            _run_extraction(
-                pdf_path=str(pdf_path),
-                output_path=str(filled_path),
-                api_key=api_key,
-                model=model,
-                no_cache=no_cache,
-            )
+            if not case["skip_extract"]:
+                _check_template()
+                pages, year = _timed(t, "ocr", _ocr_stage, case["pdf_path"])
+                results = _timed(t, "llm", _llm_stage, case["pdf_path"], pages, year,
+                                 api_key, model, no_cache)
+                _timed(t, "fill", _fill_stage, results, year, str(case["filled_path"]))
+                manifest.stage(name, "filled", filled=True)
         except Exception as e:
             print(f"  [ERROR] Extraction failed: {e}")
             import traceback; traceback.print_exc()
+            t["failed"] = True
+            manifest.fail(name, e)
             continue
 
-        # Also save a copy in the case dir for re-diffing later
-        shutil.copy2(str(filled_path), case_dir / "last_filled.xlsx")
-
         # Diff
-        diff_results = diff_checker.compare(str(filled_path), str(correct_path))
-        diff_path = run_dir / "diff.json"
-        diff_path.write_text(json.dumps(diff_results, indent=2, default=str))
-
+        diff_results = _timed(t, "diff", _diff_stage, case)
+        t["total"] = time.perf_counter() - t0
         diff_checker.print_report(diff_results, name)
         all_diffs.append((name, diff_results))
+        _record_score(case, diff_results)
+        manifest.done(name, score_pct=diff_results.get("summary", {}).get("score_pct", 0))
+    return all_diffs, timings
 
-        # Record score
-        s = diff_results.get("summary", {})
-        scores[name] = {
-            "last_run":     ts,
-            "score_pct":    s.get("score_pct", 0),
-            "matched":      s.get("matched", 0),
-            "total":        s.get("total", 0),
-            "by_category":  s.get("by_category", {}),
-            "run_dir":      str(run_dir),
-        }
-        _save_scores(scores)
+
+def _run_cases_parallel(cases: list, api_key: str, model: str, no_cache: bool,
+                        jobs: int, manifest: BatchManifest) -> tuple:
+    """
+    Staged scheduler: each case moves OCR → LLM → fill+diff through its own
+    pool, so one case's Gemini calls overlap the next case's OCR.
+
+      OCR   min(jobs, 2) threads feeding pdf_ocr's shared process pool
+            (which already uses every core)
+      LLM   jobs threads; the Gemini rate limiter is process-wide
+      fill  min(jobs, 2) threads for write_output + diff_checker
+    """
+    _check_template()
+    pools = {
+        "ocr":  ThreadPoolExecutor(max_workers=min(jobs, 2), thread_name_prefix="ocr"),
+        "llm":  ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="llm"),
+        "fill": ThreadPoolExecutor(max_workers=min(jobs, 2), thread_name_prefix="fill"),
+    }
+
+    def fill_and_diff(case, results, year):
+        if results is not None:
+            _timed(timings[case["name"]], "fill", _fill_stage, results, year, str(case["filled_path"]))
+            manifest.stage(case["name"], "filled", filled=True)
+        return _timed(timings[case["name"]], "diff", _diff_stage, case)
+
+    all_diffs, timings, started = [], {}, {}
+    pending = {}    # future → (stage, case, extra)
+    for case in cases:
+        timings[case["name"]] = {}
+        started[case["name"]] = time.perf_counter()
+        if case["skip_extract"]:
+            pending[pools["fill"].submit(fill_and_diff, case, None, None)] = ("fill", case, None)
+            continue
+        fut = pools["ocr"].submit(_timed, timings[case["name"]], "ocr", _ocr_stage, case["pdf_path"])
+        pending[fut] = ("ocr", case, None)
+
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, case, year = pending.pop(fut)
+                name, t = case["name"], timings[case["name"]]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    print(f"  [ERROR] {name}: {stage} failed: {e}")
+                    t["failed"] = True
+                    manifest.fail(name, e)
+                    continue
+                if stage == "ocr":
+                    pages, year = result
+                    nxt = pools["llm"].submit(_timed, t, "llm", _llm_stage, case["pdf_path"],
+                                              pages, year, api_key, model, no_cache)
+                    pending[nxt] = ("llm", case, year)
+                elif stage == "llm":
+                    nxt = pools["fill"].submit(fill_and_diff, case, result, year)
+                    pending[nxt] = ("fill", case, year)
+                else:
+                    t["total"] = time.perf_counter() - started[name]
+                    diff_checker.print_report(result, name)
+                    all_diffs.append((name, result))
+                    _record_score(case, result)
+                    manifest.done(name, score_pct=result.get("summary", {}).get("score_pct", 0))
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True, cancel_futures=True)
+    return all_diffs, timings
+
+
+def _print_timings(timings: dict, wall: float):
+    stages = ("ocr", "llm", "fill", "diff")
+    print(f"\n  {'Case':<28} " + " ".join(f"{s:>8}" for s in stages) + f" {'total':>8}")
+    print("  " + "-" * 74)
+    for name, t in timings.items():
+        cells = " ".join(f"{t[s]:>7.1f}s" if s in t else f"{'—':>8}" for s in stages)
+        total = "  FAILED" if t.get("failed") else f"{t.get('total', 0):>7.1f}s"
+        print(f"  {name:<28} {cells} {total}")
+    sums = [sum(t.get(s, 0) for t in timings.values()) for s in stages]
+    print("  " + "-" * 74)
+    print(f"  {'Stage totals':<28} " + " ".join(f"{x:>7.1f}s" for x in sums)
+          + f" {sum(sums):>7.1f}s")
+    print(f"  Wall clock: {wall:.1f}s")
+
+
+def cmd_run(case_name: str = "", api_key: str = "",
+            model: str = "gemini-2.5-flash-lite", no_cache: bool = False,
+            jobs: int = 1, resume: bool = False):
+    """Run extraction + diff on all cases (or one specific case).
+
+    jobs > 1 overlaps cases through the staged scheduler (_run_cases_parallel).
+    Every case is checkpointed in training/run_manifest.jsonl; resume skips
+    cases already done on unchanged inputs and picks up interrupted ones."""
+    _ensure_dirs()
+
+    if not api_key:
+        api_key = os.environ.get("GEMINI_API_KEY", "")
+    if not api_key and not os.environ.get("GEMINI_REPLAY"):
+        print("[ERROR] Gemini API key required. Set GEMINI_API_KEY or use --api-key.")
+        return
+
+    # Determine which cases to run
+    if case_name:
+        names = [case_name]
+    else:
+        names = sorted(d.name for d in _CASES.iterdir() if d.is_dir())
+
+    if not names:
+        print("[Training] No cases found. Use 'add' or 'inbox' first.")
+        return
+
+    manifest = BatchManifest(_MANIFEST)
+    cases = [c for c in (_prepare_case(n, manifest, resume) for n in names) if c]
+    if resume:
+        print(f"\n[Training] Resume: {len(names) - len(cases)} case(s) skipped, "
+              f"{len(cases)} to run")
+    if len(cases) > 1:
+        cases = batch_scheduler.order_cases(cases, lambda c: c["pdf_path"],
+                                            hash_of=lambda c: c["pdf_hash"])
+    t0 = time.perf_counter()
+    if jobs > 1 and len(cases) > 1:
+        print(f"\n[Training] Running {len(cases)} case(s) with --jobs {jobs}")
+        all_diffs, timings = _run_cases_parallel(cases, api_key, model, no_cache, jobs, manifest)
+    else:
+        all_diffs, timings = _run_cases_serial(cases, api_key, model, no_cache, manifest)
+    wall = time.perf_counter() - t0
 
     # Update aggregate patterns
     _update_patterns(all_diffs)
@@ -327,6 +524,8 @@ def cmd_run(case_name: str = "", api_key: str = "",
     # Print aggregate report
     print()
     cmd_report()
+    if timings:
+        _print_timings(timings, wall)
 
 
 # ---------------------------------------------------------------------------
@@ -520,6 +719,12 @@ Examples:
     p_run.add_argument("--model",    default="gemini-2.5-flash-lite")
     p_run.add_argument("--no-cache", action="store_true",
                        help="Ignore cached LLM results and re-run Gemini calls")
+    p_run.add_argument("--jobs",     type=int, default=1,
+                       help="Cases in flight at once (OCR, Gemini and fill/diff stages "
+                            "overlap across cases; default 1 = one case at a time)")
+    p_run.add_argument("--resume",   action="store_true",
+                       help="Skip cases finished by an earlier run on unchanged inputs; "
+                            "retry failed or interrupted ones")
 
     # ── diff (re-diff only) ───────────────────────────────────────────────────
     p_diff = sub.add_parser("diff", help="Re-diff last run output (no re-extraction)")
@@ -545,6 +750,8 @@ Examples:
             api_key=args.api_key,
             model=args.model,
             no_cache=args.no_cache,
+            jobs=args.jobs,
+            resume=args.resume,
         )
 
     elif args.cmd == "diff":
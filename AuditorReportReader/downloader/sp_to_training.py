@@ -13,6 +13,12 @@ PDF finding uses a 2-path strategy (each path has a filename check + page-peek f
               Step B1: look for PDF filename containing "audited"
               Step B2: if not found, read PDFs one by one (pages 1-3) for "financial statement"
 
+Page peeks read only the byte ranges pdfplumber needs (HTTP Range via
+sp_rest.RangedFile), falling back to a full temp download when the server
+or the PDF layout does not allow it.  Candidates are peeked concurrently and
+each result is remembered against the file's Length + TimeLastModified, so
+an unchanged PDF is never peeked twice.
+
 Workflow:
   1. python downloader/sp_to_training.py          ← download all companies
   2. python checker/training_manager.py inbox     ← register as training cases
@@ -23,7 +29,15 @@ Usage:
   python downloader/sp_to_training.py               # download all
   python downloader/sp_to_training.py --list-only   # list company folders only
   python downloader/sp_to_training.py --company "Greatocean"
-  python downloader/sp_to_training.py --force       # re-download even if cached
+  python downloader/sp_to_training.py --force       # re-list folders and re-download everything
+  python downloader/sp_to_training.py --refresh     # re-list folders; download only changed files
+  python downloader/sp_to_training.py --resume      # after a crash: skip companies already done
+  python downloader/sp_to_training.py --jobs 8      # crawl / download 8 companies at once
+
+Progress is checkpointed per company in <out>/manifest.jsonl (see
+checker/batch_manifest.py); --resume skips companies finished by an earlier
+run whose selected PDF and Excel (Length + TimeLastModified) are unchanged.
+The folders are still listed to make that selection, from the listing cache.
 """
 
 from __future__ import annotations
@@ -34,6 +48,7 @@ import os
 import re
 import sys
 import tempfile
+import threading
 from pathlib import Path
 
 _HERE    = Path(__file__).parent.resolve()   # downloader/
@@ -51,34 +66,63 @@ if _env.exists():
             os.environ.setdefault(_k.strip(), _v.strip())
 
 import sp_rest
+from batch_manifest import BatchManifest
 
 _DEFAULT_OUT = _ROOT / "training" / "inbox"
 
+# Per-company log buffer: with --jobs each worker collects its lines and
+# prints them as one block, so concurrent companies do not interleave.
+_LOG        = threading.local()
+_print_lock = threading.Lock()
+
+
+def _log(msg: str = "") -> None:
+    buf = getattr(_LOG, "lines", None)
+    if buf is None:
+        print(msg)
+    else:
+        buf.append(msg)
+
+
+def _flush_log() -> None:
+    buf, _LOG.lines = getattr(_LOG, "lines", None), None
+    if buf:
+        with _print_lock:
+            print("\n".join(buf), flush=True)
+
 
 # ---------------------------------------------------------------------------
 # Tier 3 helpers — page-peek
 # ---------------------------------------------------------------------------
 
-def _peek_pdf_text(path: Path, max_pages: int = 3) -> str:
+_PEEK_WORKERS = 4
+
+
+def _peek_pdf_text(source, max_pages: int = 3) -> str:
     """
-    Extract text from the first max_pages of a PDF.
+    Extract text from the first max_pages of a PDF (a path or a seekable file).
     Tries pdfplumber first (fast); falls back to Tesseract OCR for image-based PDFs.
     """
     text = ""
     try:
         import pdfplumber
-        with pdfplumber.open(path) as pdf:
+        with pdfplumber.open(source) as pdf:
             for page in pdf.pages[:max_pages]:
                 text += (page.extract_text() or "")
     except Exception:
         pass
     if len(text.strip()) > 50:
         return text
-    # Fallback: OCR via pdf2image + pytesseract
+    # Fallback: OCR via pdf2image (paths) or pdfplumber's renderer (streams) + pytesseract
     try:
-        from pdf2image import convert_from_path
         import pytesseract
-        images = convert_from_path(str(path), first_page=1, last_page=max_pages, dpi=150)
+        if isinstance(source, (str, Path)):
+            from pdf2image import convert_from_path
+            images = convert_from_path(str(source), first_page=1, last_page=max_pages, dpi=150)
+        else:
+            import pdfplumber
+            with pdfplumber.open(source) as pdf:
+                images = [p.to_image(resolution=150).original for p in pdf.pages[:max_pages]]
         for img in images:
             text += pytesseract.image_to_string(img)
     except Exception:
@@ -86,6 +130,35 @@ def _peek_pdf_text(path: Path, max_pages: int = 3) -> str:
     return text
 
 
+def _peek_remote(f: dict) -> dict:
+    """
+    Read pages 1–3 of a SharePoint PDF → {"fs": has "financial statement",
+    "year": latest year in the text, "mode": "ranged" | "full"}.
+    Raises when no text could be read at all (e.g. OCR unavailable), so
+    memo_by_meta does not remember a miss for this file version.
+    """
+    text, mode = None, "ranged"
+    try:
+        with sp_rest.RangedFile(f["ServerRelativeUrl"], int(f.get("Length") or 0)) as rf:
+            text = _peek_pdf_text(rf)
+            if rf.failed:
+                text = None
+    except sp_rest.RangeNotSupported:
+        pass
+    if text is None:
+        mode = "full"
+        tmp = Path(tempfile.mktemp(suffix=".pdf"))
+        try:
+            sp_rest.download(f["ServerRelativeUrl"], tmp, force=True)
+            text = _peek_pdf_text(tmp)
+        finally:
+            tmp.unlink(missing_ok=True)
+    if not text.strip():
+        raise ValueError("no text read from pages 1-3")
+    return {"fs": "financial statement" in text.lower(), "year": _year_in_text(text),
+            "mode": mode}
+
+
 def _year_in_text(text: str) -> int:
     """Return the highest 4-digit year found in text, or 0."""
     hits = re.findall(r'\b(20\d{2})\b', text)
@@ -94,36 +167,35 @@ def _year_in_text(text: str) -> int:
 
 def _find_pdf_by_page_peek(pdf_files: list[dict]):
     """
-    Download each PDF one by one, read pages 1–3, and return the file dict
-    whose text contains "financial statement" with the most recent year.
+    Read pages 1–3 of each PDF (concurrently, ranged where possible, cached
+    per file version) and return the file dict whose text contains
+    "financial statement" with the most recent year.
     Returns None if no candidate is found.
     """
     candidates = []
     total = len(pdf_files)
+    peeks = sp_rest.map_concurrent(
+        lambda f: sp_rest.memo_by_meta("peek", f, lambda: _peek_remote(f)),
+        pdf_files, workers=_PEEK_WORKERS,
+    )
 
-    for i, f in enumerate(pdf_files, 1):
-        print(f"    [peek {i}/{total}] {f['Name']}")
-        tmp = Path(tempfile.mktemp(suffix=".pdf"))
-        try:
-            sp_rest.download(f["ServerRelativeUrl"], tmp, force=True)
-            text = _peek_pdf_text(tmp)
-            if "financial statement" in text.lower():
-                year = _year_in_text(text) or _year_in_name_local(f["Name"])
-                print(f"    [peek {i}/{total}] ✓ \"financial statement\" found  |  year: {year or 'unknown'}")
-                candidates.append((year, f.get("TimeLastModified", ""), f))
-            else:
-                print(f"    [peek {i}/{total}] ✗ keyword not found — skipped")
-        except Exception as exc:
-            print(f"    [peek {i}/{total}] ✗ error: {exc}")
-        finally:
-            tmp.unlink(missing_ok=True)
+    for i, (f, peek) in enumerate(zip(pdf_files, peeks), 1):
+        if isinstance(peek, Exception):
+            _log(f"    [peek {i}/{total}] {f['Name']}  ✗ error: {peek}")
+        elif peek["fs"]:
+            year = peek["year"] or _year_in_name_local(f["Name"])
+            _log(f"    [peek {i}/{total}] {f['Name']}  ✓ \"financial statement\" found  "
+                 f"|  year: {year or 'unknown'}  ({peek['mode']})")
+            candidates.append((year, f.get("TimeLastModified", ""), f))
+        else:
+            _log(f"    [peek {i}/{total}] {f['Name']}  ✗ keyword not found — skipped")
 
     if not candidates:
         return None
 
     candidates.sort(key=lambda t: (t[0], t[1]), reverse=True)
     winner = candidates[0][2]
-    print(f"    [result]   Latest → {winner['Name']}  (year {candidates[0][0] or 'unknown'})")
+    _log(f"    [result]   Latest → {winner['Name']}  (year {candidates[0][0] or 'unknown'})")
     return winner
 
 
@@ -150,21 +222,23 @@ def _search_path_for_pdf(path: str, label: str):
     # Step 1 — filename check
     pdf_item = sp_rest.get_latest_audited_file(all_pdfs, {".pdf"})
     if pdf_item:
-        print(f"    [found]    '{pdf_item['Name']}'  (via filename in {label})")
+        _log(f"    [found]    '{pdf_item['Name']}'  (via filename in {label})")
         return pdf_item
 
     # Step 2 — page-peek
     if all_pdfs:
-        print(f"    [note]     no 'audited' filename in {label} — reading PDFs one by one ({len(all_pdfs)} file(s))")
+        _log(f"    [note]     no 'audited' filename in {label} — reading PDFs one by one ({len(all_pdfs)} file(s))")
         return _find_pdf_by_page_peek(all_pdfs)
 
-    print(f"    [note]     no PDF files in {label}")
+    _log(f"    [note]     no PDF files in {label}")
     return None
 
 
-def download_company(company: dict, out_dir: Path, force: bool = False) -> dict:
+def select_company_files(company: dict) -> dict:
     """
-    Download the latest audited PDF and CAWF Excel for one company.
+    Pick the latest audited PDF and CAWF Excel for one company, without
+    downloading either: {"pdf": file dict | None, "cawf": file dict | None,
+    "issues": [...]}.
 
     PDF search uses a 2-path strategy inside the Financial Statements folder:
       Path A — audited subfolder:
@@ -175,12 +249,10 @@ def download_company(company: dict, out_dir: Path, force: bool = False) -> dict:
                  B2: page-peek (pages 1-3)        → done
 
     PDF and CAWF are independent — a missing PDF does not skip the Excel.
-    Files saved as: <CompanyName>.pdf + <CompanyName>.xlsx
     """
-    name         = company["Name"]
     company_path = company["ServerRelativeUrl"]
-    result       = {"company": name}
-    issues       = []
+    selection    = {"pdf": None, "cawf": None, "issues": []}
+    issues       = selection["issues"]
 
     top_folders = sp_rest.list_subfolders(company_path)
 
@@ -188,9 +260,9 @@ def download_company(company: dict, out_dir: Path, force: bool = False) -> dict:
     fin = sp_rest.find_subfolder(top_folders, sp_rest.FOLDER_FIN_STMT)
     if not fin:
         issues.append(f"no '{sp_rest.FOLDER_FIN_STMT}' folder")
-        print(f"    [skip pdf] no Financial Statements folder found")
+        _log(f"    [skip pdf] no Financial Statements folder found")
     else:
-        print(f"    [folder]   {fin['Name']}")
+        _log(f"    [folder]   {fin['Name']}")
         fin_path = fin["ServerRelativeUrl"]
         pdf_item = None
 
@@ -198,7 +270,7 @@ def download_company(company: dict, out_dir: Path, force: bool = False) -> dict:
         audited_folders = sp_rest.list_subfolders(fin_path)
         audited_sub     = sp_rest.find_subfolder(audited_folders, sp_rest.FOLDER_AUDITED)
         if audited_sub:
-            print(f"    [folder]   {audited_sub['Name']}  [Path A]")
+            _log(f"    [folder]   {audited_sub['Name']}  [Path A]")
             pdf_item = _search_path_for_pdf(
                 audited_sub["ServerRelativeUrl"],
                 label=audited_sub["Name"],
@@ -207,30 +279,21 @@ def download_company(company: dict, out_dir: Path, force: bool = False) -> dict:
         # Path B — Financial Statements flat (only if Path A found nothing)
         if not pdf_item:
             if audited_sub:
-                print(f"    [path B]   subfolder had no match — searching '{fin['Name']}' directly")
+                _log(f"    [path B]   subfolder had no match — searching '{fin['Name']}' directly")
             else:
-                print(f"    [path B]   no audited subfolder — searching '{fin['Name']}' directly")
+                _log(f"    [path B]   no audited subfolder — searching '{fin['Name']}' directly")
             pdf_item = _search_path_for_pdf(fin_path, label=fin["Name"])
 
         if not pdf_item:
             issues.append("no audited PDF found")
-            print(f"    [skip pdf] no audited PDF found")
-        else:
-            pdf_dest = out_dir / f"{name}.pdf"
-            if pdf_dest.exists() and not force:
-                print(f"    [cached]   {pdf_dest.name}")
-            else:
-                size_kb = int(pdf_item.get("Length", 0)) // 1024
-                print(f"    [download] {pdf_item['Name']}  ({size_kb} KB)  → {pdf_dest.name}")
-                sp_rest.download(pdf_item["ServerRelativeUrl"], pdf_dest, force=force)
-            result["pdf"] = str(pdf_dest)
-            result["pdf_filename"] = pdf_item["Name"]
+            _log(f"    [skip pdf] no audited PDF found")
+        selection["pdf"] = pdf_item
 
     # ── CAWF Excel: Credit Underwriting (always attempted) ───────────────────
     uw = sp_rest.find_subfolder(top_folders, sp_rest.FOLDER_CREDIT_UW)
     if not uw:
         issues.append(f"no '{sp_rest.FOLDER_CREDIT_UW}' folder")
-        print(f"    [skip xlsx] no '{sp_rest.FOLDER_CREDIT_UW}' folder")
+        _log(f"    [skip xlsx] no '{sp_rest.FOLDER_CREDIT_UW}' folder")
     else:
         uw_files  = sp_rest.list_files(uw["ServerRelativeUrl"])
         cawf_item = (
@@ -240,17 +303,57 @@ def download_company(company: dict, out_dir: Path, force: bool = False) -> dict:
         )
         if not cawf_item:
             issues.append("no Excel in Credit Underwriting")
-            print(f"    [skip xlsx] no Excel in Credit Underwriting")
+            _log(f"    [skip xlsx] no Excel in Credit Underwriting")
+        selection["cawf"] = cawf_item
+    return selection
+
+
+def selection_inputs(selection: dict) -> dict:
+    """
+    Resume key for a company: the selected files' Length + TimeLastModified.
+    SharePoint does not bubble a nested file change up to the company folder's
+    TimeLastModified, so the folder stamp cannot tell a changed report apart.
+    """
+    return {
+        kind: ({"name": item["Name"], "length": str(item.get("Length") or ""),
+                "modified": item.get("TimeLastModified") or ""} if item else None)
+        for kind, item in (("pdf", selection["pdf"]), ("cawf", selection["cawf"]))
+    }
+
+
+def download_company(company: dict, out_dir: Path, force: bool = False,
+                     selection: dict | None = None) -> dict:
+    """
+    Download the latest audited PDF and CAWF Excel for one company (chosen by
+    select_company_files unless a selection is passed in).
+    Files saved as: <CompanyName>.pdf + <CompanyName>.xlsx
+    """
+    name      = company["Name"]
+    result    = {"company": name}
+    selection = selection or select_company_files(company)
+    issues    = list(selection["issues"])
+
+    pdf_item = selection["pdf"]
+    if pdf_item:
+        pdf_dest = out_dir / f"{name}.pdf"
+        size_kb = int(pdf_item.get("Length", 0)) // 1024
+        if sp_rest.download(pdf_item["ServerRelativeUrl"], pdf_dest, force=force, meta=pdf_item):
+            _log(f"    [download] {pdf_item['Name']}  ({size_kb} KB)  → {pdf_dest.name}")
         else:
-            cawf_dest = out_dir / f"{name}.xlsx"
-            if cawf_dest.exists() and not force:
-                print(f"    [cached]   {cawf_dest.name}")
-            else:
-                size_kb = int(cawf_item.get("Length", 0)) // 1024
-                print(f"    [download] {cawf_item['Name']}  ({size_kb} KB)  → {cawf_dest.name}")
-                sp_rest.download(cawf_item["ServerRelativeUrl"], cawf_dest, force=force)
-            result["cawf"] = str(cawf_dest)
-            result["cawf_filename"] = cawf_item["Name"]
+            _log(f"    [cached]   {pdf_dest.name}")
+        result["pdf"] = str(pdf_dest)
+        result["pdf_filename"] = pdf_item["Name"]
+
+    cawf_item = selection["cawf"]
+    if cawf_item:
+        cawf_dest = out_dir / f"{name}.xlsx"
+        size_kb = int(cawf_item.get("Length", 0)) // 1024
+        if sp_rest.download(cawf_item["ServerRelativeUrl"], cawf_dest, force=force, meta=cawf_item):
+            _log(f"    [download] {cawf_item['Name']}  ({size_kb} KB)  → {cawf_dest.name}")
+        else:
+            _log(f"    [cached]   {cawf_dest.name}")
+        result["cawf"] = str(cawf_dest)
+        result["cawf_filename"] = cawf_item["Name"]
 
     if issues:
         result["issues"] = issues
@@ -276,13 +379,21 @@ After downloading, register and run training:
                         help="List company folders and exit without downloading")
     parser.add_argument("--company",   help="Download only this company (partial name match)")
     parser.add_argument("--force",     action="store_true",
-                        help="Re-download even if the file already exists in inbox/")
+                        help="Re-download even if the file already exists in inbox/ (implies --refresh)")
+    parser.add_argument("--refresh",   action="store_true",
+                        help="Re-list every SharePoint folder instead of reusing cached listings")
+    parser.add_argument("--jobs",      type=int, default=sp_rest._WORKERS,
+                        help=f"Companies crawled / downloaded at once (default {sp_rest._WORKERS})")
+    parser.add_argument("--resume",    action="store_true",
+                        help="Skip companies finished by an earlier run (selected files unchanged)")
     parser.add_argument("--out",       default=str(_DEFAULT_OUT),
                         help=f"Destination folder (default: training/inbox/)")
     args = parser.parse_args()
 
     out_dir = Path(args.out)
     out_dir.mkdir(parents=True, exist_ok=True)
+    if args.force or args.refresh:
+        sp_rest.use_listing_cache(False)
 
     # ── List company folders ──────────────────────────────────────────────────
     print(f"[SharePoint] Listing {sp_rest.ROOT_FOLDER} ...")
@@ -308,18 +419,48 @@ After downloading, register and run training:
         return
 
     # ── Download each company ─────────────────────────────────────────────────
-    results: list[dict] = []
-    for company in companies:
-        print(f"{'─'*56}")
-        print(f"  {company['Name']}")
+    manifest = BatchManifest(out_dir / "manifest.jsonl")
+
+    def _download_one(company: dict) -> dict:
+        _LOG.lines = [f"{'─'*56}", f"  {company['Name']}"]
         try:
-            r = download_company(company, out_dir, force=args.force)
-        except PermissionError as exc:
-            print(f"  [ERROR] {exc}")
+            try:
+                selection = select_company_files(company)
+            except PermissionError:
+                raise
+            except Exception as exc:
+                manifest.fail(company["Name"], exc)
+                return {"company": company["Name"], "error": str(exc)}
+            inputs = selection_inputs(selection)
+            rec = manifest.completed(company["Name"], inputs) if args.resume else None
+            if rec:
+                _log(f"    [resume]   done in an earlier run — skipped")
+                return {**rec["result"], "resumed": True}
+            manifest.start(company["Name"], inputs)
+            try:
+                r = download_company(company, out_dir, force=args.force, selection=selection)
+            except PermissionError:
+                raise
+            except Exception as exc:
+                r = {"company": company["Name"], "error": str(exc)}
+            if "error" in r:
+                manifest.fail(company["Name"], r["error"])
+            else:
+                manifest.done(company["Name"], result=r)
+            return r
+        finally:
+            _flush_log()
+
+    results: list[dict] = sp_rest.map_concurrent(_download_one, companies, workers=args.jobs)
+    sp_rest.save_sync_cache()
+    for i, (company, r) in enumerate(zip(companies, results)):
+        if isinstance(r, PermissionError):
+            print(f"  [ERROR] {r}")
             sys.exit(1)
-        except Exception as exc:
-            r = {"company": company["Name"], "error": str(exc)}
-        results.append(r)
+        if isinstance(r, Exception):
+            r = results[i] = {"company": company["Name"], "error": str(r)}
+        if r.pop("resumed", False):
+            continue
 
         # Write sidecar so training_manager can display original filenames
         sidecar = {}
@@ -351,6 +492,7 @@ After downloading, register and run training:
         print(f"  Errors     : {len(errors)}")
         for r in errors:
             print(f"    ✗  {r['company']}  ({r['error']})")
+    print(f"  SharePoint : {sp_rest.format_sync_stats()}")
 
     if not ok:
         print()
@@ -66,6 +66,23 @@ def main():
         default="gemini-2.5-flash-lite",
         help="Gemini model name (default: gemini-2.5-flash-lite)",
     )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=None,
+        help="Gemini section calls in flight at once (default: GEMINI_CONCURRENCY env or 4; 1 = sequential)",
+    )
+    parser.add_argument(
+        "--replay",
+        default="",
+        help="Answer Gemini calls from a recorded JSONL file instead of the API "
+             "(see utils/replay_backend.py; REPLAY_* env vars add latency/errors)",
+    )
+    parser.add_argument(
+        "--record",
+        default="",
+        help="Append every Gemini response to this JSONL file for later --replay",
+    )
     parser.add_argument(
         "--no-cache",
         action="store_true",
@@ -82,9 +99,20 @@ def main():
         default=300,
         help="OCR DPI (higher = better quality, slower).  Default 300.",
     )
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=None,
+        help="Parallel OCR processes (default: OCR_WORKERS env or CPU count; 1 = serial)",
+    )
+    parser.add_argument(
+        "--force-ocr",
+        action="store_true",
+        help="OCR every page even when the PDF has a usable text layer",
+    )
     args = parser.parse_args()
 
-    if not args.api_key:
+    if not args.api_key and not args.replay:
         print("[ERROR] Gemini API key required. Set GEMINI_API_KEY or use --api-key.")
         sys.exit(1)
 
@@ -95,7 +123,8 @@ def main():
     # ── Step 1: OCR ──────────────────────────────────────────────────────────
     print("\n=== STEP 1: OCR ===")
     from pipeline.pdf_ocr import extract_pages, full_text
-    pages = extract_pages(pdf_path, dpi=args.dpi)
+    pages = extract_pages(pdf_path, dpi=args.dpi, workers=args.ocr_workers,
+                          use_text_layer=not args.force_ocr)
     all_text = full_text(pages)
     print(f"  Pages extracted: {len(pages)}")
 
@@ -133,14 +162,20 @@ def main():
             print(f"  Cache cleared ({removed} entries deleted)")
 
     from pipeline.gemini_extractor import GeminiExtractor
+    from utils.replay_backend import ReplayBackend
     extractor = GeminiExtractor(
         pages=pages,
         target_year=target_year,
         hints=hints,
         api_key=args.api_key,
         model=args.model,
+        max_concurrency=args.llm_concurrency,
+        backend=ReplayBackend.from_env(args.replay) if args.replay else None,
+        record_to=args.record or None,
     )
+    jcache.reset_stats()
     results = extractor.extract_all(pdf_hash_val=file_hash)
+    print(f"  LLM cache: {jcache.format_stats()}")
     audit_checks          = results["audit_checks"]
     financial_data        = results["financial_data"]
     prior_financial_data  = results.get("prior_financial_data") or {}
@@ -18,6 +18,9 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
+from pipeline import xlsx_patch
+from pipeline.excel_styles import CellStyle, StyleRegistry, registry_for
+
 _MAIN_SHEET = "Summary of Information"
 _AUDITOR_SHEET = "auditor"
 _CREDIT_SHEET = "CreditFlag"
@@ -32,27 +35,38 @@ _COST_OUTPUT_PER_1M = 0.30
 # style helpers
 # ---------------------------------------------------------------------------
 
-def _red_bold() -> Font:
-    return Font(bold=True, color="FF0000")
-
-def _green_bold() -> Font:
-    return Font(bold=True, color="00AA00")
-
-def _header_font() -> Font:
-    return Font(bold=True, color="FFFFFF")
-
-def _header_fill() -> PatternFill:
-    return PatternFill("solid", fgColor="1F4E79")
-
-def _warn_fill() -> PatternFill:
-    return PatternFill("solid", fgColor="FFC7CE")
-
-def _ok_fill() -> PatternFill:
-    return PatternFill("solid", fgColor="C6EFCE")
-
-def _thin_border() -> Border:
-    s = Side(style="thin")
-    return Border(left=s, right=s, top=s, bottom=s)
+_THIN = Side(style="thin")
+_BOX = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_HEADER_FILL = PatternFill("solid", fgColor="1F4E79")
+_WARN_FILL = PatternFill("solid", fgColor="FFC7CE")
+_OK_FILL = PatternFill("solid", fgColor="C6EFCE")
+_WRAP_CENTER = Alignment(wrap_text=True, vertical="center")
+
+# Each style is created once at import and applied by reference (overlay keeps
+# the template's own number formats and borders on cells we write into).
+_STYLES: Dict[str, CellStyle] = {
+    "value":         CellStyle(alignment=_WRAP_CENTER),
+    "value_bold":    CellStyle(font=Font(bold=True, color="000000"), alignment=_WRAP_CENTER),
+    "value_red":     CellStyle(font=Font(bold=False, color="FF0000"), alignment=_WRAP_CENTER),
+    "value_bold_red": CellStyle(font=Font(bold=True, color="FF0000"), alignment=_WRAP_CENTER),
+    "red_bold":      CellStyle(font=Font(bold=True, color="FF0000")),
+    "green":         CellStyle(font=Font(color="00AA00")),
+    "header":        CellStyle(font=Font(bold=True, color="FFFFFF"), fill=_HEADER_FILL),
+    "header_boxed":  CellStyle(font=Font(bold=True, color="FFFFFF"), fill=_HEADER_FILL, border=_BOX),
+    "label_boxed":   CellStyle(font=Font(bold=True), border=_BOX),
+    "boxed":         CellStyle(border=_BOX),
+    "flag_boxed":    CellStyle(font=Font(bold=True, color="FF0000"), fill=_WARN_FILL, border=_BOX),
+    "ok_boxed":      CellStyle(font=Font(bold=True, color="00AA00"), fill=_OK_FILL, border=_BOX),
+    "total_boxed":   CellStyle(font=Font(bold=True), fill=_OK_FILL, border=_BOX),
+    "opinion_ok":    CellStyle(font=Font(bold=True, size=14, color="00AA00")),
+    "opinion_bad":   CellStyle(font=Font(bold=True, size=14, color="FF0000")),
+    "rec_ok":        CellStyle(font=Font(bold=True, size=16, color="00AA00"), fill=_OK_FILL),
+    "rec_bad":       CellStyle(font=Font(bold=True, size=16, color="FF0000"), fill=_WARN_FILL),
+}
+
+
+def _styles(ws) -> StyleRegistry:
+    return registry_for(ws.parent, _STYLES, prefix="AuditorReport ")
 
 
 # ---------------------------------------------------------------------------
@@ -153,10 +167,12 @@ def _write_cell(ws, row: int, col: int, value,
         return
     cell = ws.cell(row=row, column=col, value=value)
     if bold or red:
-        cell.font = Font(bold=bold, color="FF0000" if red else "000000")
+        style = "value_bold_red" if bold and red else "value_bold" if bold else "value_red"
+    else:
+        style = "value"
+    _styles(ws).overlay(cell, style)
     if fill:
         cell.fill = fill
-    cell.alignment = Alignment(wrap_text=True, vertical="center")
 
 
 # ---------------------------------------------------------------------------
@@ -192,7 +208,7 @@ def fill_financial_data(ws, financial_data: dict, target_year: str,
             _write_cell(ws, row, col, round(float(value), 2))
         elif red_if_none:
             cell = ws.cell(row=row, column=col, value="NOT FOUND")
-            cell.font = _red_bold()
+            _styles(ws).overlay(cell, "red_bold")
 
     # ── Section boundary discovery ─────────────────────────────────────────
     pl_lo, pl_hi = _section_bounds(lm, "profit & loss", "balance sheet")
@@ -245,7 +261,7 @@ def fill_financial_data(ws, financial_data: dict, target_year: str,
     if opinion_row:
         val = "Yes" if opinion == "UNQUALIFIED" else (opinion or "NOT FOUND")
         cell = ws.cell(row=opinion_row, column=col, value=val)
-        cell.font = Font(color="00AA00") if val == "Yes" else _red_bold()
+        _styles(ws).overlay(cell, "green" if val == "Yes" else "red_bold")
 
     # ── Balance Sheet — Assets ─────────────────────────────────────────────
     ca_lo, ca_hi = _section_bounds(lm, "current asset", "total asset")
@@ -296,7 +312,7 @@ def fill_financial_data(ws, financial_data: dict, target_year: str,
         if op2_row:
             val = "Yes" if opinion == "UNQUALIFIED" else (opinion or "NOT FOUND")
             cell = ws.cell(row=op2_row, column=col, value=val)
-            cell.font = Font(color="00AA00") if val == "Yes" else _red_bold()
+            _styles(ws).overlay(cell, "green" if val == "Yes" else "red_bold")
 
         for label, field in [
             ("Non Current Asset", "Non Current Asset"),
@@ -373,26 +389,21 @@ def fill_auditor_sheet(wb: Workbook, audit_checks: dict,
                        blacklist_firm: dict, blacklist_accountant: dict,
                        target_year: str):
     ws = _ensure_sheet(wb, _AUDITOR_SHEET)
+    st = _styles(ws)
     ws.column_dimensions["A"].width = 32
     ws.column_dimensions["B"].width = 60
 
     opinion = audit_checks.get("opinion", "NOT FOUND")
 
     ws["A1"] = opinion
-    ws["A1"].font = Font(bold=True, size=14,
-                         color="FF0000" if opinion != "UNQUALIFIED" else "00AA00")
+    st.overlay(ws["A1"], "opinion_bad" if opinion != "UNQUALIFIED" else "opinion_ok")
 
     def row(r, label, value, flag: bool = False):
-        ws.cell(r, 1, label).font = Font(bold=True)
+        st.overlay(ws.cell(r, 1, label), "label_boxed")
         cell = ws.cell(r, 2, str(value) if value is not None else "NOT FOUND")
-        if flag:
-            cell.font = _red_bold()
-            cell.fill = _warn_fill()
-        ws.cell(r, 1).border = _thin_border()
-        ws.cell(r, 2).border = _thin_border()
-
-    ws.cell(3, 1, "AUDIT OPINION").font = _header_font()
-    ws.cell(3, 1).fill = _header_fill()
+        st.overlay(cell, "flag_boxed" if flag else "boxed")
+
+    st.overlay(ws.cell(3, 1, "AUDIT OPINION"), "header")
     ws.merge_cells("A3:B3")
 
     row(4, "Opinion Classification", opinion,
@@ -401,8 +412,7 @@ def fill_auditor_sheet(wb: Workbook, audit_checks: dict,
         flag=not audit_checks.get("true_and_fair"))
     row(6, "Evidence", audit_checks.get("opinion_evidence", ""))
 
-    ws.cell(8, 1, "AUDITOR INFORMATION").font = _header_font()
-    ws.cell(8, 1).fill = _header_fill()
+    st.overlay(ws.cell(8, 1, "AUDITOR INFORMATION"), "header")
     ws.merge_cells("A8:B8")
 
     row(9,  "Auditor Firm Name",   audit_checks.get("firm_name"))
@@ -410,8 +420,7 @@ def fill_auditor_sheet(wb: Workbook, audit_checks: dict,
     row(11, "MIA / AF Number",     audit_checks.get("mia_number"))
     row(12, "Signature Date",      audit_checks.get("signature_date"))
 
-    ws.cell(14, 1, "BLACKLIST CHECK").font = _header_font()
-    ws.cell(14, 1).fill = _header_fill()
+    st.overlay(ws.cell(14, 1, "BLACKLIST CHECK"), "header")
     ws.merge_cells("A14:B14")
 
     firm_status = blacklist_firm.get("status", "INCONCLUSIVE")
@@ -423,8 +432,7 @@ def fill_auditor_sheet(wb: Workbook, audit_checks: dict,
     row(19, "Accountant — Search Query",   blacklist_accountant.get("query", ""))
     row(20, "Accountant — Evidence",       "; ".join(blacklist_accountant.get("evidence", [])))
 
-    ws.cell(22, 1, "SIGNATURE CONSISTENCY").font = _header_font()
-    ws.cell(22, 1).fill = _header_fill()
+    st.overlay(ws.cell(22, 1, "SIGNATURE CONSISTENCY"), "header")
     ws.merge_cells("A22:B22")
 
     sig_dates = audit_checks.get("signature_dates", {})
@@ -436,8 +444,7 @@ def fill_auditor_sheet(wb: Workbook, audit_checks: dict,
         flag="INCONSISTENT" in str(audit_checks.get("signature_consistency", "")))
     r += 2
 
-    ws.cell(r, 1, "STATUTORY DECLARATION").font = _header_font()
-    ws.cell(r, 1).fill = _header_fill()
+    st.overlay(ws.cell(r, 1, "STATUTORY DECLARATION"), "header")
     ws.merge_cells(f"A{r}:B{r}")
     r += 1
 
@@ -462,25 +469,22 @@ def fill_credit_flag_sheet(wb: Workbook, audit_checks: dict,
                             blacklist_accountant: dict,
                             validation_results: Optional[dict] = None):
     ws = _ensure_sheet(wb, _CREDIT_SHEET)
+    st = _styles(ws)
     ws.column_dimensions["A"].width = 38
     ws.column_dimensions["B"].width = 20
     ws.column_dimensions["C"].width = 50
 
     def hdr(r, text):
-        ws.cell(r, 1, text).font = _header_font()
-        ws.cell(r, 1).fill = _header_fill()
+        st.overlay(ws.cell(r, 1, text), "header")
         ws.merge_cells(f"A{r}:C{r}")
 
     def chk(r, label, status, notes=""):
-        ws.cell(r, 1, label).font = Font(bold=True)
+        st.overlay(ws.cell(r, 1, label), "label_boxed")
         cell = ws.cell(r, 2, status)
         ok = status in ("PASS", "CLEAN", "CONSISTENT", "VALID", "MATCH",
                         "UNQUALIFIED", "YES", "PROCEED")
-        cell.font = _green_bold() if ok else _red_bold()
-        cell.fill = _ok_fill() if ok else _warn_fill()
-        ws.cell(r, 3, notes)
-        for c in range(1, 4):
-            ws.cell(r, c).border = _thin_border()
+        st.overlay(cell, "ok_boxed" if ok else "flag_boxed")
+        st.overlay(ws.cell(r, 3, notes), "boxed")
 
     hdr(1, "CREDIT ANALYST — FLAG SUMMARY")
 
@@ -543,10 +547,8 @@ def fill_credit_flag_sheet(wb: Workbook, audit_checks: dict,
 
     hdr(rec_start, "OVERALL RECOMMENDATION")
     rec_row = rec_start + 1
-    ws.cell(rec_row, 1, recommendation)
-    ws.cell(rec_row, 1).font = Font(bold=True, size=16,
-                                    color="FF0000" if recommendation != "PROCEED" else "00AA00")
-    ws.cell(rec_row, 1).fill = _ok_fill() if recommendation == "PROCEED" else _warn_fill()
+    st.overlay(ws.cell(rec_row, 1, recommendation),
+               "rec_ok" if recommendation == "PROCEED" else "rec_bad")
     ws.merge_cells(f"A{rec_row}:C{rec_row}")
 
     return recommendation
@@ -559,6 +561,7 @@ def fill_credit_flag_sheet(wb: Workbook, audit_checks: dict,
 def fill_token_usage_sheet(wb: Workbook, token_usage: dict):
     """Write a Token Usage sheet with per-call stats and estimated cost."""
     ws = _ensure_sheet(wb, _TOKEN_SHEET)
+    st = _styles(ws)
     ws.column_dimensions["A"].width = 22
     ws.column_dimensions["B"].width = 16
     ws.column_dimensions["C"].width = 16
@@ -567,10 +570,7 @@ def fill_token_usage_sheet(wb: Workbook, token_usage: dict):
 
     headers = ["Section", "Prompt Tokens", "Output Tokens", "Total Tokens", "Est. Cost (USD)"]
     for c, h in enumerate(headers, 1):
-        cell = ws.cell(1, c, h)
-        cell.font = _header_font()
-        cell.fill = _header_fill()
-        cell.border = _thin_border()
+        st.overlay(ws.cell(1, c, h), "header_boxed")
 
     r = 2
     total_prompt = total_output = total_total = 0
@@ -582,11 +582,8 @@ def fill_token_usage_sheet(wb: Workbook, token_usage: dict):
         total_t  = usage.get("total_tokens", 0) or (prompt_t + output_t)
         cost = (prompt_t * _COST_INPUT_PER_1M + output_t * _COST_OUTPUT_PER_1M) / 1_000_000
 
-        ws.cell(r, 1, section).border = _thin_border()
-        ws.cell(r, 2, prompt_t).border = _thin_border()
-        ws.cell(r, 3, output_t).border = _thin_border()
-        ws.cell(r, 4, total_t).border = _thin_border()
-        ws.cell(r, 5, round(cost, 6)).border = _thin_border()
+        for c, val in enumerate([section, prompt_t, output_t, total_t, round(cost, 6)], 1):
+            st.overlay(ws.cell(r, c, val), "boxed")
 
         total_prompt += prompt_t
         total_output += output_t
@@ -598,34 +595,27 @@ def fill_token_usage_sheet(wb: Workbook, token_usage: dict):
     for c, val in enumerate(
         ["TOTAL", total_prompt, total_output, total_total, round(total_cost, 6)], 1
     ):
-        cell = ws.cell(r, c, val)
-        cell.font = Font(bold=True)
-        cell.fill = _ok_fill()
-        cell.border = _thin_border()
+        st.overlay(ws.cell(r, c, val), "total_boxed")
 
 
 # ---------------------------------------------------------------------------
 # main entry point
 # ---------------------------------------------------------------------------
 
-def write_output(
-    template_path: str,
-    output_path: str,
+def _fill_workbook(
+    wb,
     target_year: str,
     audit_checks: dict,
     financial_data: dict,
     blacklist_firm: dict,
     blacklist_accountant: dict,
-    validation_results: Optional[dict] = None,
-    prior_financial_data: Optional[dict] = None,
-    prior_year: str = "",
-    prior_validation_results: Optional[dict] = None,
-    token_usage: Optional[dict] = None,
-    year_end_date: str = "",
-    prior_year_end_date: str = "",
-):
-    wb = openpyxl.load_workbook(template_path)
-
+    validation_results: Optional[dict],
+    prior_financial_data: Optional[dict],
+    prior_year: str,
+    token_usage: Optional[dict],
+    year_end_date: str,
+    prior_year_end_date: str,
+) -> str:
     opinion = audit_checks.get("opinion", "NOT FOUND")
 
     if _MAIN_SHEET in wb.sheetnames:
@@ -649,8 +639,55 @@ def write_output(
 
     if token_usage:
         fill_token_usage_sheet(wb, token_usage)
+    return recommendation
+
+
+def write_output(
+    template_path: str,
+    output_path: str,
+    target_year: str,
+    audit_checks: dict,
+    financial_data: dict,
+    blacklist_firm: dict,
+    blacklist_accountant: dict,
+    validation_results: Optional[dict] = None,
+    prior_financial_data: Optional[dict] = None,
+    prior_year: str = "",
+    prior_validation_results: Optional[dict] = None,
+    token_usage: Optional[dict] = None,
+    year_end_date: str = "",
+    prior_year_end_date: str = "",
+    writer: str = "xml",
+):
+    """
+    Fill the template and save it to output_path.
+
+    writer="xml" patches only the touched sheet XML (xlsx_patch) and falls back to
+    openpyxl if the template uses anything the patcher does not support;
+    writer="openpyxl" always does the full load/save round-trip.
+    """
+    args = (target_year, audit_checks, financial_data, blacklist_firm,
+            blacklist_accountant, validation_results, prior_financial_data,
+            prior_year, token_usage, year_end_date, prior_year_end_date)
+
+    recommendation = None
+    if writer == "xml":
+        try:
+            wb = xlsx_patch.load_workbook(template_path)
+            try:
+                recommendation = _fill_workbook(wb, *args)
+                wb.save(output_path)
+            finally:
+                wb.close()
+        except xlsx_patch.XlsxPatchError as e:
+            print(f"[Excel] XML patch writer unavailable ({e}) — falling back to openpyxl")
+            recommendation = None
+
+    if recommendation is None:
+        wb = openpyxl.load_workbook(template_path)
+        recommendation = _fill_workbook(wb, *args)
+        wb.save(output_path)
 
-    wb.save(output_path)
     print(f"[Excel] Saved → {output_path}")
     print(f"[Excel] Recommendation: {recommendation}")
     return recommendation
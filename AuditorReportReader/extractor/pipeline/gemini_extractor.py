@@ -10,20 +10,63 @@ through a single LLM. No hardcoded keyword lists in this file.
   3. balance_sheet    → assets, liabilities, equity
   4. notes            → interest & staff cost breakdowns (best-effort)
 
-Results are cached in .llm_cache/ so re-runs cost nothing.
+Notes pages are narrowed to the most relevant ones within a token budget
+(NOTES_TOKEN_BUDGET / notes_token_budget=, see pipeline/note_locator.py); if a
+breakdown comes back null while unsent pages mention it, the notes call is
+repeated once on the full notes text.
+
+The four calls use independent text slices, so they run concurrently on a
+thread pool (GEMINI_CONCURRENCY / max_concurrency=, default 4; 1 = one by one).
+
+Results are cached in .llm_cache/ (see utils/json_cache.py) keyed by model,
+prompt version and the exact prompt sent, so re-runs of unchanged sections
+cost nothing and prompt edits never return stale answers.
 """
 
 import json
+import os
 import re
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-import google.generativeai as genai
+try:
+    import google.generativeai as genai
+except ImportError:     # offline runs with a replay backend do not need it
+    genai = None
 
 from utils import json_cache
-from pipeline.page_classifier import classify_pages, text_for_sections, section_summary
+from utils.llm_client import LLMClient
+from utils.replay_backend import RecordingBackend, ReplayBackend
+from pipeline.note_locator import missing_targets, score_note_pages, select_note_pages
+from pipeline.page_classifier import (
+    AUDIT_FRONT_PAGES,
+    classify_pages,
+    note_page_numbers,
+    section_summary,
+    text_for_sections,
+)
 
 _DEFAULT_MODEL = "gemini-2.5-flash-lite"
+# Bump when a cached response should not be reused even though the prompt
+# text is unchanged (e.g. the meaning of a returned field changes).
+_PROMPT_VERSION = 1
+_GENERATION_PARAMS = {"response_mime_type": "application/json", "temperature": 0.0}
+
+
+def _default_concurrency() -> int:
+    env = os.environ.get("GEMINI_CONCURRENCY", "").strip()
+    if env.isdigit() and int(env) > 0:
+        return int(env)
+    return 4
+
+
+def _default_notes_budget() -> int:
+    env = os.environ.get("NOTES_TOKEN_BUDGET", "").strip()
+    if env.isdigit():
+        return int(env)
+    return 8000
+
 
 # ---------------------------------------------------------------------------
 # System prompt (cached by Gemini via system_instruction)
@@ -59,18 +102,49 @@ class GeminiExtractor:
         hints: dict,
         api_key: str,
         model: str = _DEFAULT_MODEL,
+        max_concurrency: int | None = None,
+        notes_token_budget: int | None = None,
+        backend=None,
+        record_to: str | None = None,
     ):
+        """
+        backend   : object with generate_content(prompt, **kwargs) used instead
+                    of genai.GenerativeModel (e.g. ReplayBackend); defaults to
+                    a ReplayBackend on $GEMINI_REPLAY when that is set
+        record_to : append every real response to this JSONL file for later
+                    replay (default $GEMINI_RECORD)
+        """
         self.pages = pages
+        self.model = model
         self.target_year = target_year
         self.hints = hints          # from Excel KeywordMap — user domain hints
         self.pdf_hash_val = ""      # set by extract_all()
         self._token_usage: dict = {}  # section → {prompt_tokens, output_tokens, total_tokens}
-
-        genai.configure(api_key=api_key)
-        self._model = genai.GenerativeModel(
-            model_name=model,
-            system_instruction=_SYSTEM_PROMPT,
-        )
+        self.max_concurrency = max_concurrency or _default_concurrency()
+        # 0 = send every notes page (the pre-selector behaviour)
+        self.notes_token_budget = (_default_notes_budget() if notes_token_budget is None
+                                   else notes_token_budget)
+
+        replay = os.environ.get("GEMINI_REPLAY")
+        if backend is None and replay:
+            backend = ReplayBackend.from_env(replay)
+        if backend is not None:
+            print(f"  [Gemini] Using {type(backend).__name__} (no network)")
+            self._model = backend
+        else:
+            if genai is None:
+                raise RuntimeError("google-generativeai not installed.  "
+                                   "Run: pip install google-generativeai")
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(
+                model_name=model,
+                system_instruction=_SYSTEM_PROMPT,
+            )
+            record_to = record_to or os.environ.get("GEMINI_RECORD")
+            if record_to:
+                self._model = RecordingBackend(self._model, record_to)
+        # Shared rate limiter, retries with back-off, timeouts — see utils/llm_client.py
+        self._client = LLMClient.from_env(self._model)
         self._page_map = classify_pages(pages)
         print(f"  Page map: {section_summary(self._page_map)}")
 
@@ -88,8 +162,8 @@ class GeminiExtractor:
         """
         self.pdf_hash_val = pdf_hash_val
 
-        # Audit: always use first 15 pages — Malaysian audit reports are at the front
-        audit_text = self._first_n_pages_text(15)
+        # Audit: always use the front pages — Malaysian audit reports are at the front
+        audit_text = self._first_n_pages_text(AUDIT_FRONT_PAGES)
 
         is_text = text_for_sections(self.pages, ["income_statement"], self._page_map)
         bs_text = text_for_sections(self.pages, ["balance_sheet"], self._page_map)
@@ -97,19 +171,14 @@ class GeminiExtractor:
         # Notes: include all "notes" pages PLUS any "other" pages that come after the
         # first notes page — this captures continuation note pages (e.g. Note 22, 23)
         # that the classifier didn't explicitly tag as "notes".
-        note_pages_list = sorted(
-            p["page"] for p in self.pages if self._page_map.get(p["page"]) == "notes"
-        )
-        if note_pages_list:
-            min_notes_page = note_pages_list[0]
-            notes_parts = []
-            for p in self.pages:
-                t = self._page_map.get(p["page"])
-                if t == "notes" or (t == "other" and p["page"] >= min_notes_page):
-                    notes_parts.append(f"<<PAGE {p['page']}>>\n{p['text']}")
-            notes_text = "\n\n".join(notes_parts)
-        else:
-            notes_text = text_for_sections(self.pages, ["notes"], self._page_map)
+        # Of those, only the pages that score for the requested breakdowns are sent.
+        note_pages = note_page_numbers(self.pages, self._page_map)
+        selected_notes = select_note_pages(self.pages, note_pages, self.hints,
+                                           self.notes_token_budget)
+        if len(selected_notes) < len(note_pages):
+            print(f"  [Notes] Sending {len(selected_notes)}/{len(note_pages)} notes page(s): "
+                  f"{selected_notes}")
+        notes_text = self._pages_text(selected_notes)
 
         # fallback: if classifier found nothing useful, send full text
         if not is_text.strip() or not bs_text.strip():
@@ -119,20 +188,21 @@ class GeminiExtractor:
             if not bs_text.strip():
                 bs_text = all_text
 
-        print("  [Gemini] Call 1/4 — audit section")
-        audit_raw = self._call("audit", audit_text, self._audit_prompt(audit_text))
-
-        print("  [Gemini] Call 2/4 — income statement")
-        is_raw = self._call("income_statement", is_text,
-                            self._income_statement_prompt(is_text))
-
-        print("  [Gemini] Call 3/4 — balance sheet")
-        bs_raw = self._call("balance_sheet", bs_text,
-                            self._balance_sheet_prompt(bs_text))
-
-        print("  [Gemini] Call 4/4 — notes (best-effort)")
-        notes_raw = self._call("notes", notes_text,
-                               self._notes_prompt(notes_text)) if notes_text.strip() else {}
+        calls = [
+            ("audit", audit_text, self._audit_prompt(audit_text)),
+            ("income_statement", is_text, self._income_statement_prompt(is_text)),
+            ("balance_sheet", bs_text, self._balance_sheet_prompt(bs_text)),
+        ]
+        if notes_text.strip():   # notes are best-effort
+            calls.append(("notes", notes_text, self._notes_prompt(notes_text)))
+        raw = self._run_calls(calls)
+        audit_raw, is_raw, bs_raw = raw["audit"], raw["income_statement"], raw["balance_sheet"]
+        notes_raw = raw.get("notes", {})
+        if len(selected_notes) < len(note_pages):
+            notes_raw = self._notes_fallback(notes_raw, note_pages, selected_notes)
+        if self._client.stats["calls"]:
+            print(f"  [Gemini] {self._client.format_stats()}")
+            json_cache.prune_at_exit()
 
         audit_checks = self._build_audit_checks(audit_raw)
         cur_fin, pri_fin, detected_year, prior_year, \
@@ -153,34 +223,51 @@ class GeminiExtractor:
             "year_end_date":         year_end_date,      # e.g. "31/12/2022"
             "prior_year_end_date":   prior_year_end_date,
             "token_usage":           self._token_usage,
+            "llm_stats":             dict(self._client.stats),
         }
 
     # ------------------------------------------------------------------
     # Gemini call with caching
     # ------------------------------------------------------------------
 
+    def _run_calls(self, calls: list) -> dict:
+        """
+        Run (section, text, prompt) calls on up to max_concurrency threads.
+        Each call is independent and records its own token usage under its
+        section, so the result is the same as calling them one by one.
+        """
+        workers = min(self.max_concurrency, len(calls))
+        print(f"  [Gemini] {len(calls)} calls ({', '.join(c[0] for c in calls)}) "
+              f"on {workers} thread(s)")
+        if workers <= 1:
+            return {section: self._call(section, text, prompt) for section, text, prompt in calls}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini") as pool:
+            futures = {section: pool.submit(self._call, section, text, prompt)
+                       for section, text, prompt in calls}
+            return {section: fut.result() for section, fut in futures.items()}
+
     def _call(self, section: str, text: str, prompt: str) -> dict:
         """Call Gemini or return cached result."""
+        key = json_cache.cache_key(self.model, _PROMPT_VERSION, prompt,
+                                   {**_GENERATION_PARAMS, "system": _SYSTEM_PROMPT})
         if self.pdf_hash_val:
-            cached = json_cache.load(self.pdf_hash_val, section)
+            cached = json_cache.load(self.pdf_hash_val, section, key)
             # Only use cache if it has at least one non-null value — an empty {}
             # or all-null dict means the previous call failed and should be retried.
             if cached is not None and any(v is not None for v in cached.values()):
-                print(f"    (cached)")
+                print(f"    {section}: (cached)")
                 return cached
             elif cached is not None:
-                print(f"    (cache empty/null — will retry Gemini call)")
+                print(f"    {section}: (cache empty/null — will retry Gemini call)")
 
         if not text.strip():
             return {}
 
         try:
-            response = self._model.generate_content(
+            response = self._client.generate(
                 prompt,
-                generation_config=genai.GenerationConfig(
-                    response_mime_type="application/json",
-                    temperature=0.0,
-                ),
+                generation_config=(genai.GenerationConfig(**_GENERATION_PARAMS)
+                                   if genai is not None else dict(_GENERATION_PARAMS)),
             )
             raw_text = response.text.strip()
             # Strip any accidental markdown fences
@@ -204,9 +291,34 @@ class GeminiExtractor:
 
         # Only cache successful non-empty responses
         if self.pdf_hash_val and data:
-            json_cache.save(self.pdf_hash_val, section, data)
+            json_cache.save(self.pdf_hash_val, section, data, key)
         return data
 
+    def _notes_fallback(self, notes_raw: dict, note_pages: list,
+                        selected: list) -> dict:
+        """
+        Re-ask for null breakdowns on the full notes text, but only when a
+        page that was left out mentions them — otherwise the report simply
+        does not have that note.
+        """
+        missing = missing_targets(notes_raw)
+        if not missing:
+            return notes_raw
+        sent = set(selected)
+        scores = score_note_pages(self.pages, note_pages, self.hints)
+        if not any(t in scores.get(pg, {}) for pg in note_pages if pg not in sent
+                   for t in missing):
+            return notes_raw
+        print(f"  [Notes] {', '.join(missing)} null — retrying with all "
+              f"{len(note_pages)} notes page(s)")
+        full_text = self._pages_text(note_pages)
+        full_raw = self._call("notes_full", full_text, self._notes_prompt(full_text))
+        merged = dict(notes_raw or {})
+        for target in missing:
+            if full_raw.get(target) is not None:
+                merged[target] = full_raw[target]
+        return merged
+
     # ------------------------------------------------------------------
     # Prompt builders
     # ------------------------------------------------------------------
@@ -860,6 +972,13 @@ class GeminiExtractor:
             f"<<PAGE {p['page']}>>\n{p['text']}" for p in self.pages
         )
 
+    def _pages_text(self, page_numbers: list) -> str:
+        wanted = set(page_numbers)
+        return "\n\n".join(
+            f"<<PAGE {p['page']}>>\n{p['text']}"
+            for p in self.pages if p["page"] in wanted
+        )
+
     def _first_n_pages_text(self, n: int) -> str:
         return "\n\n".join(
             f"<<PAGE {p['page']}>>\n{p['text']}"
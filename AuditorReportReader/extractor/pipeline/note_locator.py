@@ -0,0 +1,137 @@
+"""
+Note-page locator — picks the notes pages worth sending to the notes prompt.
+
+Long reports have dozens of notes pages (accounting policies, financial
+instruments, related-party narratives) of which only a handful carry the
+breakdowns _notes_prompt asks for.  Each page is scored per breakdown by
+keyword hits (built-in field keywords + user KeywordMap hints + a few note
+phrases), with a bonus for pages that look like figure tables.  The best
+page for every breakdown is kept first, then the remaining relevant pages
+by score, until the token budget is spent.
+
+No LLM used.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from utils.keyword_map import BUILT_IN_FIELDS
+
+# notes-prompt breakdown → (BUILT_IN_FIELDS names, extra phrases found in the note itself)
+NOTE_TARGETS: Dict[str, tuple] = {
+    "interest_breakdown": (
+        ["Interest / Finance Expenses"],
+        ["interest on", "hire purchase", "term loan", "bank overdraft"],
+    ),
+    "staff_cost_breakdown": (
+        ["Staff Cost"],
+        ["epf", "socso", "wages", "salaries", "directors' fees", "emoluments"],
+    ),
+    "note9_breakdown": (
+        ["Other Receivables and Prepayments", "Other Receivables"],
+        ["deposits", "prepayments", "non-trade", "amount owing by"],
+    ),
+    "note18_breakdown": (
+        ["Other Payables & Accruals", "CL Other Payables"],
+        ["accruals", "deposits received", "amount owing to"],
+    ),
+    "note21_breakdown": (
+        ["Depreciation"],
+        ["profit before taxation", "arrived at after charging",
+         "directors' remuneration", "auditors' remuneration"],
+    ),
+}
+
+_CHARS_PER_TOKEN = 4
+# Money-looking figures: 1,234 / (12,345) / 1,234,567
+_AMOUNT_RE = re.compile(r"\(?\d{1,3}(?:,\d{3})+\)?")
+_TABLE_MIN_AMOUNTS = 6
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN
+
+
+def _target_patterns(hints: Optional[dict]) -> Dict[str, "re.Pattern"]:
+    """One whole-word alternation per breakdown, so short terms ("epf", "eis") stay precise."""
+    out: Dict[str, "re.Pattern"] = {}
+    for target, (fields, extra) in NOTE_TARGETS.items():
+        kws = list(extra)
+        for name in fields:
+            spec = BUILT_IN_FIELDS.get(name, {})
+            kws += spec.get("primary", []) + spec.get("fallback", [])
+            for _, sub_kws in spec.get("sub_items", []):
+                kws += sub_kws
+            user = (hints or {}).get(name, {})
+            kws += user.get("primary", []) + user.get("fallback", [])
+        alts = sorted({k.lower() for k in kws if k.strip()}, key=len, reverse=True)
+        out[target] = re.compile(r"\b(?:" + "|".join(map(re.escape, alts)) + r")\b")
+    return out
+
+
+def score_note_pages(pages: List[dict], note_pages: List[int],
+                     hints: Optional[dict] = None) -> Dict[int, Dict[str, float]]:
+    """Return {page: {target: score}} for the given notes pages (targets with no hits omitted)."""
+    patterns = _target_patterns(hints)
+    wanted = set(note_pages)
+    scores: Dict[int, Dict[str, float]] = {}
+    for p in pages:
+        if p["page"] not in wanted:
+            continue
+        text = p["text"].lower()
+        table_bonus = 1.5 if len(_AMOUNT_RE.findall(text)) >= _TABLE_MIN_AMOUNTS else 1.0
+        page_scores = {}
+        for target, rx in patterns.items():
+            hits = len(set(rx.findall(text)))   # distinct keywords, not repeats
+            if hits:
+                page_scores[target] = hits * table_bonus
+        scores[p["page"]] = page_scores
+    return scores
+
+
+def select_note_pages(pages: List[dict], note_pages: List[int],
+                      hints: Optional[dict] = None,
+                      token_budget: int = 8000) -> List[int]:
+    """
+    Pick the notes pages to send, in page order.  Every breakdown's best page
+    goes in first, then other pages with any hits by total score, stopping
+    at token_budget.  token_budget <= 0, or no page matching anything (e.g.
+    very noisy OCR), returns note_pages unchanged.
+    """
+    if token_budget <= 0 or not note_pages:
+        return list(note_pages)
+    text_by_page = {p["page"]: p["text"] for p in pages}
+    scores = score_note_pages(pages, note_pages, hints)
+    if not any(scores.values()):
+        return list(note_pages)
+
+    best_per_target = []
+    for target in NOTE_TARGETS:
+        ranked = sorted((s[target], -pg) for pg, s in scores.items() if target in s)
+        if ranked:
+            best_per_target.append(-ranked[-1][1])
+    by_total = sorted((pg for pg, s in scores.items() if s),
+                      key=lambda pg: (-sum(scores[pg].values()), pg))
+
+    chosen: List[int] = []
+    used = 0
+    for pg in best_per_target + by_total:
+        if pg in chosen:
+            continue
+        cost = estimate_tokens(text_by_page.get(pg, ""))
+        if chosen and used + cost > token_budget:
+            continue
+        chosen.append(pg)
+        used += cost
+    return sorted(chosen)
+
+
+def _is_null(value) -> bool:
+    if isinstance(value, dict):
+        return all(_is_null(v) for v in value.values())
+    return value is None
+
+
+def missing_targets(notes_raw: dict) -> List[str]:
+    """Breakdowns the notes response left entirely null (or did not return)."""
+    return [t for t in NOTE_TARGETS if _is_null((notes_raw or {}).get(t))]
@@ -8,6 +8,11 @@ Section types: audit | income_statement | balance_sheet | notes |
 
 from typing import Dict, List, Optional
 
+# GeminiExtractor's audit call reads this many leading pages verbatim
+# (auditors' report, directors' report, statement by directors, statutory
+# declaration all sit at the front of Malaysian reports).
+AUDIT_FRONT_PAGES = 15
+
 _SIGNALS: Dict[str, List[str]] = {
     "audit": [
         "independent auditor", "independent auditors",
@@ -135,6 +140,20 @@ def text_for_sections(pages: List[dict], section_types: List[str],
     return "\n\n".join(parts)
 
 
+def note_page_numbers(pages: List[dict], page_map: Dict[int, str]) -> List[int]:
+    """Pages sent as notes: every "notes" page plus any "other" page after the
+    first one — continuation pages (e.g. Note 22, 23) the classifier didn't tag."""
+    note_pages = [p["page"] for p in pages if page_map.get(p["page"]) == "notes"]
+    if not note_pages:
+        return []
+    first = min(note_pages)
+    return [
+        p["page"] for p in pages
+        if page_map.get(p["page"]) == "notes"
+        or (page_map.get(p["page"]) == "other" and p["page"] >= first)
+    ]
+
+
 def section_summary(page_map: Dict[int, str]) -> str:
     """Human-readable summary for logging: 'audit:1-3, income_statement:5, ...'"""
     from collections import defaultdict
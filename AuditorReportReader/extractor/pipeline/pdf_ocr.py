@@ -1,13 +1,36 @@
 """
 PDF OCR layer.  Converts every page of a scanned-image PDF to plain text
-using Tesseract 5.  Results are cached on disk so re-runs are instant.
+using Tesseract 5.  Each OCR'd page is cached on disk (gzip) as soon as it
+finishes, keyed by PDF hash, page, dpi, preprocessing version and Tesseract
+version/config, so re-runs are instant and interrupted runs resume.
+
+Pages are OCR'd on a process pool (one single-threaded Tesseract per worker);
+set OCR_WORKERS or pass workers= to size it, workers=1 keeps the serial loop.
+Pages are rendered a few at a time (OCR_RENDER_AHEAD / render_ahead=), so peak
+memory does not grow with page count.  Pages whose PDF text layer is usable
+(digitally exported reports) skip rendering and OCR altogether.
+
+OCR goes through an engine created once per process: libtesseract via
+tesserocr (in requirements.txt; model loaded once per worker, images passed
+in memory).  Without tesserocr it falls back to the tesseract binary fed over
+stdin/stdout, which still starts one tesseract process per page.  The worker
+pool lives for the whole process, so batch callers do not pay start-up per PDF.
 """
 
+import atexit
+import functools
+import gzip
 import hashlib
-import json
+import io
+import multiprocessing
 import os
 import re
+import string
 import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils import disk_lru
 
 _TESSERACT_PATHS = [
     "/opt/homebrew/bin/tesseract",
@@ -16,24 +39,37 @@ _TESSERACT_PATHS = [
 ]
 
 _CACHE_DIR = os.path.join(os.path.dirname(__file__), ".ocr_cache")
+_CACHE_MAX_MB = float(os.environ.get("OCR_CACHE_MAX_MB", "500"))
+
+# PSM 6 = uniform block of text; good for financial report pages
+_TESS_CONFIG = r"--oem 3 --psm 6 -l eng"
+# Bump when _preprocess changes so cached pages from the old pipeline are not reused.
+_PREPROCESS_VERSION = 1
 
 
 # ---------------------------------------------------------------------------
 # internal helpers
 # ---------------------------------------------------------------------------
 
-def _tesseract_bin() -> str:
+@functools.lru_cache(maxsize=None)
+def _tesseract_probe() -> tuple:
+    """(binary path, version line) — `tesseract --version` runs once per process."""
     for p in _TESSERACT_PATHS:
         try:
-            subprocess.run([p, "--version"], capture_output=True, check=True)
-            return p
+            out = subprocess.run([p, "--version"], capture_output=True, text=True, check=True)
         except (FileNotFoundError, subprocess.CalledProcessError):
             continue
+        lines = (out.stdout or out.stderr).splitlines()
+        return p, (lines[0].strip() if lines else "unknown")
     raise RuntimeError(
         "tesseract not found.  Install with: brew install tesseract"
     )
 
 
+def _tesseract_bin() -> str:
+    return _tesseract_probe()[0]
+
+
 def _pdf_hash(pdf_path: str) -> str:
     h = hashlib.md5()
     with open(pdf_path, "rb") as f:
@@ -42,38 +78,115 @@ def _pdf_hash(pdf_path: str) -> str:
     return h.hexdigest()
 
 
-def _cache_path(pdf_path: str) -> str:
-    os.makedirs(_CACHE_DIR, exist_ok=True)
-    return os.path.join(_CACHE_DIR, _pdf_hash(pdf_path) + ".json")
+def _tesseract_version() -> str:
+    """Engine + version string for cache keys; output differs between engines/versions."""
+    if _tesserocr_available():
+        import tesserocr
+        return "tesserocr " + tesserocr.tesseract_version().splitlines()[0].strip()
+    return _tesseract_probe()[1]
+
+
+class _PageCache:
+    """One gzip'd text file per OCR'd page under .ocr_cache/pages/<pdf hash>/.
 
+    The file name carries a digest of every setting that changes OCR output, so
+    a --dpi 400 run never returns 300-dpi text.  Pages are written as they
+    finish (atomic rename), which is what lets an interrupted run resume.
+    """
+
+    def __init__(self, pdf_hash: str, dpi: int):
+        self.dir = os.path.join(_CACHE_DIR, "pages", pdf_hash)
+        settings = f"{dpi}|{_PREPROCESS_VERSION}|{_tesseract_version()}|{_TESS_CONFIG}"
+        self.tag = hashlib.sha1(settings.encode("utf-8")).hexdigest()[:16]
 
-def _load_cache(pdf_path: str):
-    cp = _cache_path(pdf_path)
-    if os.path.exists(cp):
-        with open(cp, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
+    def _path(self, page_no: int) -> str:
+        return os.path.join(self.dir, f"{page_no:04d}-{self.tag}.txt.gz")
 
+    def get(self, page_no: int):
+        path = self._path(page_no)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, EOFError):
+            return None
+        os.utime(path)  # mtime doubles as last-used time for pruning
+        return text
+
+    def pages(self) -> set[int]:
+        """Page numbers cached under these settings."""
+        suffix = f"-{self.tag}.txt.gz"
+        try:
+            names = os.listdir(self.dir)
+        except OSError:
+            return set()
+        return {int(n[:-len(suffix)]) for n in names
+                if n.endswith(suffix) and n[:-len(suffix)].isdigit()}
 
-def _save_cache(pdf_path: str, pages: list):
-    cp = _cache_path(pdf_path)
-    with open(cp, "w", encoding="utf-8") as f:
-        json.dump(pages, f, ensure_ascii=False)
+    def put(self, page_no: int, text: str):
+        os.makedirs(self.dir, exist_ok=True)
+        path = self._path(page_no)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
 
 
 # ---------------------------------------------------------------------------
 # OCR one page image
 # ---------------------------------------------------------------------------
 
-def _ocr_image(img, tess_bin: str) -> str:
-    """Run tesseract on a PIL image and return text."""
-    import tempfile
-    import pytesseract
+@functools.lru_cache(maxsize=None)
+def _tesserocr_available() -> bool:
+    try:
+        import tesserocr  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 
-    pytesseract.pytesseract.tesseract_cmd = tess_bin
-    # PSM 6 = uniform block of text; good for financial report pages
-    custom_config = r"--oem 3 --psm 6 -l eng"
-    return pytesseract.image_to_string(img, config=custom_config)
+class _TesserocrEngine:
+    """libtesseract through tesserocr: eng traineddata loaded once, image passed in memory."""
+
+    def __init__(self):
+        import tesserocr
+        self._api = tesserocr.PyTessBaseAPI(
+            lang="eng", psm=tesserocr.PSM.SINGLE_BLOCK, oem=tesserocr.OEM.DEFAULT
+        )
+
+    def ocr(self, img) -> str:
+        self._api.SetImage(img)
+        return self._api.GetUTF8Text()
+
+
+class _CliEngine:
+    """Fallback without tesserocr: one tesseract run per page, image on stdin, text on stdout."""
+
+    def __init__(self):
+        self._cmd = [_tesseract_bin(), "stdin", "stdout", *_TESS_CONFIG.split()]
+
+    def ocr(self, img) -> str:
+        buf = io.BytesIO()
+        img.save(buf, format="PPM")   # uncompressed; far cheaper to encode than PNG
+        out = subprocess.run(self._cmd, input=buf.getvalue(), capture_output=True, check=True)
+        return out.stdout.decode("utf-8", errors="replace")
+
+
+_ENGINE = None
+_ENGINE_BUILDS = 0      # engines created in this process (1 per pool worker)
+
+
+def _engine():
+    """This process's OCR engine, created on first use."""
+    global _ENGINE, _ENGINE_BUILDS
+    if _ENGINE is None:
+        _ENGINE = _TesserocrEngine() if _tesserocr_available() else _CliEngine()
+        _ENGINE_BUILDS += 1
+    return _ENGINE
+
+
+def _ocr_image(img) -> str:
+    """Run tesseract on a PIL image and return text."""
+    return _engine().ocr(img)
 
 
 def _preprocess(img):
@@ -86,46 +199,271 @@ def _preprocess(img):
 
 
 # ---------------------------------------------------------------------------
-# public API
+# parallel OCR
 # ---------------------------------------------------------------------------
 
-def extract_pages(pdf_path: str, dpi: int = 300, verbose: bool = True) -> list[dict]:
-    """
-    Return a list of dicts, one per page:
-        {"page": 1, "text": "...raw OCR text..."}
+def _default_workers() -> int:
+    env = os.environ.get("OCR_WORKERS", "").strip()
+    if env.isdigit() and int(env) > 0:
+        return int(env)
+    return os.cpu_count() or 1
 
-    Results are cached by PDF content hash.
+
+def _default_render_ahead() -> int:
+    env = os.environ.get("OCR_RENDER_AHEAD", "").strip()
+    return int(env) if env.isdigit() and int(env) > 0 else 2
+
+
+def _page_windows(page_numbers: list[int], render_ahead: int):
+    """Split page numbers into (first, last) runs of consecutive pages, at most render_ahead long."""
+    run: list[int] = []
+    for page_no in page_numbers:
+        if run and (page_no != run[-1] + 1 or len(run) == render_ahead):
+            yield run[0], run[-1]
+            run = []
+        run.append(page_no)
+    if run:
+        yield run[0], run[-1]
+
+
+def _iter_page_images(pdf_path: str, dpi: int, page_numbers: list[int], render_ahead: int):
+    """Yield (page_no, image) rendering at most render_ahead pages at a time.
+
+    Images are handed over one by one and not kept here, so each is freed as
+    soon as the caller is done with it.
     """
-    cached = _load_cache(pdf_path)
-    if cached is not None:
+    from pdf2image import convert_from_path
+    for first, last in _page_windows(page_numbers, render_ahead):
+        window = convert_from_path(pdf_path, dpi=dpi, first_page=first, last_page=last)
+        window.reverse()
+        page_no = first
+        while window:
+            yield page_no, window.pop()
+            page_no += 1
+
+
+def _init_ocr_worker():
+    # One Tesseract thread per worker process: with N workers on N cores,
+    # OpenMP threads inside each Tesseract would only fight each other.
+    # Workers are spawned, so libtesseract / libgomp load only after this.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    _engine()
+
+
+def _worker_info() -> tuple:
+    """(pid, engines built, OMP_THREAD_LIMIT) of the calling process; for checks and tests."""
+    _engine()
+    return os.getpid(), _ENGINE_BUILDS, os.environ.get("OMP_THREAD_LIMIT")
+
+
+# Spawn, not fork: a forked worker inherits a parent that may already have
+# loaded libgomp (tesserocr probe) and other threads' state (batch runners
+# create the pool from worker threads); a fresh interpreter has neither.
+_POOL_CONTEXT = multiprocessing.get_context("spawn")
+_POOL = None
+_POOL_KEY = None
+# Batch runners call extract_pages from several threads; they all share this pool.
+_POOL_LOCK = threading.Lock()
+
+
+def _ocr_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide OCR pool, reused across extract_pages calls (rebuilt only if resized)."""
+    global _POOL, _POOL_KEY
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_KEY != workers:
+            _shutdown_pool_locked()
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=_POOL_CONTEXT,
+                                        initializer=_init_ocr_worker)
+            _POOL_KEY = workers
+        return _POOL
+
+
+def _shutdown_pool_locked():
+    global _POOL, _POOL_KEY
+    if _POOL is not None:
+        _POOL.shutdown(wait=True, cancel_futures=True)
+    _POOL, _POOL_KEY = None, None
+
+
+@atexit.register
+def _shutdown_pool():
+    with _POOL_LOCK:
+        _shutdown_pool_locked()
+
+
+def _ocr_page(pdf_path: str, page_no: int, dpi: int) -> str:
+    """Worker entry point: render one page itself (no bitmaps cross processes) and OCR it."""
+    from pdf2image import convert_from_path
+    img = convert_from_path(pdf_path, dpi=dpi, first_page=page_no, last_page=page_no)[0]
+    processed = _preprocess(img)
+    img.close()
+    return _ocr_image(processed)
+
+
+def _ocr_parallel(pdf_path: str, dpi: int, page_numbers: list[int],
+                  workers: int, verbose: bool, cache: _PageCache) -> dict[int, str]:
+    texts: dict[int, str] = {}
+    pool = _ocr_pool(workers)
+    futures = {
+        pool.submit(_ocr_page, pdf_path, page_no, dpi): page_no
+        for page_no in page_numbers
+    }
+    try:
+        for done, fut in enumerate(as_completed(futures), start=1):
+            page_no = futures[fut]
+            texts[page_no] = fut.result()
+            cache.put(page_no, texts[page_no])
+            if verbose:
+                print(f"[OCR]   {done}/{len(page_numbers)} pages done", end="\r", flush=True)
+    except BaseException:
+        for fut in futures:
+            fut.cancel()
+        raise
+    return {page_no: texts[page_no] for page_no in page_numbers}   # page order, like _ocr_serial
+
+
+def _ocr_serial(pdf_path: str, dpi: int, page_numbers: list[int],
+                render_ahead: int, verbose: bool, cache: _PageCache) -> dict[int, str]:
+    texts: dict[int, str] = {}
+    for done, (page_no, img) in enumerate(
+            _iter_page_images(pdf_path, dpi, page_numbers, render_ahead), start=1):
         if verbose:
-            print(f"[OCR] Using cached text for {os.path.basename(pdf_path)} "
-                  f"({len(cached)} pages)")
-        return cached
+            print(f"[OCR]   page {page_no} ({done}/{len(page_numbers)})", end="\r", flush=True)
+        processed = _preprocess(img)
+        img.close()
+        texts[page_no] = _ocr_image(processed)
+        processed.close()
+        cache.put(page_no, texts[page_no])
+    return texts
+
+
+# ---------------------------------------------------------------------------
+# native text layer
+# ---------------------------------------------------------------------------
+
+# A page counts as digital when its text layer has enough characters and few of
+# them are junk: non-printable glyphs, U+FFFD, or pdfplumber's "(cid:NN)"
+# placeholders for fonts without a Unicode map.
+_MIN_TEXT_CHARS = 200
+_MAX_GARBAGE_RATIO = 0.10
+_CLEAN_CHARS = set(string.ascii_letters + string.digits + string.punctuation)
+
+
+def text_layer_usable(text: str) -> bool:
+    """True when a page's embedded text is long and clean enough to skip OCR."""
+    chars = "".join(text.split())
+    if len(chars) < _MIN_TEXT_CHARS:
+        return False
+    garbage = sum(1 for ch in chars if ch not in _CLEAN_CHARS)
+    garbage += len(re.findall(r"\(cid:\d+\)", text)) * 8
+    return garbage / len(chars) <= _MAX_GARBAGE_RATIO
+
+
+def _text_layer_pages(pdf_path: str) -> list[str]:
+    """Per-page text from the PDF's own text layer ("" where a page has none)."""
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        texts = []
+        for page in pdf.pages:
+            try:
+                texts.append(page.extract_text() or "")
+            except Exception:
+                texts.append("")
+            page.flush_cache()
+    return texts
+
+
+# ---------------------------------------------------------------------------
+# public API
+# ---------------------------------------------------------------------------
 
-    tess_bin = _tesseract_bin()
+def _ocr_pages(pdf_path: str, pdf_hash: str, dpi: int, page_numbers: list[int],
+               workers: int | None, render_ahead: int | None,
+               verbose: bool) -> dict[int, str]:
+    """OCR the given pages at one dpi, serving what it can from the page cache."""
+    cache = _PageCache(pdf_hash, dpi)   # raises here if neither tesserocr nor tesseract exists
+    texts: dict[int, str] = {}
+    for page_no in page_numbers:
+        text = cache.get(page_no)
+        if text is not None:
+            texts[page_no] = text
+    missing = [p for p in page_numbers if p not in texts]
+    if verbose and texts:
+        print(f"[OCR] Using cached {dpi}-dpi text for {len(texts)}/{len(page_numbers)} "
+              f"page(s) of {os.path.basename(pdf_path)}")
+    if not missing:
+        return texts
 
     try:
-        from pdf2image import convert_from_path
+        import pdf2image  # noqa: F401
     except ImportError:
         raise RuntimeError("pdf2image not installed.  Run: pip install pdf2image")
 
+    workers = workers or _default_workers()
+    if verbose:
+        print(f"[OCR] OCR'ing {len(missing)} page(s) of {os.path.basename(pdf_path)} "
+              f"at {dpi} dpi on {workers} worker(s) …")
+    if workers > 1:
+        texts.update(_ocr_parallel(pdf_path, dpi, missing, workers, verbose, cache))
+    else:
+        texts.update(_ocr_serial(pdf_path, dpi, missing,
+                                 render_ahead or _default_render_ahead(), verbose, cache))
     if verbose:
-        print(f"[OCR] Converting {os.path.basename(pdf_path)} to images at {dpi} dpi …")
+        print()
+    disk_lru.prune_at_exit(os.path.join(_CACHE_DIR, "pages"), _CACHE_MAX_MB)
+    return texts
 
-    images = convert_from_path(pdf_path, dpi=dpi)
-    pages = []
-    for i, img in enumerate(images, start=1):
-        if verbose:
-            print(f"[OCR]   page {i}/{len(images)}", end="\r", flush=True)
-        processed = _preprocess(img)
-        text = _ocr_image(processed, tess_bin)
-        pages.append({"page": i, "text": text})
 
-    if verbose:
-        print(f"\n[OCR] Done — {len(pages)} pages extracted.")
+def cached_pages(pdf_path: str, dpi: int = 300, pdf_hash: str | None = None) -> set[int]:
+    """Pages of pdf_path already OCR'd at dpi with the current settings
+    (empty when Tesseract is not installed here).  pdf_hash skips re-hashing."""
+    try:
+        cache = _PageCache(pdf_hash or _pdf_hash(pdf_path), dpi)
+    except RuntimeError:
+        return set()
+    return cache.pages()
+
 
-    _save_cache(pdf_path, pages)
+def extract_pages(pdf_path: str, dpi: int = 300, verbose: bool = True,
+                  workers: int | None = None,
+                  render_ahead: int | None = None,
+                  use_text_layer: bool = True) -> list[dict]:
+    """
+    Return a list of dicts, one per page, in page order:
+        {"page": 1, "text": "...page text...", "source": "text" | "ocr"}
+
+    use_text_layer: take a page's embedded text when it looks clean and only
+    OCR image-only pages; False forces OCR on every page.
+    workers: OCR processes (default OCR_WORKERS or CPU count); 1 = serial.
+    render_ahead: pages rendered per batch in serial mode (default
+    OCR_RENDER_AHEAD or 2); pool workers each render only their current page.
+    OCR'd pages are cached individually (see _PageCache); the cache is capped
+    at OCR_CACHE_MAX_MB (default 500) by evicting least-recently-used pages
+    when the process exits.
+    """
+    layer = _text_layer_pages(pdf_path)
+    if use_text_layer:
+        texts = {i: t for i, t in enumerate(layer, start=1) if text_layer_usable(t)}
+    else:
+        texts = {}
+    to_ocr = [i for i in range(1, len(layer) + 1) if i not in texts]
+    if verbose and texts:
+        print(f"[OCR] {len(texts)}/{len(layer)} pages have a usable text layer; "
+              f"OCR'ing {len(to_ocr)}")
+
+    ocr_texts: dict[int, str] = {}
+    if to_ocr:
+        ocr_texts = _ocr_pages(pdf_path, _pdf_hash(pdf_path), dpi, to_ocr,
+                               workers, render_ahead, verbose)
+
+    pages = []
+    for i in range(1, len(layer) + 1):
+        if i in ocr_texts:
+            pages.append({"page": i, "text": ocr_texts[i], "source": "ocr"})
+        else:
+            pages.append({"page": i, "text": texts[i], "source": "text"})
+    if verbose:
+        print(f"[OCR] Done — {len(pages)} pages extracted.")
     return pages
 
 
@@ -0,0 +1,145 @@
+"""
+Tests for utils/llm_client.py against a local fake backend and a fake clock.
+Run with:  python test_llm_client.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))  # extractor/
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from utils.llm_client import LLMClient, LLMError, RateLimiter
+from utils.replay_backend import ReplayBackend, prompt_hash
+
+
+class ResourceExhausted(Exception):
+    """Same name as google.api_core's 429 exception."""
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class _FakeBackend:
+    """Raises the queued exceptions first, then answers with fixed usage."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        usage = SimpleNamespace(prompt_token_count=90, candidates_token_count=10,
+                                total_token_count=100)
+        return SimpleNamespace(text="{}", usage_metadata=usage)
+
+
+class TestLLMClient(unittest.TestCase):
+
+    def _client(self, backend, clock, **kwargs):
+        return LLMClient(backend, clock=clock, sleep=clock.sleep, **kwargs)
+
+    def test_retries_transient_errors_then_counts_usage(self):
+        clock = _FakeClock()
+        backend = _FakeBackend(ResourceExhausted("429"), TimeoutError("slow"))
+        client = self._client(backend, clock)
+
+        response = client.generate("prompt", generation_config={"temperature": 0})
+
+        self.assertEqual(response.text, "{}")
+        self.assertEqual(len(backend.calls), 3)
+        self.assertNotIn("request_options", backend.calls[0])   # no timeout configured
+        self.assertEqual(client.stats["retries"], 2)
+        self.assertEqual(client.stats["total_tokens"], 100)
+        self.assertEqual(client.stats["failures"], 0)
+
+    def test_non_retryable_error_is_raised_immediately(self):
+        clock = _FakeClock()
+        backend = _FakeBackend(ValueError("bad request"))
+        client = self._client(backend, clock)
+        with self.assertRaises(ValueError):
+            client.generate("prompt")
+        self.assertEqual(len(backend.calls), 1)
+        self.assertEqual(client.stats["failures"], 1)
+
+    def test_deadline_bounds_retries_and_timeouts(self):
+        clock = _FakeClock()
+        backend = _FakeBackend(*[ResourceExhausted("429")] * 10)
+        client = self._client(backend, clock, max_retries=10, base_delay=4.0,
+                              timeout=30.0, deadline=10.0)
+        with self.assertRaises(LLMError):
+            client.generate("prompt")
+        self.assertLess(clock.now, 10.0)
+        self.assertEqual(backend.calls[0]["request_options"], {"timeout": 10.0})
+
+    def test_rate_limiter_spaces_requests(self):
+        clock = _FakeClock()
+        limiter = RateLimiter(rpm=2, tpm=1000, clock=clock, sleep=clock.sleep)
+        client = self._client(_FakeBackend(), clock, limiter=limiter)
+        for _ in range(3):
+            client.generate("prompt")
+        # Two requests fit in the first minute's bucket; the third waits 30s for a refill.
+        self.assertAlmostEqual(client.stats["throttle_wait_s"], 30.0)
+
+    def test_rate_limiter_wait_counts_against_the_deadline(self):
+        clock = _FakeClock()
+        limiter = RateLimiter(rpm=1, tpm=1000, clock=clock, sleep=clock.sleep)
+        backend = _FakeBackend()
+        client = self._client(backend, clock, limiter=limiter, deadline=20.0)
+        client.generate("prompt")
+        # The next request slot is 60s away: fail now instead of sleeping past the deadline.
+        with self.assertRaises(LLMError):
+            client.generate("prompt")
+        self.assertEqual(clock.now, 0.0)
+        self.assertEqual(len(backend.calls), 1)
+        self.assertEqual(client.stats["failures"], 1)
+        # Nothing was taken from the buckets, so a call without a deadline waits 60s.
+        client.deadline = None
+        client.generate("prompt")
+        self.assertAlmostEqual(client.stats["throttle_wait_s"], 60.0)
+
+    def test_injected_replay_errors_are_retried(self):
+        clock = _FakeClock()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rec.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"prompt_sha256": prompt_hash("prompt"), "text": '{"a": 1}',
+                                    "usage": {"prompt_tokens": 10, "output_tokens": 2}}) + "\n")
+            backend = ReplayBackend(path, latency_s=0.5, error_rate=0.5,
+                                    error_kinds=("429", "503", "timeout"), seed=7, sleep=clock.sleep)
+        client = self._client(backend, clock, max_retries=20)
+        for _ in range(10):
+            self.assertEqual(client.generate("prompt").text, '{"a": 1}')
+        self.assertGreater(backend.stats["injected_errors"], 0)
+        self.assertEqual(client.stats["retries"], backend.stats["injected_errors"])
+        self.assertEqual(client.stats["total_tokens"], 120)
+
+    def test_replay_from_env_rejects_unknown_error_kinds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rec.jsonl")
+            open(path, "w").close()
+            with patch.dict(os.environ, {"REPLAY_ERRORS": "429, 500"}):
+                with self.assertRaisesRegex(ValueError, "REPLAY_ERRORS='429, 500'"):
+                    ReplayBackend.from_env(path)
+            with patch.dict(os.environ, {"REPLAY_ERRORS": "503,timeout"}):
+                self.assertEqual(ReplayBackend.from_env(path).error_kinds, ("503", "timeout"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -173,6 +173,30 @@ class TestPipelineMock(unittest.TestCase):
         # TCI validation flag should be set (net_profit == total_comprehensive_income)
         self.assertTrue(fin["Net Profit (Loss) for the Year"].get("validated_vs_tci"))
 
+    def test_recorded_responses_replay_offline(self):
+        """A run recorded through RecordingBackend replays identically through ReplayBackend."""
+        from pipeline.gemini_extractor import GeminiExtractor
+        from utils.replay_backend import RecordingBackend, ReplayBackend
+
+        class _FakeModel:
+            def generate_content(model_self, prompt, **kwargs):
+                resp = self._mock_model_call(prompt)
+                return MagicMock(text=resp.text, usage_metadata=MagicMock(
+                    prompt_token_count=len(prompt) // 4, candidates_token_count=50))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gemini.jsonl")
+            recorded = GeminiExtractor(self._make_mock_pages(), "2024", {}, api_key="",
+                                       backend=RecordingBackend(_FakeModel(), path)).extract_all()
+            replay = ReplayBackend(path)
+            replayed = GeminiExtractor(self._make_mock_pages(), "2024", {}, api_key="",
+                                       backend=replay).extract_all()
+
+        self.assertEqual(replayed["financial_data"], recorded["financial_data"])
+        self.assertEqual(replayed["audit_checks"], recorded["audit_checks"])
+        self.assertEqual(replay.stats["misses"], 0)
+        self.assertEqual(replay.stats["hits"], len(recorded["token_usage"]))
+
     def test_validator_passes_on_good_data(self):
         """Arithmetic checks PASS when BS adds up correctly."""
         from pipeline.validator import run_checks
@@ -209,6 +233,171 @@ class TestPipelineMock(unittest.TestCase):
         self.assertEqual(pm[4], "notes")
         self.assertEqual(pm[5], "statutory_decl")
 
+    def test_note_locator_keeps_relevant_pages_within_budget(self):
+        """Only notes pages carrying requested breakdowns are sent, best page per breakdown first."""
+        from pipeline.note_locator import missing_targets, select_note_pages
+        filler = " lorem ipsum" * 400          # ~1,200 tokens of irrelevant narrative
+        pages = [
+            {"page": 10, "text": "significant accounting policies" + filler},
+            {"page": 11, "text": "staff costs: wages and salaries 500,000 epf 60,000 socso 20,000"},
+            {"page": 12, "text": "financial instruments fair value hierarchy" + filler},
+            {"page": 13, "text": "finance costs: interest on hire purchase 1,000 term loan 2,000"},
+            {"page": 14, "text": "profit before taxation is arrived at after charging depreciation"
+                                 + filler},
+        ]
+        notes = [p["page"] for p in pages]
+        self.assertEqual(select_note_pages(pages, notes, token_budget=2000), [11, 13, 14])
+        self.assertEqual(select_note_pages(pages, notes, token_budget=0), notes)
+        # User KeywordMap hints make an otherwise unmatched page relevant.
+        hints = {"Staff Cost": {"primary": ["fair value hierarchy"], "fallback": []}}
+        self.assertIn(12, select_note_pages(pages, notes, hints, token_budget=5000))
+
+        self.assertEqual(missing_targets({"interest_breakdown": {"total": 5.0},
+                                          "note21_breakdown": {"current_year": {"staff_costs": None}}}),
+                         ["staff_cost_breakdown", "note9_breakdown", "note18_breakdown",
+                          "note21_breakdown"])
+
+    def test_ocr_skips_text_pages_and_caches_per_page(self):
+        """Only image-only pages are OCR'd, each page records its source, and
+        OCR'd pages are cached per render setting."""
+        from pipeline import pdf_ocr
+        digital = "Statement of financial position as at 31 December 2024 RM 1,234,567. " * 5
+        layer = [digital, "", "(cid:12)(cid:7)" * 40, digital]
+        ocr_calls = []
+
+        def fake_ocr(pdf_path, dpi, page_numbers, render_ahead, verbose, cache):
+            ocr_calls.append((dpi, list(page_numbers)))
+            texts = {p: f"ocr page {p} @{dpi}" for p in page_numbers}
+            for p, text in texts.items():
+                cache.put(p, text)
+            return texts
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(pdf_ocr, "_CACHE_DIR", tmp), \
+                patch.object(pdf_ocr, "_text_layer_pages", return_value=layer), \
+                patch.object(pdf_ocr, "_pdf_hash", return_value="abc123"), \
+                patch.object(pdf_ocr, "_tesseract_version", return_value="tesseract 5.3.0"), \
+                patch.dict(sys.modules, {"pdf2image": MagicMock()}), \
+                patch.object(pdf_ocr, "_ocr_serial", side_effect=fake_ocr):
+            pages = pdf_ocr.extract_pages("report.pdf", workers=1, verbose=False)
+            again = pdf_ocr.extract_pages("report.pdf", workers=1, verbose=False)
+            pdf_ocr.extract_pages("report.pdf", dpi=400, workers=1, verbose=False)
+
+        self.assertEqual(ocr_calls, [(300, [2, 3]), (400, [2, 3])])
+        self.assertEqual([p["source"] for p in pages], ["text", "ocr", "ocr", "text"])
+        self.assertEqual(pages[2]["text"], "ocr page 3 @300")
+        self.assertEqual(again, pages)
+
+    def _fake_renderer(self, calls):
+        """pdf2image stand-in: page n renders as an 8 x n image and each call is recorded."""
+        from PIL import Image
+
+        def convert_from_path(pdf_path, dpi, first_page, last_page):
+            calls.append((first_page, last_page))
+            return [Image.new("L", (8, n), 255) for n in range(first_page, last_page + 1)]
+        return MagicMock(convert_from_path=convert_from_path)
+
+    def test_render_windows_yield_each_page_once(self):
+        """_iter_page_images renders consecutive runs of at most render_ahead pages."""
+        from pipeline import pdf_ocr
+        calls = []
+        wanted = [1, 2, 3, 5, 6, 9, 10, 11, 12, 13]
+        with patch.dict(sys.modules, {"pdf2image": self._fake_renderer(calls)}):
+            seen = [(n, img.height) for n, img in
+                    pdf_ocr._iter_page_images("report.pdf", 300, wanted, render_ahead=2)]
+        self.assertEqual(seen, [(n, n) for n in wanted])
+        self.assertEqual(calls, [(1, 2), (3, 3), (5, 6), (9, 10), (11, 12), (13, 13)])
+
+    def test_parallel_ocr_matches_serial_in_page_order(self):
+        """Pool OCR finishes out of order but returns and caches the same pages as the serial loop."""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from pipeline import pdf_ocr
+
+        class SlowFirstEngine:
+            def ocr(self, img):
+                time.sleep((20 - img.height) * 0.003)     # early pages finish last
+                return f"page {img.height}"
+
+        wanted = [2, 3, 4, 7, 8, 12, 15]
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp, \
+                ThreadPoolExecutor(max_workers=4) as pool, \
+                patch.object(pdf_ocr, "_CACHE_DIR", tmp), \
+                patch.object(pdf_ocr, "_tesseract_version", return_value="tesseract 5.3.0"), \
+                patch.object(pdf_ocr, "_ENGINE", SlowFirstEngine()), \
+                patch.object(pdf_ocr, "_ocr_pool", return_value=pool), \
+                patch.dict(sys.modules, {"pdf2image": self._fake_renderer([])}):
+            for mode in ("serial", "parallel"):
+                cache = pdf_ocr._PageCache(f"hash-{mode}", 300)
+                if mode == "serial":
+                    texts = pdf_ocr._ocr_serial("report.pdf", 300, wanted,
+                                                2, False, cache)
+                else:
+                    texts = pdf_ocr._ocr_parallel("report.pdf", 300, wanted,
+                                                  4, False, cache)
+                results[mode] = (list(texts.items()), [cache.get(p) for p in wanted])
+
+        self.assertEqual(results["parallel"], results["serial"])
+        self.assertEqual(results["parallel"][0], [(p, f"page {p}") for p in wanted])
+
+    def test_ocr_engine_created_once_per_pool_worker(self):
+        """Spawned pool workers pin OpenMP to one thread and build their engine once."""
+        from pipeline import pdf_ocr
+        self.assertEqual(pdf_ocr._POOL_CONTEXT.get_start_method(), "spawn")
+        with tempfile.TemporaryDirectory() as tmp:
+            fake_bin = Path(tmp) / "tesseract"          # found on PATH by the CLI engine
+            fake_bin.write_text("#!/bin/sh\necho 'tesseract 5.3.0'\n")
+            fake_bin.chmod(0o755)
+            with patch.dict(os.environ, {"PATH": f"{tmp}{os.pathsep}{os.environ['PATH']}"}):
+                try:
+                    pool = pdf_ocr._ocr_pool(2)
+                    infos = [f.result(60) for f in
+                             [pool.submit(pdf_ocr._worker_info) for _ in range(12)]]
+                finally:
+                    pdf_ocr._shutdown_pool()
+
+        self.assertEqual({(builds, omp) for _, builds, omp in infos}, {(1, "1")})
+        self.assertLessEqual(len({pid for pid, _, _ in infos}), 2)
+        self.assertNotIn(os.getpid(), {pid for pid, _, _ in infos})
+
+    def test_tesserocr_needs_no_tesseract_binary(self):
+        """With tesserocr the cache key and the engine never look for the tesseract CLI."""
+        from pipeline import pdf_ocr
+        tesserocr = MagicMock()
+        tesserocr.tesseract_version.return_value = "tesseract 5.3.0\n leptonica-1.83"
+        tesserocr.PyTessBaseAPI.return_value.GetUTF8Text.return_value = "page text"
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(pdf_ocr, "_CACHE_DIR", tmp), \
+                patch.object(pdf_ocr, "_ENGINE", None), \
+                patch.object(pdf_ocr, "_tesserocr_available", return_value=True), \
+                patch.object(pdf_ocr, "_tesseract_bin", side_effect=RuntimeError("no tesseract")), \
+                patch.dict(sys.modules, {"tesserocr": tesserocr,
+                                         "pdf2image": self._fake_renderer([])}):
+            texts = pdf_ocr._ocr_pages("report.pdf", "abc123", 300, [1, 2], 1, 2, False)
+            self.assertEqual(pdf_ocr.cached_pages("report.pdf", pdf_hash="abc123"), {1, 2})
+        self.assertEqual(texts, {1: "page text", 2: "page text"})
+
+    def test_public_cache_probes(self):
+        """cached_pages / has_entries answer the scheduler without touching cache internals."""
+        from pipeline import pdf_ocr
+        from utils import json_cache
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(pdf_ocr, "_CACHE_DIR", tmp), \
+                patch.object(json_cache, "_CACHE_DIR", os.path.join(tmp, ".llm_cache")), \
+                patch.object(pdf_ocr, "_tesseract_version", return_value="tesseract 5.3.0"):
+            cache = pdf_ocr._PageCache("abc123", 300)
+            for page_no in (1, 2, 7):
+                cache.put(page_no, "text")
+            pdf_ocr._PageCache("abc123", 400).put(3, "text")
+            self.assertEqual(pdf_ocr.cached_pages("report.pdf", 300, pdf_hash="abc123"), {1, 2, 7})
+            self.assertEqual(pdf_ocr.cached_pages("report.pdf", 200, pdf_hash="abc123"), set())
+            self.assertFalse(json_cache.has_entries("abc123"))
+            json_cache.save("abc123", "audit", {"opinion": "UNQUALIFIED"}, "k1")
+            self.assertTrue(json_cache.has_entries("abc123"))
+        with patch.object(pdf_ocr, "_tesseract_version", side_effect=RuntimeError("no tesseract")):
+            self.assertEqual(pdf_ocr.cached_pages("report.pdf", pdf_hash="abc123"), set())
+
     def test_json_cache_roundtrip(self):
         """json_cache save/load roundtrip works."""
         from utils import json_cache
@@ -227,6 +416,95 @@ class TestPipelineMock(unittest.TestCase):
             finally:
                 json_cache._CACHE_DIR = orig_dir
 
+    def test_json_cache_keys_by_model_and_prompt(self):
+        """A different model or prompt misses; LRU pruning drops the oldest entry."""
+        from utils import json_cache
+        orig_dir = json_cache._CACHE_DIR
+        with tempfile.TemporaryDirectory() as tmp:
+            json_cache._CACHE_DIR = os.path.join(tmp, ".llm_cache")
+            try:
+                json_cache.reset_stats()
+                k1 = json_cache.cache_key("gemini-a", 1, "prompt for 2023")
+                audit = {"opinion": "UNQUALIFIED", "opinion_evidence": "x" * 2000}
+                json_cache.save("abc123", "audit", audit, k1)
+                self.assertEqual(json_cache.load("abc123", "audit", k1), audit)
+                for other in (json_cache.cache_key("gemini-b", 1, "prompt for 2023"),
+                              json_cache.cache_key("gemini-a", 2, "prompt for 2023"),
+                              json_cache.cache_key("gemini-a", 1, "prompt for 2024")):
+                    self.assertIsNone(json_cache.load("abc123", "audit", other))
+                self.assertEqual(json_cache.stats(), {"hits": 1, "misses": 3, "writes": 1})
+
+                k2 = json_cache.cache_key("gemini-a", 1, "notes prompt")
+                json_cache.save("abc123", "notes", {"total": 1.0}, k2)
+                old = json_cache._path("abc123", "audit", k1)
+                os.utime(old, (1, 1))
+                self.assertEqual(json_cache.prune(max_mb=0.001), 1)
+                self.assertFalse(os.path.exists(old))
+                self.assertIsNotNone(json_cache.load("abc123", "notes", k2))
+            finally:
+                json_cache._CACHE_DIR = orig_dir
+
+    def test_disk_lru_prunes_each_cache_once_at_exit(self):
+        """prune_at_exit only schedules; the pending prune walks each root once, oldest first."""
+        from utils import disk_lru
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(disk_lru, "_pending", {}), \
+                patch.object(disk_lru, "prune", wraps=disk_lru.prune) as prune:
+            pages = os.path.join(tmp, "pages", "abc123")
+            os.makedirs(pages)
+            for i in range(3):
+                path = os.path.join(pages, f"{i:04d}.txt.gz")
+                with open(path, "wb") as f:
+                    f.write(b"x" * 1024)
+                os.utime(path, (100 + i, 100 + i))
+            for _ in range(5):
+                disk_lru.prune_at_exit(os.path.join(tmp, "pages"), 2.5 / 1024)
+            self.assertEqual(prune.call_count, 0)
+            self.assertEqual(disk_lru.prune_pending(), 1)
+            self.assertEqual(prune.call_count, 1)
+            self.assertEqual(sorted(os.listdir(pages)), ["0001.txt.gz", "0002.txt.gz"])
+            self.assertEqual(disk_lru.prune_pending(), 0)
+
+    def test_excel_xml_writer_matches_openpyxl(self):
+        """XML patch writer and openpyxl writer produce the same cell values."""
+        import openpyxl
+        from pipeline.excel_filler import write_output
+
+        template = Path(__file__).resolve().parents[2] / "Financial Statements Template.xlsx"
+        fin = {
+            "Revenue": {"value": 27983932.0},
+            "Cost of Sales": {"value": 24122517.0},
+            "Total Asset": {"value": 20978007.0},
+            "Net Profit (Loss) for the Year": {"value": 252310.0, "validated_vs_tci": True},
+        }
+        kwargs = dict(
+            target_year="2024",
+            audit_checks=dict(_AUDIT_RESPONSE, signature_consistency="CONSISTENT"),
+            financial_data=fin,
+            blacklist_firm={"status": "CLEAN", "evidence": []},
+            blacklist_accountant={"status": "FLAGGED", "evidence": ["news hit"]},
+            validation_results={"Total Assets = Liabilities + Equity": {"status": "PASS"}},
+            token_usage={"audit": {"prompt_tokens": 1200, "output_tokens": 300}},
+            year_end_date="31/12/2024",
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            outputs = {}
+            for writer in ("xml", "openpyxl"):
+                out = os.path.join(tmp, f"{writer}.xlsx")
+                write_output(str(template), out, writer=writer, **kwargs)
+                wb = openpyxl.load_workbook(out)
+                outputs[writer] = {
+                    ws.title: {c.coordinate: c.value for row in ws.iter_rows() for c in row
+                               if c.value is not None}
+                    for ws in wb.worksheets
+                }
+                outputs[writer + "_font"] = wb["auditor"]["A1"].font.color.rgb
+                wb.close()
+
+        self.assertEqual(list(outputs["xml"]), list(outputs["openpyxl"]))
+        self.assertEqual(outputs["xml"], outputs["openpyxl"])
+        self.assertEqual(outputs["xml_font"], outputs["openpyxl_font"])
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,62 @@
+"""
+Size cap for on-disk caches (LLM answers in json_cache, OCR pages in pdf_ocr).
+
+Cache readers touch a file's mtime on every hit, so mtime is its last-used
+time and trimming a cache is one walk: delete the oldest files until the
+rest fits.  prune_at_exit() defers that walk to interpreter exit, so a batch
+of hundreds of PDFs walks each cache once instead of once per PDF.
+"""
+
+import atexit
+import os
+import threading
+
+_pending: dict[str, float] = {}
+_pending_lock = threading.Lock()
+_registered = False
+
+
+def prune(root: str, max_mb: float) -> int:
+    """Delete least-recently-used files under root until it fits in max_mb. Returns count deleted."""
+    if not os.path.isdir(root):
+        return 0
+    entries = []
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    limit = max_mb * 1024 * 1024
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def prune_at_exit(root: str, max_mb: float) -> None:
+    """Prune root once when the process exits, however many times this is called."""
+    global _registered
+    with _pending_lock:
+        _pending[root] = max_mb
+        if not _registered:
+            atexit.register(prune_pending)
+            _registered = True
+
+
+def prune_pending() -> int:
+    """Run the prunes scheduled by prune_at_exit now. Returns total count deleted."""
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    return sum(prune(root, max_mb) for root, max_mb in pending.items())
@@ -1,16 +1,35 @@
 """
-LLM result cache — persists Gemini responses by PDF hash + section name.
+LLM result cache — persists Gemini responses by PDF hash + section name,
+content-addressed by what was actually asked.
 
-Cache lives in .llm_cache/ relative to the working directory.
-Re-running the tool on the same PDF costs nothing (Gemini not called again).
+Entries live under <root>/<pdf_hash>/<section>-<key>.json, where key is a
+digest of (model, prompt-template version, exact prompt text, call
+parameters) from cache_key().  Changing --model, editing a prompt, or a
+different target_year / hints therefore misses instead of returning a stale
+answer, while unchanged sections stay free.
+
+Root: LLM_CACHE_DIR, else AuditorReportReader/.llm_cache — the same place
+whatever the working directory.  Writes are atomic; the cache is capped at
+LLM_CACHE_MAX_MB (default 200) by evicting least-recently-used entries
+when the process exits (see utils/disk_lru).
 """
 
 import hashlib
 import json
 import os
+import threading
 from typing import Optional
 
-_CACHE_DIR = ".llm_cache"
+from utils import disk_lru
+
+_CACHE_DIR = os.environ.get("LLM_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    ".llm_cache",
+)
+_CACHE_MAX_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "200"))
+
+_stats = {"hits": 0, "misses": 0, "writes": 0}
+_stats_lock = threading.Lock()
 
 
 def pdf_hash(pdf_path: str) -> str:
@@ -22,34 +41,107 @@ def pdf_hash(pdf_path: str) -> str:
     return h.hexdigest()
 
 
-def _path(file_hash: str, section: str) -> str:
-    os.makedirs(_CACHE_DIR, exist_ok=True)
-    return os.path.join(_CACHE_DIR, f"{file_hash}_{section}.json")
+def cache_key(model: str, prompt_version: int, prompt: str, params: Optional[dict] = None) -> str:
+    """Digest of everything that determines a response."""
+    h = hashlib.sha256()
+    h.update(json.dumps([model, prompt_version, params or {}], sort_keys=True,
+                        default=str).encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()[:24]
+
+
+def _path(file_hash: str, section: str, key: Optional[str] = None) -> str:
+    name = f"{section}-{key}.json" if key else f"{section}.json"
+    return os.path.join(_CACHE_DIR, file_hash, name)
 
 
-def load(file_hash: str, section: str) -> Optional[dict]:
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def load(file_hash: str, section: str, key: Optional[str] = None) -> Optional[dict]:
     """Return cached dict or None if not cached."""
-    p = _path(file_hash, section)
-    if os.path.exists(p):
+    p = _path(file_hash, section, key)
+    try:
         with open(p, encoding="utf-8") as f:
-            return json.load(f)
-    return None
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        _count("misses")
+        return None
+    try:
+        os.utime(p)  # mtime doubles as last-used time for pruning
+    except OSError:
+        pass
+    _count("hits")
+    return data
 
 
-def save(file_hash: str, section: str, data: dict) -> None:
-    """Persist a Gemini response dict."""
-    p = _path(file_hash, section)
-    with open(p, "w", encoding="utf-8") as f:
+def save(file_hash: str, section: str, data: dict, key: Optional[str] = None) -> None:
+    """Persist a Gemini response dict (write to a temp file, then rename)."""
+    p = _path(file_hash, section, key)
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = f"{p}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, p)
+    _count("writes")
+
+
+def has_entries(file_hash: str) -> bool:
+    """True when anything is cached for this PDF (under any model or prompt)."""
+    pdf_dir = os.path.join(_CACHE_DIR, file_hash)
+    return os.path.isdir(pdf_dir) and any(n.endswith(".json") for n in os.listdir(pdf_dir))
 
 
 def clear(file_hash: str) -> int:
     """Delete all cached sections for a given PDF. Returns count deleted."""
     removed = 0
-    if not os.path.isdir(_CACHE_DIR):
-        return 0
-    for fname in os.listdir(_CACHE_DIR):
-        if fname.startswith(file_hash + "_"):
-            os.remove(os.path.join(_CACHE_DIR, fname))
+    pdf_dir = os.path.join(_CACHE_DIR, file_hash)
+    if os.path.isdir(pdf_dir):
+        for fname in os.listdir(pdf_dir):
+            os.remove(os.path.join(pdf_dir, fname))
             removed += 1
+        os.rmdir(pdf_dir)
+    if os.path.isdir(_CACHE_DIR):
+        # flat <hash>_<section>.json files from the old layout
+        for fname in os.listdir(_CACHE_DIR):
+            if fname.startswith(file_hash + "_"):
+                os.remove(os.path.join(_CACHE_DIR, fname))
+                removed += 1
     return removed
+
+
+def prune(max_mb: float = _CACHE_MAX_MB) -> int:
+    """Delete least-recently-used entries until the cache fits in max_mb. Returns count deleted."""
+    return disk_lru.prune(_CACHE_DIR, max_mb)
+
+
+def prune_at_exit(max_mb: float = _CACHE_MAX_MB) -> None:
+    """prune() once at interpreter exit, however many extractions ask for it."""
+    disk_lru.prune_at_exit(_CACHE_DIR, max_mb)
+
+
+# ---------------------------------------------------------------------------
+# Per-run statistics
+# ---------------------------------------------------------------------------
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        for k in _stats:
+            _stats[k] = 0
+
+
+def format_stats() -> str:
+    """One-line summary, e.g. '3/4 hits (75%), 1 written'."""
+    s = stats()
+    lookups = s["hits"] + s["misses"]
+    if not lookups:
+        return "no lookups"
+    return f"{s['hits']}/{lookups} hits ({s['hits'] / lookups:.0%}), {s['writes']} written"
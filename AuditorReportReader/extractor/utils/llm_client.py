@@ -0,0 +1,276 @@
+"""
+Resilient LLM client layer.
+
+Wraps any backend exposing generate_content(prompt, **kwargs) — the Gemini
+GenerativeModel, or a local fake in tests — with:
+
+  - a process-wide token-bucket limiter for requests and tokens per minute
+    (GEMINI_RPM / GEMINI_TPM; unset or 0 = unlimited), shared by every
+    extractor thread so batch runs stay inside the account quota
+  - exponential backoff with full jitter on retryable errors (429, 5xx,
+    timeouts, dropped connections); other errors are raised at once
+  - a per-attempt request timeout (GEMINI_TIMEOUT) and an overall deadline
+    across throttling and retries (GEMINI_DEADLINE)
+  - counters for calls, retries, failures, throttle waits and tokens used
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+# Exception class names (anywhere in the MRO) that mean "try again later".
+# Matched by name so google.api_core does not have to be importable here.
+_RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "BadGateway", "GatewayTimeout", "DeadlineExceeded",
+    "Aborted", "Timeout", "ReadTimeout", "ConnectTimeout",
+}
+_RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    """Raised when a call still fails after retries or runs out of deadline."""
+
+
+def _env_float(name: str, default: float = 0.0) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _RETRYABLE_NAMES for cls in type(exc).__mro__):
+        return True
+    code = getattr(exc, "code", None)
+    code = getattr(code, "value", code)          # grpc StatusCode-style enums
+    return isinstance(code, int) and code in _RETRYABLE_CODES
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    Refills at rate_per_minute, holds up to one minute's worth.  acquire()
+    blocks until the amount is available; debit() charges after the fact and
+    may drive the level negative, which delays the next acquire().
+    """
+
+    def __init__(self, rate_per_minute: float,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.level = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> Optional[float]:
+        """Take amount (capped at capacity) from the bucket; returns seconds waited.
+
+        With a timeout, returns None without taking anything (and without
+        sleeping out the rest) as soon as the wait would run past it.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                wait = (amount - self.level) / self.rate
+            if timeout is not None and waited + wait > timeout:
+                return None
+            self._sleep(wait)
+            waited += wait
+
+    def debit(self, amount: float):
+        with self._lock:
+            self._refill()
+            self.level -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets; a limit of 0 disables it."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.requests = TokenBucket(rpm, clock, sleep) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, clock, sleep) if tpm > 0 else None
+
+    def acquire(self, est_tokens: int, timeout: Optional[float] = None) -> Optional[float]:
+        """Block until one request and est_tokens fit; returns seconds waited,
+        or None (nothing taken) if that would take longer than timeout."""
+        waited = 0.0
+        if self.requests:
+            got = self.requests.acquire(1, timeout)
+            if got is None:
+                return None
+            waited += got
+        if self.tokens:
+            got = self.tokens.acquire(est_tokens, None if timeout is None else timeout - waited)
+            if got is None:
+                if self.requests:
+                    self.requests.debit(-1)     # hand the request slot back
+                return None
+            waited += got
+        return waited
+
+    def settle(self, est_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the response reports real usage."""
+        if self.tokens and actual_tokens:
+            self.tokens.debit(actual_tokens - est_tokens)
+
+
+_SHARED_LIMITER: Optional[RateLimiter] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_limiter() -> RateLimiter:
+    """The process-wide limiter, sized from GEMINI_RPM / GEMINI_TPM on first use."""
+    global _SHARED_LIMITER
+    with _SHARED_LOCK:
+        if _SHARED_LIMITER is None:
+            _SHARED_LIMITER = RateLimiter(_env_float("GEMINI_RPM"), _env_float("GEMINI_TPM"))
+        return _SHARED_LIMITER
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+def _usage_tokens(response) -> dict:
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return {}
+
+    def count(name: str) -> int:
+        n = getattr(usage, name, 0)
+        return n if isinstance(n, int) else 0
+
+    return {
+        "prompt_tokens":  count("prompt_token_count"),
+        "output_tokens":  count("candidates_token_count"),
+        "total_tokens":   count("total_token_count"),
+    }
+
+
+class LLMClient:
+    """
+    Rate-limited, retrying front for one backend.  Thread-safe: the extractor
+    shares one client across its section threads.
+
+    timeout  : seconds per attempt, passed to the backend as
+               request_options={"timeout": ...} (omitted when None)
+    deadline : seconds for the whole call including throttling, retries and back-off
+    """
+
+    def __init__(self, backend, limiter: Optional[RateLimiter] = None,
+                 max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 timeout: Optional[float] = None, deadline: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.backend = backend
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.deadline = deadline
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0, "retries": 0, "failures": 0, "throttle_wait_s": 0.0,
+            "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+        }
+
+    @classmethod
+    def from_env(cls, backend) -> "LLMClient":
+        """Client on the shared limiter with GEMINI_TIMEOUT / GEMINI_DEADLINE / GEMINI_MAX_RETRIES."""
+        return cls(
+            backend,
+            limiter=shared_limiter(),
+            max_retries=int(_env_float("GEMINI_MAX_RETRIES", 4)),
+            timeout=_env_float("GEMINI_TIMEOUT") or None,
+            deadline=_env_float("GEMINI_DEADLINE") or None,
+        )
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, n in deltas.items():
+                self.stats[key] += n
+
+    def generate(self, prompt: str, **kwargs):
+        """
+        backend.generate_content(prompt, **kwargs) with limiting and retries.
+        Returns the backend response; raises LLMError once retries or the
+        deadline run out, or the original exception if it is not retryable.
+        """
+        start = self._clock()
+        est_tokens = len(prompt) // 4       # ~4 chars per token; corrected after the call
+        self._count(calls=1)
+        attempt = 0
+        while True:
+            # Throttling counts against the deadline like any other wait.
+            budget = None if self.deadline is None else self.deadline - (self._clock() - start)
+            waited = self.limiter.acquire(est_tokens, timeout=budget)
+            if waited is None:
+                self._count(failures=1)
+                raise LLMError(f"deadline of {self.deadline:.0f}s exceeded waiting for the "
+                               f"rate limiter before attempt {attempt + 1}")
+            self._count(throttle_wait_s=waited)
+            call_kwargs = dict(kwargs)
+            timeout = self.timeout
+            if self.deadline is not None:
+                remaining = self.deadline - (self._clock() - start)
+                if remaining <= 0:
+                    self._count(failures=1)
+                    raise LLMError(f"deadline of {self.deadline:.0f}s exceeded before attempt {attempt + 1}")
+                timeout = min(timeout, remaining) if timeout else remaining
+            if timeout:
+                call_kwargs["request_options"] = {"timeout": timeout}
+
+            try:
+                response = self.backend.generate_content(prompt, **call_kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    self._count(failures=1)
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                out_of_time = (self.deadline is not None and
+                               self._clock() - start + delay >= self.deadline)
+                if attempt >= self.max_retries or out_of_time:
+                    self._count(failures=1)
+                    raise LLMError(f"giving up after {attempt + 1} attempt(s): {e}") from e
+                attempt += 1
+                self._count(retries=1)
+                print(f"    [LLM] {type(e).__name__}: retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                self._sleep(delay)
+                continue
+
+            usage = _usage_tokens(response)
+            self.limiter.settle(est_tokens, usage.get("total_tokens", 0))
+            if usage:
+                self._count(**usage)
+            return response
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return (f"{s['calls']} call(s), {s['retries']} retries, {s['failures']} failed, "
+                f"{s['throttle_wait_s']:.1f}s throttled, {s['total_tokens']:,} tokens")
@@ -0,0 +1,196 @@
+"""
+Offline stand-in for genai.GenerativeModel — record real Gemini responses,
+replay them without a network.
+
+  RecordingBackend(model, path)  wraps the real model and appends every
+                                 response to a JSONL file
+  ReplayBackend(path, ...)       answers generate_content() from that file,
+                                 keyed by SHA-256 of the prompt, with
+                                 simulated latency, injected errors and
+                                 token usage
+
+Both plug into GeminiExtractor(backend=...) or the GEMINI_REPLAY /
+GEMINI_RECORD environment variables (--replay / --record on the CLI), so
+batch throughput, concurrency and retry behaviour can be load-tested on a
+disconnected box.  Injected errors use the same class names as
+google.api_core (ResourceExhausted, ServiceUnavailable), so utils/llm_client
+retries them exactly as it would real ones.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class ReplayMiss(LookupError):
+    """No recording for this prompt (not retryable)."""
+
+
+class InjectedError(Exception):
+    """Base for errors ReplayBackend raises on purpose."""
+
+
+class ResourceExhausted(InjectedError):
+    code = 429
+
+
+class ServiceUnavailable(InjectedError):
+    code = 503
+
+
+class InjectedTimeout(InjectedError, TimeoutError):
+    pass
+
+
+_ERROR_KINDS = {
+    "429": ResourceExhausted,
+    "503": ServiceUnavailable,
+    "timeout": InjectedTimeout,
+}
+
+
+def _usage(prompt_tokens: int, output_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=output_tokens,
+        total_token_count=prompt_tokens + output_tokens,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+class RecordingBackend:
+    """Pass calls through to a real model and append {prompt hash, text, usage, latency} to path."""
+
+    def __init__(self, model, path: str):
+        self.model = model
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def generate_content(self, prompt: str, **kwargs):
+        start = time.monotonic()
+        response = self.model.generate_content(prompt, **kwargs)
+        usage = getattr(response, "usage_metadata", None)
+        record = {
+            "prompt_sha256": prompt_hash(prompt),
+            "text": response.text,
+            "usage": {
+                "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+                "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+            } if usage else None,
+            "latency_s": round(time.monotonic() - start, 3),
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+class ReplayBackend:
+    """
+    Replay recorded responses.
+
+    latency_s        : seconds per call, or None to replay each recording's
+                       own latency; latency_jitter_s adds uniform ± noise
+    error_rate       : probability a call raises one of error_kinds
+                       ("429", "503", "timeout") instead of answering
+    usage_jitter     : token counts are scaled by uniform(1 ± usage_jitter);
+                       recordings without usage get ~4 chars/token estimates
+    on_miss          : "error" raises ReplayMiss, "empty" answers "{}"
+    """
+
+    def __init__(self, path: str, latency_s: Optional[float] = 0.0,
+                 latency_jitter_s: float = 0.0, error_rate: float = 0.0,
+                 error_kinds: tuple = ("429",), usage_jitter: float = 0.0,
+                 on_miss: str = "error", seed: Optional[int] = None,
+                 sleep=time.sleep):
+        self.records: dict = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final line from an interrupted recording
+                self.records[rec["prompt_sha256"]] = rec  # latest recording wins
+        self.latency_s = latency_s
+        self.latency_jitter_s = latency_jitter_s
+        self.error_rate = error_rate
+        self.error_kinds = tuple(error_kinds)
+        self.usage_jitter = usage_jitter
+        self.on_miss = on_miss
+        self._rng = random.Random(seed)
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "hits": 0, "misses": 0, "injected_errors": 0}
+
+    @classmethod
+    def from_env(cls, path: str) -> "ReplayBackend":
+        """REPLAY_LATENCY_S ("recorded" = use recorded latency), REPLAY_LATENCY_JITTER_S,
+        REPLAY_ERROR_RATE, REPLAY_ERRORS (comma list), REPLAY_USAGE_JITTER, REPLAY_SEED."""
+        latency = os.environ.get("REPLAY_LATENCY_S", "0")
+        seed = os.environ.get("REPLAY_SEED", "")
+        error_kinds = tuple(k.strip() for k in
+                            os.environ.get("REPLAY_ERRORS", "429").split(",") if k.strip())
+        unknown = [k for k in error_kinds if k not in _ERROR_KINDS]
+        if unknown or not error_kinds:
+            raise ValueError(f"REPLAY_ERRORS={os.environ.get('REPLAY_ERRORS')!r}: expected a "
+                             f"comma list of {', '.join(_ERROR_KINDS)}")
+        return cls(
+            path,
+            latency_s=None if latency == "recorded" else float(latency),
+            latency_jitter_s=float(os.environ.get("REPLAY_LATENCY_JITTER_S", "0")),
+            error_rate=float(os.environ.get("REPLAY_ERROR_RATE", "0")),
+            error_kinds=error_kinds,
+            usage_jitter=float(os.environ.get("REPLAY_USAGE_JITTER", "0")),
+            seed=int(seed) if seed.isdigit() else None,
+        )
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def generate_content(self, prompt: str, **kwargs):
+        self._count("calls")
+        rec = self.records.get(prompt_hash(prompt))
+        with self._lock:   # random.Random is not safe to share across threads
+            base = self.latency_s if self.latency_s is not None else (rec or {}).get("latency_s", 0.0)
+            delay = max(0.0, base + self._rng.uniform(-self.latency_jitter_s, self.latency_jitter_s))
+            fail = self._rng.random() < self.error_rate
+            kind = self._rng.choice(self.error_kinds) if fail else None
+            scale = self._rng.uniform(1 - self.usage_jitter, 1 + self.usage_jitter)
+        if delay:
+            self._sleep(delay)
+        if fail:
+            self._count("injected_errors")
+            raise _ERROR_KINDS[kind](f"injected {kind}")
+
+        if rec is None:
+            self._count("misses")
+            if self.on_miss != "empty":
+                raise ReplayMiss(f"no recording for prompt {prompt_hash(prompt)[:12]}")
+            rec = {"text": "{}"}
+        else:
+            self._count("hits")
+        text = rec["text"]
+        usage = rec.get("usage") or {"prompt_tokens": len(prompt) // 4,
+                                     "output_tokens": len(text) // 4}
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=_usage(int(usage["prompt_tokens"] * scale),
+                                  int(usage["output_tokens"] * scale)),
+        )
@@ -12,6 +12,7 @@ from pdf_utils import (
     read_pdf_text,
     RE_MONEY,
 )
+from section_cache import section_cache
 
 
 # =============================
@@ -87,12 +88,9 @@ def _extract_numbers_after_date(line: str) -> List[Decimal]:
 
 
 def _digit_counts(value: str) -> Dict[str, int]:
-    counts = {"0": 0, "1": 0, "2": 0, "3": 0, "5_plus": 0}
-    for ch in value:
-        if ch in {"0", "1", "2", "3"}:
-            counts[ch] += 1
-        elif ch.isdigit() and ch >= "4":
-            counts["5_plus"] += 1
+    """Legacy CCRIS buckets: every digit character counts once ('10' is a 1 and a 0)."""
+    counts = {d: value.count(d) for d in ("0", "1", "2", "3")}
+    counts["5_plus"] = sum(value.count(d) for d in "456789")
     return counts
 
 
@@ -188,15 +186,11 @@ def analyze_account_lines(records: List[BankingAccountRecord]) -> Dict[str, Any]
 
             term_details = _extract_term_details(line)
             if term_details:
-                next_first_counts = term_details.get(
-                    "first_number_digit_counts_0_1_2_3_5_plus", {}
-                )
-                next_six_counts = term_details.get(
-                    "next_six_numbers_digit_counts_0_1_2_3_5_plus", {}
-                )
+                next_first_counts = term_details["first_number_digit_counts_0_1_2_3_5_plus"]
+                next_six_counts = term_details["next_six_numbers_digit_counts_0_1_2_3_5_plus"]
                 for key in next_six_digit_totals:
-                    next_first_digit_totals[key] += next_first_counts.get(key, 0)
-                    next_six_digit_totals[key] += next_six_counts.get(key, 0)
+                    next_first_digit_totals[key] += next_first_counts[key]
+                    next_six_digit_totals[key] += next_six_counts[key]
 
             outstanding_limit_values = parse_outstanding_limit_from_text(line)
             if (
@@ -321,6 +315,15 @@ def split_into_records(lines: List[str]) -> List[BankingAccountRecord]:
     return records
 
 
+def parse_banking_section(section_lines: List[str]) -> Dict[str, Any]:
+    """Split one subject's banking section into records and analyze them."""
+    records = split_into_records(section_lines)
+    return {
+        "record_count": len(records),
+        "account_line_analysis": analyze_account_lines(records),
+    }
+
+
 # =============================
 # MAIN
 # =============================
@@ -335,13 +338,11 @@ def extract_detailed_credit_report(pdf_path: str) -> Dict[str, Any]:
     sections_data = []
 
     for section_idx, section_lines in enumerate(all_section_lines, start=1):
-        records = split_into_records(section_lines)
-        analysis = analyze_account_lines(records)
-        sections_data.append({
-            "section_number": section_idx,
-            "record_count": len(records),
-            "account_line_analysis": analysis,
-        })
+        # The same director/guarantor appears in many reports; reuse their parsed slice.
+        parsed = section_cache.get_or_parse(
+            "banking_section", section_lines, lambda: parse_banking_section(section_lines)
+        )
+        sections_data.append({"section_number": section_idx, **parsed})
 
     output: Dict[str, Any] = {
         "source_pdf": pdf_path,
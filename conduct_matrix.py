@@ -0,0 +1,68 @@
+"""Facility × month conduct (months-in-arrears) matrix for NLCI outstanding-credit records."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Legacy NLCI bucket layout folds MIA 4 and above into "4+".
+NLCI_PLUS_KEY = "4+"
+PLUS_LEVEL = 4
+_MAX_LEVEL = 255
+
+
+class ConductMatrix:
+    """One bytes row per facility, most recent month first; each byte is that month's MIA level.
+
+    Window/threshold queries slice every row once, join the slices and let bytes.count
+    tally each level in C, so a 12-month or MIA3+ rule costs the same as the 1/6-month ones.
+    """
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: Optional[List[bytes]] = None) -> None:
+        self.rows: List[bytes] = rows if rows is not None else []
+
+    @classmethod
+    def from_values(cls, rows: Iterable[Sequence[int]]) -> "ConductMatrix":
+        return cls([bytes(min(max(int(v), 0), _MAX_LEVEL) for v in row) for row in rows])
+
+    def add_row(self, values: Sequence[int]) -> None:
+        self.rows.append(bytes(min(max(int(v), 0), _MAX_LEVEL) for v in values))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _window(self, window: Optional[int]) -> bytes:
+        if window is None:
+            return b"".join(self.rows)
+        return b"".join(row[:window] for row in self.rows)
+
+    def months_at_least(self, threshold: int, window: Optional[int] = None) -> int:
+        """Facility-months with MIA >= threshold within the window."""
+        data = self._window(window)
+        return len(data) - sum(data.count(level) for level in range(min(threshold, _MAX_LEVEL + 1)))
+
+    def buckets(self, window: Optional[int], plus_key: str, plus_level: int = PLUS_LEVEL) -> Dict[str, int]:
+        """Legacy-shaped {"0", "1", "2", "3", plus_key} counts for the window."""
+        return _buckets(self._window(window), plus_key, plus_level)
+
+    def row_buckets(self, index: int, window: Optional[int], plus_key: str,
+                    plus_level: int = PLUS_LEVEL) -> Dict[str, int]:
+        """buckets() for one facility."""
+        return _buckets(self.rows[index][:window], plus_key, plus_level)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"rows": [list(row) for row in self.rows]}
+
+    @classmethod
+    def from_dict(cls, data: Any) -> Optional["ConductMatrix"]:
+        """Rebuild from merged-report JSON; None when the report predates the matrix."""
+        if not isinstance(data, dict) or not isinstance(data.get("rows"), list):
+            return None
+        return cls.from_values(data["rows"])
+
+
+def _buckets(data: bytes, plus_key: str, plus_level: int) -> Dict[str, int]:
+    out = {str(level): data.count(level) for level in range(plus_level)}
+    out[plus_key] = len(data) - sum(out.values())
+    return out
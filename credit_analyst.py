@@ -22,6 +22,8 @@ from datetime import date
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from conduct_matrix import ConductMatrix
+
 CURRENT_YEAR = date.today().year
 
 # ─── Grade / score tables (aligned with insert_excel_file.SCORE_RANGE_EQUIVALENTS) ───
@@ -164,6 +166,7 @@ def get_mia(merged: Dict, si: int = 1) -> Dict:
         ccris_c1 = totals.get("next_first_numbers_digit_counts_0_1_2_3_5_plus") or {}
 
     nlci_data = _nlci(merged)
+    nlci = ConductMatrix.from_dict(nlci_data.get("conduct_matrix"))
     stats = nlci_data.get("stats_totals") or {}
     nlci_p6: Dict = (stats.get("last_6_months") or {}).get("freq", {})
     nlci_c1: Dict = (stats.get("last_1_month") or {}).get("freq", {})
@@ -173,15 +176,21 @@ def get_mia(merged: Dict, si: int = 1) -> Dict:
         total += _safe_int(counts.get(plus_key))
         return total
 
+    def _nlci_above(window: int, counts: Dict, min_lvl: int) -> int:
+        if nlci is not None:
+            return nlci.months_at_least(min_lvl, window)
+        # NLCI JSON saved before the conduct matrix existed: use the bucket dicts.
+        return _above(counts, min_lvl, "4+")
+
     return {
         "ccris_p6_mia1plus": _above(ccris_p6, 1, "5_plus"),
         "ccris_p6_mia2plus": _above(ccris_p6, 2, "5_plus"),
         "ccris_c1_mia1plus": _above(ccris_c1, 1, "5_plus"),
         "ccris_c1_mia2plus": _above(ccris_c1, 2, "5_plus"),
-        "nlci_p6_mia1plus":  _above(nlci_p6, 1, "4+"),
-        "nlci_p6_mia2plus":  _above(nlci_p6, 2, "4+"),
-        "nlci_c1_mia1plus":  _above(nlci_c1, 1, "4+"),
-        "nlci_c1_mia2plus":  _above(nlci_c1, 2, "4+"),
+        "nlci_p6_mia1plus":  _nlci_above(6, nlci_p6, 1),
+        "nlci_p6_mia2plus":  _nlci_above(6, nlci_p6, 2),
+        "nlci_c1_mia1plus":  _nlci_above(1, nlci_c1, 1),
+        "nlci_c1_mia2plus":  _nlci_above(1, nlci_c1, 2),
     }
 
 
@@ -727,6 +736,28 @@ def format_report(a: Assessment) -> str:
     return "\n".join(lines)
 
 
+def assessment_to_dict(result: Assessment) -> Dict:
+    """JSON-ready summary of an assessment (the --json-out / watch-folder format)."""
+    return {
+        "company": result.company_name,
+        "subject_index": result.si,
+        "date": result.date,
+        "cra_score": result.cra_score,
+        "grade": result.grade,
+        "utilization_pct": round((result.utilization or 0) * 100, 1),
+        "total_outstanding": result.total_outstanding,
+        "total_limit": result.total_limit,
+        "ops_years": result.ops_years,
+        "risk_score": result.risk_score,
+        "risk_band": result.risk_band,
+        "recommendation": result.recommendation,
+        "recommended_limit_rm": result.limit,
+        "hard_decline_reasons": result.decline_reasons,
+        "early_warnings": [{"level": w.level, "code": w.code} for w in result.warnings],
+        "dimensions": [{"name": d.name, "score": d.score, "max": d.max_score} for d in result.dimensions],
+    }
+
+
 # ─── CLI ──────────────────────────────────────────────────────────────────────
 
 def _load_merged(args: argparse.Namespace) -> Dict:
@@ -760,24 +791,7 @@ def main() -> None:
     print(format_report(result))
 
     if args.json_out:
-        out: Dict = {
-            "company": result.company_name,
-            "subject_index": result.si,
-            "date": result.date,
-            "cra_score": result.cra_score,
-            "grade": result.grade,
-            "utilization_pct": round((result.utilization or 0) * 100, 1),
-            "total_outstanding": result.total_outstanding,
-            "total_limit": result.total_limit,
-            "ops_years": result.ops_years,
-            "risk_score": result.risk_score,
-            "risk_band": result.risk_band,
-            "recommendation": result.recommendation,
-            "recommended_limit_rm": result.limit,
-            "hard_decline_reasons": result.decline_reasons,
-            "early_warnings": [{"level": w.level, "code": w.code} for w in result.warnings],
-            "dimensions": [{"name": d.name, "score": d.score, "max": d.max_score} for d in result.dimensions],
-        }
+        out = assessment_to_dict(result)
         Path(args.json_out).write_text(json.dumps(out, indent=2, ensure_ascii=False), encoding="utf-8")
         print(f"\nAssessment JSON saved to: {args.json_out}")
 
@@ -0,0 +1,102 @@
+"""Named cell styles registered once per workbook and applied by reference, plus bulk row writes."""
+
+from __future__ import annotations
+
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Sequence
+
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill
+
+
+@dataclass(frozen=True)
+class CellStyle:
+    """Style components for one named style; None means "leave that component alone" on overlay."""
+
+    font: Optional[Font] = None
+    fill: Optional[PatternFill] = None
+    alignment: Optional[Alignment] = None
+    border: Optional[Border] = None
+
+    def named(self, name: str) -> NamedStyle:
+        kwargs = {k: v for k, v in vars(self).items() if v is not None}
+        return NamedStyle(name=name, **kwargs)
+
+
+class Styled(NamedTuple):
+    """A cell value paired with the registry style name to apply to it."""
+
+    value: Any
+    style: str
+
+
+class StyleRegistry:
+    """Per-workbook registry: each style is added to the workbook once, then applied by name.
+
+    apply()   — replace the cell's whole style with the named style (cells we own).
+    overlay() — set only the components the style defines, sharing one object per
+                component, so template number formats and borders survive.
+    """
+
+    def __init__(self, wb: Any, styles: Dict[str, CellStyle], prefix: str) -> None:
+        self._wb = weakref.proxy(wb)   # registries are keyed weakly by workbook
+        self._styles = styles
+        self._prefix = prefix
+        self._registered: set[str] = set(getattr(wb, "named_styles", []))
+
+    def _name(self, name: str) -> str:
+        full = f"{self._prefix}{name}"
+        if full not in self._registered:
+            self._wb.add_named_style(self._styles[name].named(full))
+            self._registered.add(full)
+        return full
+
+    def apply(self, cell: Any, name: str) -> Any:
+        cell.style = self._name(name)
+        return cell
+
+    def overlay(self, cell: Any, name: str) -> Any:
+        spec = self._styles[name]
+        if spec.font is not None:
+            cell.font = spec.font
+        if spec.fill is not None:
+            cell.fill = spec.fill
+        if spec.alignment is not None:
+            cell.alignment = spec.alignment
+        if spec.border is not None:
+            cell.border = spec.border
+        return cell
+
+    def write_rows(self, ws: Any, start_row: int, rows: Iterable[Sequence[Any]],
+                   start_col: int = 1) -> int:
+        """Write a block of rows from start_row; return the next free row.
+
+        Each item is a plain value, a Styled(value, style) pair, or None to skip the
+        column. An empty sequence leaves a blank spacer row.
+        """
+        row = start_row
+        for items in rows:
+            for offset, item in enumerate(items):
+                if item is None:
+                    continue
+                if isinstance(item, Styled):
+                    cell = ws.cell(row, start_col + offset, item.value)
+                    self.apply(cell, item.style)
+                else:
+                    ws.cell(row, start_col + offset, item)
+            row += 1
+        return row
+
+
+# workbook -> {prefix: StyleRegistry}; entries go away with their workbook.
+_REGISTRIES: "weakref.WeakKeyDictionary[Any, Dict[str, StyleRegistry]]" = weakref.WeakKeyDictionary()
+
+
+def registry_for(wb: Any, styles: Dict[str, CellStyle], prefix: str) -> StyleRegistry:
+    """Return the workbook's registry for this style set, creating it on first use."""
+    registries = _REGISTRIES.setdefault(wb, {})
+    reg = registries.get(prefix)
+    if reg is None:
+        reg = StyleRegistry(wb, styles, prefix)
+        registries[prefix] = reg
+    return reg
@@ -12,6 +12,7 @@ from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Sequence
 
 import openpyxl
+from openpyxl.styles import Alignment, Font, PatternFill
 from openpyxl.worksheet.worksheet import Worksheet
 
 from merged_credit_report import merge_reports, resolve_pdf_path
@@ -19,6 +20,8 @@ from merged_credit_report import merge_reports, resolve_pdf_path
 from column_l_validator import apply_column_l_highlighting, RED_BOLD_FONT
 from text_normalize import normalize_compare_text
 from credit_analyst import assess, Assessment
+from excel_styles import CellStyle, Styled, registry_for
+import xlsx_patch
 
 SHEET_NAME = "Knock-Out"
 LABEL_COL = 4  # Column D
@@ -637,108 +640,87 @@ def set_cra_report_dates(ws: Worksheet, cra_report_date: Optional[str]) -> None:
                 return
 
 
+_WHITE_BOLD = Font(bold=True, color="FFFFFF")
+_NAVY_FILL = PatternFill("solid", fgColor="1F4E79")
+
+ASSESSMENT_STYLES: Dict[str, CellStyle] = {
+    "Banner": CellStyle(font=_WHITE_BOLD, fill=_NAVY_FILL, alignment=Alignment(horizontal="center")),
+    "Header": CellStyle(font=_WHITE_BOLD, fill=_NAVY_FILL, alignment=Alignment(wrap_text=True)),
+    "Label": CellStyle(font=Font(bold=True)),
+    "Decline": CellStyle(font=Font(bold=True, color="C00000")),
+    "Wrap": CellStyle(alignment=Alignment(wrap_text=True)),
+    "Red Flag": CellStyle(font=_WHITE_BOLD, fill=PatternFill("solid", fgColor="C00000")),
+    "Warning": CellStyle(font=_WHITE_BOLD, fill=PatternFill("solid", fgColor="FF6600")),
+    "Watch": CellStyle(font=_WHITE_BOLD, fill=PatternFill("solid", fgColor="2E75B6")),
+    "All Clear": CellStyle(font=Font(color="375623")),
+}
+_WARNING_LEVEL_STYLES = {"RED_FLAG": "Red Flag", "WARNING": "Warning", "WATCH": "Watch"}
+
+
+def _assessment_block(a: Assessment) -> List[List[Any]]:
+    """Rows for one subject's assessment block, banner first, trailing gap included."""
+    def label(text: str, value: Any) -> List[Any]:
+        return [Styled(text, "Label"), value]
+
+    if a.utilization is not None:
+        utilization = (
+            f"{a.utilization * 100:.1f}%  (RM {a.total_outstanding:,.0f} outstanding / "
+            f"RM {a.total_limit:,.0f} limit)"
+        )
+    else:
+        utilization = "N/A"
+    rec_limit = f"RM {a.limit:,}" if a.recommendation != "DECLINE" else "DECLINE — do not extend credit"
+
+    rows: List[List[Any]] = [
+        # ── Header banner ──────────────────────────────────────────
+        [Styled(f"AIgent Credit — Assessment Report  |  {a.company_name}  |  Subject {a.si}  |  {a.date}", "Banner")],
+        # ── Decision summary ───────────────────────────────────────
+        label("Decision", a.recommendation),
+        label("Risk Band", a.risk_band),
+        label("Risk Score", f"{a.risk_score} / 100"),
+        label("CRA Grade", f"{a.grade}  (i-SCORE: {a.cra_score or 'N/A'})"),
+        label("Credit Utilization", utilization),
+        label("Years in Operation", a.ops_years if a.ops_years is not None else "N/A"),
+        label("Recommended Limit", rec_limit),
+        [],
+    ]
+
+    # ── Hard declines ──────────────────────────────────────────────
+    if a.decline_reasons:
+        rows.append([Styled("HARD DECLINE TRIGGERS", "Header")])
+        rows.extend([Styled(f"✖  {reason}", "Decline")] for reason in a.decline_reasons)
+        rows.append([])
+
+    # ── Scoring breakdown ──────────────────────────────────────────
+    rows.append([Styled("Dimension", "Header"), Styled("Score", "Header"), Styled("Notes", "Header")])
+    rows.extend([d.name, f"{d.score}/{d.max_score}", "; ".join(d.notes)] for d in a.dimensions)
+    rows.append([])
+
+    # ── Early warnings ─────────────────────────────────────────────
+    if a.warnings:
+        rows.append([Styled("Level", "Header"), Styled("Code", "Header"), Styled("Details", "Header")])
+        for w in a.warnings:
+            style = _WARNING_LEVEL_STYLES.get(w.level, "Label")
+            rows.append([Styled(w.level, style), Styled(w.code, style), Styled(w.message, "Wrap")])
+    else:
+        rows.append([Styled("No early warning signals detected.", "All Clear")])
+
+    rows.extend([[], []])  # gap between subjects
+    return rows
+
+
 def write_credit_assessment_sheet(wb: openpyxl.Workbook, assessments: List[Assessment]) -> None:
     """Add (or replace) a 'Credit Assessment' sheet with structured assessment output."""
-    from openpyxl.styles import Font, PatternFill, Alignment
-
     SHEET = "Credit Assessment"
     if SHEET in wb.sheetnames:
         del wb[SHEET]
     ws = wb.create_sheet(SHEET)
-
-    BOLD = Font(bold=True)
-    HEADER_FILL = PatternFill("solid", fgColor="1F4E79")
-    HEADER_FONT = Font(bold=True, color="FFFFFF")
-    RED_FILL    = PatternFill("solid", fgColor="C00000")
-    RED_FONT    = Font(bold=True, color="FFFFFF")
-    ORANGE_FILL = PatternFill("solid", fgColor="FF6600")
-    ORANGE_FONT = Font(bold=True, color="FFFFFF")
-    BLUE_FILL   = PatternFill("solid", fgColor="2E75B6")
-    BLUE_FONT   = Font(bold=True, color="FFFFFF")
-    GREEN_FILL  = PatternFill("solid", fgColor="375623")
-    GREEN_FONT  = Font(bold=True, color="FFFFFF")
-
-    def _hdr(row: int, col: int, text: str) -> None:
-        c = ws.cell(row, col, text)
-        c.font = HEADER_FONT
-        c.fill = HEADER_FILL
-        c.alignment = Alignment(wrap_text=True)
-
-    def _label(row: int, col: int, text: str) -> None:
-        c = ws.cell(row, col, text)
-        c.font = BOLD
-
-    def _val(row: int, col: int, text: Any) -> None:
-        ws.cell(row, col, text)
+    styles = registry_for(wb, ASSESSMENT_STYLES, prefix="Assessment ")
 
     row = 1
     for a in assessments:
-        # ── Header banner ──────────────────────────────────────────
         ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=4)
-        banner = ws.cell(row, 1, f"AIgent Credit — Assessment Report  |  {a.company_name}  |  Subject {a.si}  |  {a.date}")
-        banner.font = HEADER_FONT
-        banner.fill = HEADER_FILL
-        banner.alignment = Alignment(horizontal="center")
-        row += 1
-
-        # ── Decision summary ───────────────────────────────────────
-        _label(row, 1, "Decision"); _val(row, 2, a.recommendation); row += 1
-        _label(row, 1, "Risk Band"); _val(row, 2, a.risk_band); row += 1
-        _label(row, 1, "Risk Score"); _val(row, 2, f"{a.risk_score} / 100"); row += 1
-        _label(row, 1, "CRA Grade"); _val(row, 2, f"{a.grade}  (i-SCORE: {a.cra_score or 'N/A'})"); row += 1
-        if a.utilization is not None:
-            _label(row, 1, "Credit Utilization")
-            _val(row, 2, f"{a.utilization * 100:.1f}%  (RM {a.total_outstanding:,.0f} outstanding / RM {a.total_limit:,.0f} limit)")
-        else:
-            _label(row, 1, "Credit Utilization"); _val(row, 2, "N/A")
-        row += 1
-        _label(row, 1, "Years in Operation"); _val(row, 2, a.ops_years if a.ops_years is not None else "N/A"); row += 1
-        rec_limit = f"RM {a.limit:,}" if a.recommendation != "DECLINE" else "DECLINE — do not extend credit"
-        _label(row, 1, "Recommended Limit"); _val(row, 2, rec_limit); row += 1
-        row += 1
-
-        # ── Hard declines ──────────────────────────────────────────
-        if a.decline_reasons:
-            _hdr(row, 1, "HARD DECLINE TRIGGERS"); row += 1
-            for reason in a.decline_reasons:
-                c = ws.cell(row, 1, f"✖  {reason}")
-                c.font = Font(bold=True, color="C00000")
-                row += 1
-            row += 1
-
-        # ── Scoring breakdown ──────────────────────────────────────
-        _hdr(row, 1, "Dimension"); _hdr(row, 2, "Score"); _hdr(row, 3, "Notes"); row += 1
-        for d in a.dimensions:
-            _val(row, 1, d.name)
-            _val(row, 2, f"{d.score}/{d.max_score}")
-            _val(row, 3, "; ".join(d.notes))
-            row += 1
-        row += 1
-
-        # ── Early warnings ─────────────────────────────────────────
-        if a.warnings:
-            _hdr(row, 1, "Level"); _hdr(row, 2, "Code"); _hdr(row, 3, "Details"); row += 1
-            level_styles = {
-                "RED_FLAG": (RED_FILL,    RED_FONT),
-                "WARNING":  (ORANGE_FILL, ORANGE_FONT),
-                "WATCH":    (BLUE_FILL,   BLUE_FONT),
-            }
-            for w in a.warnings:
-                fill, font = level_styles.get(w.level, (None, BOLD))
-                c1 = ws.cell(row, 1, w.level)
-                c2 = ws.cell(row, 2, w.code)
-                c3 = ws.cell(row, 3, w.message)
-                c3.alignment = Alignment(wrap_text=True)
-                if fill:
-                    c1.fill = fill; c1.font = font
-                    c2.fill = fill; c2.font = font
-                row += 1
-        else:
-            c = ws.cell(row, 1, "No early warning signals detected.")
-            c.font = Font(color="375623")
-            row += 1
-
-        row += 2  # gap between subjects
+        row = styles.write_rows(ws, row, _assessment_block(a))
 
     # ── Column widths ──────────────────────────────────────────────
     ws.column_dimensions["A"].width = 28
@@ -747,16 +729,15 @@ def write_credit_assessment_sheet(wb: openpyxl.Workbook, assessments: List[Asses
     ws.column_dimensions["D"].width = 20
 
 
-def fill_knockout_matrix(
-    file_path: str,
+def _fill_knockout_workbook(
+    wb: Any,
     issuer_name: str,
     placements: Sequence[KnockoutCellPlacement],
-    cra_report_date: Optional[str] = None,
-    all_subject_names: Optional[list[str]] = None,
-    assessments: Optional[List[Assessment]] = None,
-) -> str:
-    """Fill the knockout matrix Excel template using explicit cell placements."""
-    wb = openpyxl.load_workbook(file_path)
+    cra_report_date: Optional[str],
+    all_subject_names: Optional[list[str]],
+    assessments: Optional[List[Assessment]],
+) -> List[str]:
+    """Write issuer, subjects and placements into the Knock-Out sheet; return labels not found."""
     if SHEET_NAME not in wb.sheetnames:
         raise ValueError(f"Sheet '{SHEET_NAME}' not found. Found: {wb.sheetnames}")
 
@@ -834,9 +815,47 @@ def fill_knockout_matrix(
         write_credit_assessment_sheet(wb, assessments)
         print(f"📊 Credit Assessment sheet written for {len(assessments)} subject(s)")
 
-    # Save output
-    output_path = f"{os.path.splitext(file_path)[0]}_FILLED{os.path.splitext(file_path)[1]}"
-    wb.save(output_path)
+    return missing
+
+
+def fill_knockout_matrix(
+    file_path: str,
+    issuer_name: str,
+    placements: Sequence[KnockoutCellPlacement],
+    cra_report_date: Optional[str] = None,
+    all_subject_names: Optional[list[str]] = None,
+    assessments: Optional[List[Assessment]] = None,
+    writer: str = "xml",
+    output_path: Optional[str] = None,
+) -> str:
+    """Fill the knockout matrix Excel template using explicit cell placements.
+
+    writer="xml" patches the template's sheet XML directly (see xlsx_patch) and
+    falls back to a full openpyxl load/save if the template uses anything the
+    patcher does not support; writer="openpyxl" always takes the slow path.
+    The result goes to output_path, or "<template>_FILLED.xlsx" next to the template.
+    """
+    if output_path is None:
+        output_path = f"{os.path.splitext(file_path)[0]}_FILLED{os.path.splitext(file_path)[1]}"
+    args = (issuer_name, placements, cra_report_date, all_subject_names, assessments)
+
+    missing: Optional[List[str]] = None
+    if writer == "xml":
+        try:
+            wb = xlsx_patch.load_workbook(file_path)
+            try:
+                missing = _fill_knockout_workbook(wb, *args)
+                wb.save(output_path)
+            finally:
+                wb.close()
+        except xlsx_patch.XlsxPatchError as e:
+            print(f"⚠️ XML patch writer cannot handle this template ({e}); falling back to openpyxl")
+            missing = None
+
+    if missing is None:
+        wb = openpyxl.load_workbook(file_path)
+        missing = _fill_knockout_workbook(wb, *args)
+        wb.save(output_path)
 
     if missing:
         print("⚠️ Missing labels:")
@@ -879,6 +898,73 @@ def _find_excel_template(excel_name: str = DEFAULT_EXCEL) -> Optional[str]:
     return None
 
 
+def subject_names_from_summary(summary: Dict[str, Any], issuer_name: str) -> List[str]:
+    """All detected subject names (issuer + directors/guarantors), issuer first."""
+    raw_subject_names = summary.get("all_names_of_subject") or []
+    all_subject_names = [
+        re.sub(r"\s+", " ", str(name)).strip()
+        for name in raw_subject_names
+        if name and str(name).strip()
+    ]
+    if issuer_name and issuer_name not in all_subject_names:
+        all_subject_names.insert(0, issuer_name)
+    return all_subject_names
+
+
+def run_assessments(merged: Dict[str, Any], verbose: bool = True) -> List[Assessment]:
+    """Run the credit assessment for every subject in the merged report."""
+    summary = merged.get("summary_report", {})
+    num_subjects = 1
+    while summary.get(f"Name_Of_Subject_{num_subjects + 1}"):
+        num_subjects += 1
+    if verbose:
+        print(f"\n🔍 Running credit assessment for {num_subjects} subject(s)...")
+    assessments: List[Assessment] = []
+    for si in range(1, num_subjects + 1):
+        a = assess(merged, si)
+        assessments.append(a)
+        if not verbose:
+            continue
+        decision_icon = "✅" if a.recommendation == "APPROVE" else ("⚠️" if a.recommendation == "CONDITIONAL APPROVE" else "❌")
+        print(f"  {decision_icon} Subject {si} ({a.company_name}): {a.recommendation}  |  Risk Score {a.risk_score}/100  |  {a.risk_band}")
+        if a.recommendation != "DECLINE":
+            print(f"     Recommended Limit: RM {a.limit:,}")
+        if a.decline_reasons:
+            for r in a.decline_reasons:
+                print(f"     ✖ {r}")
+    return assessments
+
+
+def fill_from_merged(
+    merged: Dict[str, Any],
+    excel_file: str,
+    issuer: Optional[str] = None,
+    output_path: Optional[str] = None,
+    writer: str = "xml",
+    verbose: bool = True,
+) -> tuple[str, List[Assessment]]:
+    """Assess every subject and fill the Knock-Out template; return (output path, assessments)."""
+    summary = merged.get("summary_report", {})
+    issuer_name = issuer or summary.get("Name_Of_Subject") or "UNKNOWN ISSUER"
+    all_subject_names = subject_names_from_summary(summary, issuer_name)
+    placements = build_knockout_placements(merged)
+    assessments = run_assessments(merged, verbose=verbose)
+
+    if verbose:
+        print(f"\n📝 Filling Excel template: {os.path.basename(excel_file)}")
+    output = fill_knockout_matrix(
+        excel_file,
+        issuer_name,
+        placements,
+        cra_report_date=summary.get("Last_Updated_By_Experian"),
+        all_subject_names=all_subject_names or None,
+        assessments=assessments,
+        writer=writer,
+        output_path=output_path,
+    )
+    return output, assessments
+
+
 def main() -> None:
     """Main entry point."""
     try:
@@ -887,6 +973,12 @@ def main() -> None:
         parser.add_argument("--merged-json", help="Path to merged JSON output (skips PDF processing)")
         parser.add_argument("--pdf", help="Path to Experian PDF (opens picker if omitted)")
         parser.add_argument("--issuer", help="Issuer name (defaults to Name Of Subject from PDF)")
+        parser.add_argument(
+            "--writer",
+            choices=["xml", "openpyxl"],
+            default="xml",
+            help="Excel writer: patch sheet XML directly (fast, default) or full openpyxl round-trip",
+        )
         args = parser.parse_args()
 
         # Get Excel file path (works in both script and EXE)
@@ -932,51 +1024,7 @@ def main() -> None:
             print("💡 Tip: Save merged JSON with 'python merged_credit_report.py --pdf file.pdf' for faster subsequent runs")
             merged = merge_reports(pdf_path)
 
-        summary = merged.get("summary_report", {})
-        issuer_name = args.issuer or summary.get("Name_Of_Subject") or "UNKNOWN ISSUER"
-
-        # Keep all detected subject names (issuer + directors/guarantors) so they can
-        # be written to the subject header columns in the knockout template.
-        raw_subject_names = summary.get("all_names_of_subject") or []
-        all_subject_names = [
-            re.sub(r"\s+", " ", str(name)).strip()
-            for name in raw_subject_names
-            if name and str(name).strip()
-        ]
-
-        # Ensure issuer is always the first displayed subject.
-        if issuer_name and issuer_name not in all_subject_names:
-            all_subject_names.insert(0, issuer_name)
-        
-        placements = build_knockout_placements(merged)
-
-        # Run credit assessment for all subjects
-        num_subjects = 1
-        while summary.get(f"Name_Of_Subject_{num_subjects + 1}"):
-            num_subjects += 1
-        print(f"\n🔍 Running credit assessment for {num_subjects} subject(s)...")
-        assessments: List[Assessment] = []
-        for si in range(1, num_subjects + 1):
-            a = assess(merged, si)
-            assessments.append(a)
-            decision_icon = "✅" if a.recommendation == "APPROVE" else ("⚠️" if a.recommendation == "CONDITIONAL APPROVE" else "❌")
-            print(f"  {decision_icon} Subject {si} ({a.company_name}): {a.recommendation}  |  Risk Score {a.risk_score}/100  |  {a.risk_band}")
-            if a.recommendation != "DECLINE":
-                print(f"     Recommended Limit: RM {a.limit:,}")
-            if a.decline_reasons:
-                for r in a.decline_reasons:
-                    print(f"     ✖ {r}")
-
-        # Fill Excel
-        print(f"\n📝 Filling Excel template: {os.path.basename(excel_file)}")
-        output = fill_knockout_matrix(
-            excel_file,
-            issuer_name,
-            placements,
-            cra_report_date=summary.get("Last_Updated_By_Experian"),
-            all_subject_names=all_subject_names or None,
-            assessments=assessments,
-        )
+        output, _ = fill_from_merged(merged, excel_file, issuer=args.issuer, writer=args.writer)
         print(f"\n✅ Success! File saved: {os.path.basename(output)}")
         print(f"📁 Location: {os.path.dirname(os.path.abspath(output))}")
     
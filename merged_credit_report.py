@@ -2,10 +2,11 @@ import argparse
 import json
 from typing import Any, Dict, Optional
 
-from Detailed_Credit_Report_Extractor import extract_detailed_credit_report
-from Non_Bank_Lender_Credit_Information import extract_non_bank_lender_credit_information
+from banking_extractor import extract_detailed_credit_report
+from nlci_extractor import extract_non_bank_lender_credit_information
 from load_file_version import extract_fields
 from pdf_utils import pick_pdf_file
+from section_cache import section_cache
 
 
 def merge_reports(pdf_path: str) -> Dict[str, Any]:
@@ -15,6 +16,7 @@ def merge_reports(pdf_path: str) -> Dict[str, Any]:
     For better performance, consider extracting PDF text once and passing to extractors.
     """
     print("📄 Loading PDF for extraction...")
+    section_cache.reset_stats()
     summary_report = extract_fields(pdf_path)
     print("✅ Summary report extracted")
     
@@ -23,6 +25,7 @@ def merge_reports(pdf_path: str) -> Dict[str, Any]:
     
     non_bank_report = extract_non_bank_lender_credit_information(pdf_path)
     print("✅ Non-bank report extracted")
+    print(f"📊 Section cache hits: {section_cache.format_stats()}")
 
     return {
         "pdf_file": pdf_path,
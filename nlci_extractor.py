@@ -2,6 +2,8 @@ import re
 from typing import List, Dict, Any, Optional, Tuple
 
 from pdf_utils import pick_pdf_file, extract_all_sections, RE_DATE, read_pdf_text
+from conduct_matrix import NLCI_PLUS_KEY, ConductMatrix
+from section_cache import section_cache
 
 RE_TOTAL_LINE = re.compile(r"^\s*TOTAL\s+[\d,]+\.\d{2}\s+TOTAL\s+[\d,]+\.\d{2}\s*$", re.IGNORECASE)
 RE_TOTAL_VALUES = re.compile(r"TOTAL\s+([\d,]+\.\d{2})\s+TOTAL\s+([\d,]+\.\d{2})", re.IGNORECASE)
@@ -129,55 +131,10 @@ def extract_month_nums_and_middle_words(tokens: List[str]) -> Tuple[List[int], L
 
     return monthly, middle_words, legal_marker, status_date
 
-def freq_bucket(values: List[int]) -> Dict[str, int]:
-    """
-    Count: '0', '1', '2', '3', '4+'
-    """
-    out = {"0": 0, "1": 0, "2": 0, "3": 0, "4+": 0}
-    for v in values:
-        if v == 0: out["0"] += 1
-        elif v == 1: out["1"] += 1
-        elif v == 2: out["2"] += 1
-        elif v == 3: out["3"] += 1
-        else: out["4+"] += 1
-    return out
-
-def summarize_last_periods(month_values_in_order: List[int]) -> Dict[str, Any]:
-    """
-    Assumption: month_values_in_order is already ordered from MOST RECENT -> OLDER.
-    """
-    last1 = month_values_in_order[:1]
-    last6 = month_values_in_order[:6]
-
-    last1_freq = freq_bucket(last1)
-    last6_freq = freq_bucket(last6)
-
-    return {
-        "last_1_month": {
-            "values": last1,
-            "freq": last1_freq,
-            "freq_total": sum(last1_freq.values()),
-        },
-        "last_6_months": {
-            "values": last6,
-            "freq": last6_freq,
-            "freq_total": sum(last6_freq.values()),
-        }
-    }
-
-def sum_freq_buckets(stats_list: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
-    summed = {
-        "last_1_month": {"0": 0, "1": 0, "2": 0, "3": 0, "4+": 0},
-        "last_6_months": {"0": 0, "1": 0, "2": 0, "3": 0, "4+": 0},
-    }
-
-    for stats in stats_list:
-        for period in ("last_1_month", "last_6_months"):
-            freq = stats.get(period, {}).get("freq", {})
-            for key in summed[period]:
-                summed[period][key] += int(freq.get(key, 0))
-
-    return summed
+def _period_stats(conduct: ConductMatrix, index: int, months: List[int], window: int) -> Dict[str, Any]:
+    """One record's {'values', 'freq', 'freq_total'} for its most recent `window` months."""
+    freq = conduct.row_buckets(index, window, NLCI_PLUS_KEY)
+    return {"values": months[:window], "freq": freq, "freq_total": sum(freq.values())}
 
 def parse_outstanding_with_stats(lines: List[str]) -> Dict[str, Any]:
     data_lines, header_line, total_line = extract_block(lines)
@@ -188,22 +145,28 @@ def parse_outstanding_with_stats(lines: List[str]) -> Dict[str, Any]:
     month_info = best_month_mapping(initials)
 
     records = []
+    conduct = ConductMatrix()
     for line in data_lines:
         tokens = line.split()
         rec_no = int(tokens[0])
         approval_date = tokens[1]
 
         monthly_nums, middle_words, legal_marker, status_date = extract_month_nums_and_middle_words(tokens)
+        conduct.add_row(monthly_nums)
 
         # Map months (if confident) else keep index columns
         if month_info["confident"]:
             months = month_info["months"]  # order aligned to initials (most recent -> older) if header is that way
             month_map = {months[i]: (monthly_nums[i] if i < len(monthly_nums) else None) for i in range(len(months))}
-            # For stats we only use the numeric sequence we have, assuming it corresponds to most recent -> older
-            stats = summarize_last_periods(monthly_nums)
         else:
             month_map = {f"M{i+1:02d}": monthly_nums[i] for i in range(len(monthly_nums))}
-            stats = summarize_last_periods(monthly_nums)
+        # For stats we only use the numeric sequence we have, assuming it is most recent -> older;
+        # the counts come from this record's conduct matrix row.
+        row = len(conduct) - 1
+        stats = {
+            "last_1_month": _period_stats(conduct, row, monthly_nums, 1),
+            "last_6_months": _period_stats(conduct, row, monthly_nums, 6),
+        }
 
         records.append({
             "no": rec_no,
@@ -218,7 +181,10 @@ def parse_outstanding_with_stats(lines: List[str]) -> Dict[str, Any]:
             "raw": line
         })
 
-    stats_totals = sum_freq_buckets([record["stats"] for record in records])
+    stats_totals = {
+        "last_1_month": conduct.buckets(1, NLCI_PLUS_KEY),
+        "last_6_months": conduct.buckets(6, NLCI_PLUS_KEY),
+    }
 
     totals = None
     if total_line:
@@ -241,7 +207,8 @@ def parse_outstanding_with_stats(lines: List[str]) -> Dict[str, Any]:
                 "freq_total": sum(stats_totals["last_6_months"].values()),
             },
         },
-        "totals": totals
+        "totals": totals,
+        "conduct_matrix": conduct.to_dict(),
     }
 
 def extract_non_bank_lender_credit_information(pdf_path: str) -> Dict[str, Any]:
@@ -266,7 +233,9 @@ def extract_non_bank_lender_credit_information(pdf_path: str) -> Dict[str, Any]:
         return result
 
     try:
-        parsed = parse_outstanding_with_stats(section_lines)
+        parsed = section_cache.get_or_parse(
+            "nlci_section", section_lines, lambda: parse_outstanding_with_stats(section_lines)
+        )
     except ValueError as exc:
         result["error"] = str(exc)
         return result
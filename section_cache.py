@@ -0,0 +1,115 @@
+"""Memoize per-subject section parses across reports, keyed by a hash of the normalized section text."""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+# Bump a parser's version whenever its output for the same text can change.
+PARSER_VERSIONS: Dict[str, int] = {
+    "banking_section": 3,
+    "nlci_section": 2,
+}
+
+# Next to the EXE when frozen (PyInstaller's _MEIPASS is wiped on exit), else next to this module.
+_BASE_DIR = Path(sys.executable).parent if getattr(sys, "frozen", False) else Path(__file__).resolve().parent
+DEFAULT_CACHE_DIR = _BASE_DIR / ".section_cache"
+
+
+def normalize_section_text(section: Union[str, Iterable[str]]) -> str:
+    """Collapse intra-line whitespace and drop blank lines, so layout noise does not split keys."""
+    lines = section.splitlines() if isinstance(section, str) else section
+    return "\n".join(" ".join(line.split()) for line in lines if line.strip())
+
+
+class SectionCache:
+    """Two-level (in-process dict + one JSON file per entry on disk) cache of parse results.
+
+    Results must be JSON-serializable; callers get a deep copy so they may mutate it.
+    Set SECTION_CACHE_DIR to move the disk cache, or SECTION_CACHE_DIR="" to keep it in memory only.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+        self._memory: Dict[str, Any] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def key(self, kind: str, section: Union[str, Iterable[str]]) -> str:
+        text = normalize_section_text(section)
+        h = hashlib.sha256(f"{kind}:v{PARSER_VERSIONS[kind]}\n{text}".encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, kind: str, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / kind / f"{key}.json"
+
+    def get_or_parse(self, kind: str, section: Union[str, Iterable[str]], parse: Callable[[], Any]) -> Any:
+        """Return the cached result for this section text, calling parse() only on a miss."""
+        if not isinstance(section, str):
+            section = list(section)
+        key = self.key(kind, section)
+
+        if key in self._memory:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            return copy.deepcopy(self._memory[key])
+
+        path = self._path(kind, key)
+        if path is not None and path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    result = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                result = None
+            else:
+                self._memory[key] = result
+                self.hits[kind] = self.hits.get(kind, 0) + 1
+                return copy.deepcopy(result)
+
+        self.misses[kind] = self.misses.get(kind, 0) + 1
+        result = parse()
+        # Round-trip through JSON so hits and misses return identical shapes (tuples → lists).
+        result = json.loads(json.dumps(result))
+        self._memory[key] = result
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(result, f, ensure_ascii=False)
+                os.replace(tmp, path)
+            except OSError:
+                pass  # disk cache is best-effort
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        kinds = sorted(set(self.hits) | set(self.misses))
+        return {k: {"hits": self.hits.get(k, 0), "misses": self.misses.get(k, 0)} for k in kinds}
+
+    def reset_stats(self) -> None:
+        self.hits.clear()
+        self.misses.clear()
+
+    def format_stats(self) -> str:
+        """One-line hit-rate summary, e.g. 'banking_section 3/4 (75%), nlci_section 0/1 (0%)'."""
+        parts = []
+        for kind, s in self.stats().items():
+            total = s["hits"] + s["misses"]
+            parts.append(f"{kind} {s['hits']}/{total} ({s['hits'] / total:.0%})")
+        return ", ".join(parts) or "no sections parsed"
+
+
+def _default_cache() -> SectionCache:
+    env = os.environ.get("SECTION_CACHE_DIR")
+    if env is None:
+        return SectionCache()
+    return SectionCache(Path(env) if env else None)
+
+
+section_cache = _default_cache()
@@ -0,0 +1,102 @@
+"""Tests for conduct_matrix, the NLCI counts derived from it and the CCRIS digit buckets."""
+
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from banking_extractor import analyze_account_lines, split_into_records
+from conduct_matrix import ConductMatrix
+from credit_analyst import get_mia
+from nlci_extractor import parse_outstanding_with_stats
+
+CCRIS_LINES = [
+    "1 15/01/2020 OVRDRAFT 50,000.00 12/2023 30,000.00 REV 0 1 2 0 0 0 0 3 0 0 0 0",
+    "2 02/03/2021 TERMLOAN 100,000.00 12/2023 80,000.00 MTH 2 0 0 5 0 0 1 1 0 0 0 0",
+]
+
+
+class ConductMatrixTests(unittest.TestCase):
+    def test_windows_and_thresholds(self) -> None:
+        m = ConductMatrix.from_values([[0, 1, 2, 0, 0, 0, 0, 3], [2, 0, 0, 5, 0, 0, 1, 1], [7]])
+        self.assertEqual(m.buckets(1, "4+"), {"0": 1, "1": 0, "2": 1, "3": 0, "4+": 1})
+        self.assertEqual(m.months_at_least(1, 6), 5)
+        self.assertEqual(m.months_at_least(2, 12), 5)
+        self.assertEqual(m.months_at_least(3, None), 3)
+        self.assertEqual(ConductMatrix.from_dict(m.to_dict()).rows, m.rows)
+        self.assertIsNone(ConductMatrix.from_dict(None))
+
+    def test_ccris_analysis_and_mia(self) -> None:
+        analysis = analyze_account_lines(split_into_records(CCRIS_LINES))
+        totals = analysis["digit_counts_totals"]
+        self.assertEqual(
+            totals["next_six_numbers_digit_counts_0_1_2_3_5_plus"],
+            {"0": 8, "1": 1, "2": 2, "3": 0, "5_plus": 1},
+        )
+        self.assertEqual(
+            totals["next_first_numbers_digit_counts_0_1_2_3_5_plus"],
+            {"0": 1, "1": 0, "2": 1, "3": 0, "5_plus": 0},
+        )
+
+        merged = {"detailed_credit_report": {"sections": [{"account_line_analysis": analysis}]}}
+        mia = get_mia(merged)
+        self.assertEqual((mia["ccris_p6_mia1plus"], mia["ccris_p6_mia2plus"]), (4, 3))
+        self.assertEqual((mia["ccris_c1_mia1plus"], mia["ccris_c1_mia2plus"]), (1, 1))
+
+    def test_ccris_keeps_legacy_digit_buckets(self) -> None:
+        # Baseline counts every digit of the first token and of the first six tokens joined.
+        line = "1 15/01/2020 OVRDRAFT 50,000.00 12/2023 30,000.00 MTH 10 4 0 0 0 0 0"
+        analysis = analyze_account_lines(split_into_records([line]))
+        totals = analysis["digit_counts_totals"]
+        self.assertEqual(
+            totals["next_first_numbers_digit_counts_0_1_2_3_5_plus"],
+            {"0": 1, "1": 1, "2": 0, "3": 0, "5_plus": 0},
+        )
+        self.assertEqual(
+            totals["next_six_numbers_digit_counts_0_1_2_3_5_plus"],
+            {"0": 5, "1": 1, "2": 0, "3": 0, "5_plus": 1},
+        )
+        merged = {"detailed_credit_report": {"sections": [{"account_line_analysis": analysis}]}}
+        mia = get_mia(merged)
+        self.assertEqual((mia["ccris_c1_mia1plus"], mia["ccris_c1_mia2plus"]), (1, 0))
+        self.assertEqual((mia["ccris_p6_mia1plus"], mia["ccris_p6_mia2plus"]), (2, 1))
+
+    def test_nlci_record_stats(self) -> None:
+        parsed = parse_outstanding_with_stats([
+            "NO APPROVED OUTSTANDING CREDIT D N O S A J J M A M F J",
+            "1 01/02/2020 LENDERX 12,000.00 0 1 2 0 0 0 5 0 0 0 0 12 LOD 31/01/2025",
+            "2 01/02/2021 LENDERY 8,000.00 3 0 LOD",
+            "TOTAL 20,000.00 TOTAL 9,000.00",
+        ])
+        first, second = (r["stats"] for r in parsed["records"])
+        self.assertEqual(first["last_6_months"], {
+            "values": [0, 1, 2, 0, 0, 0],
+            "freq": {"0": 4, "1": 1, "2": 1, "3": 0, "4+": 0},
+            "freq_total": 6,
+        })
+        self.assertEqual(second["last_1_month"], {
+            "values": [3], "freq": {"0": 0, "1": 0, "2": 0, "3": 1, "4+": 0}, "freq_total": 1,
+        })
+        self.assertEqual(second["last_6_months"]["freq_total"], 2)
+        self.assertEqual(parsed["stats_totals"]["last_6_months"]["freq"],
+                         {"0": 5, "1": 1, "2": 1, "3": 1, "4+": 0})
+
+    def test_nlci_mia_from_matrix_and_legacy_buckets(self) -> None:
+        parsed = parse_outstanding_with_stats([
+            "NO APPROVED OUTSTANDING CREDIT D N O S A J J M A M F J",
+            "1 01/02/2020 LENDERX 12,000.00 2 1 0 6 0 0 5 0 0 0 0 12 LOD 31/01/2025",
+            "2 01/02/2021 LENDERY 8,000.00 3 0 LOD",
+            "TOTAL 20,000.00 TOTAL 9,000.00",
+        ])
+        mia = get_mia({"non_bank_lender_credit_information": parsed})
+        self.assertEqual((mia["nlci_p6_mia1plus"], mia["nlci_p6_mia2plus"]), (4, 3))
+        self.assertEqual((mia["nlci_c1_mia1plus"], mia["nlci_c1_mia2plus"]), (2, 2))
+
+        # NLCI JSON saved before the matrix existed scores from its bucket dicts instead.
+        legacy = {k: v for k, v in parsed.items() if k != "conduct_matrix"}
+        with patch.object(ConductMatrix, "months_at_least", side_effect=AssertionError):
+            self.assertEqual(get_mia({"non_bank_lender_credit_information": legacy}), mia)
+
+
+if __name__ == "__main__":
+    unittest.main()
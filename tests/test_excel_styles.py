@@ -0,0 +1,109 @@
+"""Tests for excel_styles and the extractor's copies of the shared Excel modules (pipeline/)."""
+
+from __future__ import annotations
+
+import gc
+import importlib.util
+import sys
+import unittest
+from pathlib import Path
+
+import openpyxl
+from openpyxl.styles import Alignment, Font, PatternFill
+
+import excel_styles
+
+_ROOT = Path(__file__).resolve().parents[1]
+_EXTRACTOR_PIPELINE = _ROOT / "AuditorReportReader" / "extractor" / "pipeline"
+_EXTRACTOR_COPY = _EXTRACTOR_PIPELINE / "excel_styles.py"
+
+
+def _load_extractor_copy():
+    spec = importlib.util.spec_from_file_location("extractor_excel_styles", _EXTRACTOR_COPY)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module     # dataclasses resolve their module by name
+    spec.loader.exec_module(module)
+    return module
+
+
+MODULES = (excel_styles, _load_extractor_copy())
+
+
+def _styles(mod) -> dict:
+    return {
+        "bold": mod.CellStyle(font=Font(bold=True)),
+        "warn": mod.CellStyle(font=Font(color="FF0000"), fill=PatternFill("solid", fgColor="FFC7CE")),
+    }
+
+
+class StyleRegistryTests(unittest.TestCase):
+    def test_apply_registers_named_style_once(self) -> None:
+        for mod in MODULES:
+            with self.subTest(module=mod.__name__):
+                wb = openpyxl.Workbook()
+                reg = mod.registry_for(wb, _styles(mod), prefix="T ")
+                ws = wb.active
+                reg.apply(ws["A1"], "bold")
+                reg.apply(ws["A2"], "bold")
+                self.assertEqual(ws["A1"].style, "T bold")
+                self.assertTrue(ws["A2"].font.bold)
+                self.assertEqual([n for n in wb.named_styles if n.startswith("T ")], ["T bold"])
+                self.assertIs(mod.registry_for(wb, _styles(mod), prefix="T "), reg)
+
+    def test_overlay_keeps_components_the_style_does_not_set(self) -> None:
+        for mod in MODULES:
+            with self.subTest(module=mod.__name__):
+                wb = openpyxl.Workbook()
+                cell = wb.active["B2"]
+                cell.number_format = "#,##0"
+                cell.alignment = Alignment(horizontal="right")
+                mod.registry_for(wb, _styles(mod), prefix="T ").overlay(cell, "warn")
+                self.assertEqual(cell.number_format, "#,##0")
+                self.assertEqual(cell.alignment.horizontal, "right")
+                self.assertEqual(cell.font.color.rgb, "00FF0000")
+                self.assertEqual(cell.fill.fgColor.rgb, "00FFC7CE")
+                self.assertEqual(cell.style, "Normal")
+
+    def test_write_rows(self) -> None:
+        for mod in MODULES:
+            with self.subTest(module=mod.__name__):
+                wb = openpyxl.Workbook()
+                ws = wb.active
+                reg = mod.registry_for(wb, _styles(mod), prefix="T ")
+                next_row = reg.write_rows(ws, 3, [
+                    ["a", mod.Styled("b", "bold")],
+                    [],
+                    [None, 7],
+                ], start_col=2)
+                self.assertEqual(next_row, 6)
+                self.assertEqual((ws["B3"].value, ws["C3"].value), ("a", "b"))
+                self.assertEqual(ws["C3"].style, "T bold")
+                self.assertEqual(ws["B3"].style, "Normal")
+                self.assertIsNone(ws["B5"].value)
+                self.assertEqual(ws["C5"].value, 7)
+
+    def test_registries_do_not_outlive_their_workbook(self) -> None:
+        for mod in MODULES:
+            with self.subTest(module=mod.__name__):
+                gc.collect()
+                before = len(mod._REGISTRIES)
+                wb = openpyxl.Workbook()
+                mod.registry_for(wb, _styles(mod), prefix="T ")
+                self.assertFalse(hasattr(wb, "_style_registries"))
+                self.assertEqual(len(mod._REGISTRIES), before + 1)
+                del wb
+                gc.collect()
+                self.assertEqual(len(mod._REGISTRIES), before)
+
+
+class ExtractorCopiesTests(unittest.TestCase):
+    def test_extractor_copies_match_the_root_modules(self) -> None:
+        # The extractor ships on its own, so it vendors these; edit both or neither.
+        for name in ("excel_styles.py", "xlsx_patch.py"):
+            with self.subTest(module=name):
+                self.assertEqual((_EXTRACTOR_PIPELINE / name).read_bytes(),
+                                 (_ROOT / name).read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Tests for section_cache: cross-report reuse of per-subject section parses."""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from banking_extractor import parse_banking_section
+from section_cache import SectionCache
+
+SECTION = [
+    "1 15/01/2020 OVRDRAFT 50,000.00 12/2023 30,000.00 MTH 0 0 1 0 0 0",
+    "2 02/03/2021 TERMLOAN 100,000.00 12/2023 80,000.00 MTH 0 0 0 0 0 0",
+]
+
+
+class SectionCacheTests(unittest.TestCase):
+    def test_reparse_only_on_new_text(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SectionCache(Path(tmp))
+            calls = []
+
+            def parse():
+                calls.append(1)
+                return parse_banking_section(SECTION)
+
+            first = cache.get_or_parse("banking_section", SECTION, parse)
+            # Same subject in a later report, with different line spacing.
+            spaced = [line.replace(" ", "  ") for line in SECTION] + [""]
+            again = cache.get_or_parse("banking_section", spaced, parse)
+            self.assertEqual(first, again)
+            self.assertEqual(len(calls), 1)
+
+            # A fresh process reads the entry back from disk.
+            disk = SectionCache(Path(tmp))
+            self.assertEqual(disk.get_or_parse("banking_section", SECTION, parse), first)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(disk.stats(), {"banking_section": {"hits": 1, "misses": 0}})
+
+            cache.get_or_parse("banking_section", SECTION[:1], parse)
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(cache.format_stats(), "banking_section 1/3 (33%)")
+
+    def test_results_are_copies(self) -> None:
+        cache = SectionCache(None)
+        result = cache.get_or_parse("nlci_section", "x", lambda: {"records": []})
+        result["records"].append("mutated")
+        self.assertEqual(cache.get_or_parse("nlci_section", "x", lambda: None), {"records": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
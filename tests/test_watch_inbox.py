@@ -0,0 +1,58 @@
+"""Tests for watch_inbox: content-hash dedupe, failure filing and restart safety."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from watch_inbox import FAILED_DIR, MANIFEST_NAME, InboxWatcher
+
+
+def _fake_process(pdf_path: str, sha256: str, outbox: str, excel_file: str, writer: str) -> dict:
+    if Path(pdf_path).name.startswith("bad"):
+        raise ValueError("unreadable report")
+    with open(Path(outbox) / "calls.log", "a", encoding="utf-8") as f:
+        f.write(sha256 + "\n")
+    return {"filled": f"{sha256[:12]}_FILLED.xlsx"}
+
+
+class InboxWatcherTests(unittest.TestCase):
+    def _watcher(self, root: Path) -> InboxWatcher:
+        return InboxWatcher(
+            root / "inbox", root / "outbox", root / "processed", "template.xlsx",
+            workers=2, poll_seconds=0.01, settle_seconds=0, process=_fake_process,
+        )
+
+    def _manifest(self, root: Path) -> list:
+        lines = (root / "processed" / MANIFEST_NAME).read_text(encoding="utf-8").splitlines()
+        return [json.loads(line) for line in lines]
+
+    def test_dedupes_by_content_and_survives_restart(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            watcher = self._watcher(root)
+            (root / "inbox" / "a.pdf").write_bytes(b"%PDF report A")
+            (root / "inbox" / "a copy.pdf").write_bytes(b"%PDF report A")
+            (root / "inbox" / "b.pdf").write_bytes(b"%PDF report B")
+            (root / "inbox" / "bad.pdf").write_bytes(b"%PDF broken")
+            watcher.run(once=True)
+
+            self.assertEqual(list((root / "inbox").iterdir()), [])
+            calls = (root / "outbox" / "calls.log").read_text(encoding="utf-8").split()
+            self.assertEqual(len(calls), 2)
+            statuses = sorted(r["status"] for r in self._manifest(root))
+            self.assertEqual(statuses, ["done", "done", "duplicate", "failed"])
+            self.assertEqual(len(list((root / "processed" / FAILED_DIR).iterdir())), 1)
+
+            # A restart sees the same report again (e.g. re-sent): it is filed, not reprocessed.
+            (root / "inbox" / "b again.pdf").write_bytes(b"%PDF report B")
+            self._watcher(root).run(once=True)
+            calls = (root / "outbox" / "calls.log").read_text(encoding="utf-8").split()
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(self._manifest(root)[-1]["status"], "duplicate")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Fidelity tests: the XML patch writer must produce the same workbook values as openpyxl."""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import openpyxl
+
+from credit_analyst import assess
+from insert_excel_file import (
+    LBL_CCRIS_LEGAL,
+    KnockoutCellPlacement,
+    build_knockout_placements,
+    fill_knockout_matrix,
+)
+
+TEMPLATE = Path(__file__).resolve().parents[1] / "Knockout Matrix Template.xlsx"
+
+
+def _merged() -> dict:
+    return {
+        "summary_report": {
+            "Incorporation_Year": 2001,
+            "Name_Of_Subject": "Test Co",
+            "Name_Of_Subject_2": "Director A",
+        },
+        "detailed_credit_report": {},
+        "non_bank_lender_credit_information": {},
+    }
+
+
+def _snapshot(path: str) -> dict:
+    wb = openpyxl.load_workbook(path)
+    out = {}
+    for ws in wb.worksheets:
+        cells = {}
+        for row in ws.iter_rows():
+            for c in row:
+                if c.value is not None:
+                    cells[c.coordinate] = (c.value, c.font.b, c.font.color.rgb if c.font.color else None)
+        out[ws.title] = (cells, sorted(str(r) for r in ws.merged_cells.ranges))
+    wb.close()
+    return out
+
+
+class XlsxPatchFidelityTests(unittest.TestCase):
+    def test_knockout_fill_matches_openpyxl(self) -> None:
+        merged = _merged()
+        placements = build_knockout_placements(merged)
+        placements.append(KnockoutCellPlacement(LBL_CCRIS_LEGAL, 0, "Legal action: summons"))
+        assessments = [assess(merged, 1), assess(merged, 2)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshots = {}
+            for writer in ("xml", "openpyxl"):
+                template = Path(tmp) / f"{writer}.xlsx"
+                shutil.copy(TEMPLATE, template)
+                out = fill_knockout_matrix(
+                    str(template),
+                    "Test Co",
+                    placements,
+                    cra_report_date="01/02/2024",
+                    all_subject_names=["Test Co", "Director A"],
+                    assessments=assessments,
+                    writer=writer,
+                )
+                snapshots[writer] = _snapshot(out)
+
+        self.assertEqual(list(snapshots["xml"]), ["Knock-Out", "Credit Assessment"])
+        self.assertEqual(snapshots["xml"], snapshots["openpyxl"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,259 @@
+"""Watch an inbox folder for Experian PDFs and fill Knock-Out workbooks without a file picker."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from credit_analyst import assessment_to_dict
+from insert_excel_file import DEFAULT_EXCEL, _find_excel_template, fill_from_merged
+from merged_credit_report import merge_reports
+
+MANIFEST_NAME = "manifest.jsonl"
+FAILED_DIR = "failed"
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_SETTLE_SECONDS = 3.0
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class Manifest:
+    """Append-only JSONL log of every input handled; each line is fsync'd before the input moves.
+
+    A hash with a "done" record is never processed again, so a restart after a crash
+    only redoes reports whose outputs were not yet recorded.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.done: Set[str] = set()
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash mid-write
+                    if rec.get("status") == "done":
+                        self.done.add(rec["sha256"])
+
+    def append(self, record: Dict[str, Any]) -> None:
+        record = {"time": datetime.now().isoformat(timespec="seconds"), **record}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if record.get("status") == "done":
+            self.done.add(record["sha256"])
+
+
+def process_report(pdf_path: str, sha256: str, outbox: str, excel_file: str, writer: str = "xml") -> Dict[str, str]:
+    """Extract, assess and fill one report; every output lands in the outbox via an atomic rename."""
+    out_dir = Path(outbox)
+    stem = f"{Path(pdf_path).stem}_{sha256[:12]}"
+
+    merged = merge_reports(pdf_path)
+    merged_path = out_dir / f"{stem}_merged.json"
+    _atomic_write_text(merged_path, json.dumps(merged, indent=2, ensure_ascii=False))
+
+    filled_path = out_dir / f"{stem}_FILLED.xlsx"
+    tmp_xlsx = out_dir / f"{stem}.{os.getpid()}.tmp.xlsx"
+    _, assessments = fill_from_merged(merged, excel_file, output_path=str(tmp_xlsx), writer=writer, verbose=False)
+    os.replace(tmp_xlsx, filled_path)
+
+    assessment_path = out_dir / f"{stem}_assessment.json"
+    _atomic_write_text(
+        assessment_path,
+        json.dumps([assessment_to_dict(a) for a in assessments], indent=2, ensure_ascii=False),
+    )
+    return {"filled": filled_path.name, "merged": merged_path.name, "assessment": assessment_path.name}
+
+
+class InboxWatcher:
+    """Poll an inbox, hand settled PDFs to a process pool, and file inputs away once recorded.
+
+    A PDF is picked up once its size and mtime are unchanged across two polls and it is
+    at least settle_seconds old, so half-copied files are never read.
+    """
+
+    def __init__(
+        self,
+        inbox: Path,
+        outbox: Path,
+        processed: Path,
+        excel_file: str,
+        workers: Optional[int] = None,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        writer: str = "xml",
+        process: Callable[..., Dict[str, str]] = process_report,
+    ) -> None:
+        self.inbox = inbox
+        self.outbox = outbox
+        self.processed = processed
+        self.excel_file = excel_file
+        self.workers = workers or os.cpu_count() or 1
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.writer = writer
+        self.process = process
+        for d in (inbox, outbox, processed):
+            d.mkdir(parents=True, exist_ok=True)
+        self.manifest = Manifest(processed / MANIFEST_NAME)
+        self._last_seen: Dict[Path, Tuple[int, int]] = {}
+        self._in_flight: Dict[Future, Tuple[Path, str]] = {}
+        self._in_flight_hashes: Set[str] = set()
+
+    # ── Inbox scanning ─────────────────────────────────────────────
+
+    def _candidates(self) -> List[Path]:
+        return sorted(
+            p for p in self.inbox.iterdir()
+            if p.is_file() and p.suffix.lower() == ".pdf" and not p.name.startswith((".", "~$"))
+        )
+
+    def _settled(self) -> List[Path]:
+        """Files whose size/mtime held still since the last poll; updates the observations."""
+        now = time.time()
+        seen: Dict[Path, Tuple[int, int]] = {}
+        ready: List[Path] = []
+        busy = {path for path, _ in self._in_flight.values()}
+        for path in self._candidates():
+            if path in busy:
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            seen[path] = sig
+            if self._last_seen.get(path) == sig and now - st.st_mtime >= self.settle_seconds:
+                ready.append(path)
+        self._last_seen = seen
+        return ready
+
+    # ── Filing inputs away ─────────────────────────────────────────
+
+    def _file_away(self, path: Path, sha256: str, failed: bool = False) -> Path:
+        dest_dir = self.processed / FAILED_DIR if failed else self.processed
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        dest = dest_dir / f"{sha256[:12]}_{path.name}"
+        shutil.move(str(path), str(dest))
+        self._last_seen.pop(path, None)
+        return dest
+
+    def _submit(self, pool: ProcessPoolExecutor, path: Path) -> None:
+        sha256 = file_sha256(path)
+        if sha256 in self.manifest.done:
+            # Either a re-sent duplicate or a crash between the manifest write and the move.
+            self.manifest.append({"status": "duplicate", "sha256": sha256, "input": path.name})
+            self._file_away(path, sha256)
+            print(f"⏭️  {path.name}: already processed ({sha256[:12]})")
+            return
+        if sha256 in self._in_flight_hashes:
+            return  # identical copy still running; decide once that one is recorded
+        future = pool.submit(self.process, str(path), sha256, str(self.outbox), self.excel_file, self.writer)
+        self._in_flight[future] = (path, sha256)
+        self._in_flight_hashes.add(sha256)
+        print(f"📄 Queued {path.name} ({sha256[:12]})")
+
+    def _collect(self, future: Future) -> None:
+        path, sha256 = self._in_flight.pop(future)
+        self._in_flight_hashes.discard(sha256)
+        try:
+            outputs = future.result()
+        except Exception as e:
+            self.manifest.append({"status": "failed", "sha256": sha256, "input": path.name, "error": str(e)})
+            self._file_away(path, sha256, failed=True)
+            print(f"❌ {path.name}: {e}", file=sys.stderr)
+            return
+        self.manifest.append({"status": "done", "sha256": sha256, "input": path.name, "outputs": outputs})
+        self._file_away(path, sha256)
+        print(f"✅ {path.name} → {outputs.get('filled')}")
+
+    # ── Main loop ──────────────────────────────────────────────────
+
+    def poll(self, pool: ProcessPoolExecutor) -> None:
+        for future in [f for f in self._in_flight if f.done()]:
+            self._collect(future)
+        for path in self._settled():
+            self._submit(pool, path)
+
+    def run(self, once: bool = False) -> None:
+        """Watch forever, or with once=True drain what is in the inbox now and return."""
+        print(f"👀 Watching {self.inbox} with {self.workers} worker(s) → {self.outbox}")
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                while True:
+                    self.poll(pool)
+                    if once and not self._in_flight and not self._last_seen:
+                        break
+                    time.sleep(self.poll_seconds)
+            except KeyboardInterrupt:
+                # Unrecorded inputs stay in the inbox and are picked up on the next start.
+                print("\n⏹️  Stopping; waiting for running reports to finish...")
+                for future in self._in_flight:
+                    future.cancel()
+                raise
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Watch an inbox folder and fill Knock-Out workbooks for new Experian PDFs.")
+    parser.add_argument("inbox", help="Folder to watch for incoming PDFs")
+    parser.add_argument("--outbox", help="Where filled workbooks and JSON go (default: <inbox>/../outbox)")
+    parser.add_argument("--processed", help="Where handled PDFs and the manifest go (default: <inbox>/../processed)")
+    parser.add_argument("--excel", help=f"Path to {DEFAULT_EXCEL} (defaults to the bundled template)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS, help="Seconds between inbox scans")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="Minimum file age in seconds before a PDF is picked up")
+    parser.add_argument("--writer", choices=["xml", "openpyxl"], default="xml", help="Excel writer (see insert_excel_file)")
+    parser.add_argument("--once", action="store_true", help="Process the current inbox contents and exit")
+    args = parser.parse_args()
+
+    excel_file = args.excel or _find_excel_template()
+    if not excel_file or not os.path.exists(excel_file):
+        print(f"❌ Excel template not found: {excel_file or DEFAULT_EXCEL}")
+        raise SystemExit(1)
+
+    inbox = Path(args.inbox).resolve()
+    watcher = InboxWatcher(
+        inbox,
+        Path(args.outbox) if args.outbox else inbox.parent / "outbox",
+        Path(args.processed) if args.processed else inbox.parent / "processed",
+        str(Path(excel_file).resolve()),
+        workers=args.workers,
+        poll_seconds=args.poll,
+        settle_seconds=args.settle,
+        writer=args.writer,
+    )
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,970 @@
+"""Fill .xlsx templates by patching worksheet XML in place instead of an openpyxl load/save round-trip.
+
+Only the parts a fill touches are parsed and rewritten: the accessed worksheets,
+sharedStrings, styles (for new fonts/fills/borders/alignment), the workbook and
+its relationships. Drawings, images, external links and printer settings are
+streamed through unchanged.
+
+The API mirrors the subset of openpyxl the fillers use (``wb[name]``,
+``sheetnames``, ``create_sheet``, ``ws.cell``, ``ws.merge_cells``,
+``column_dimensions``, ``cell.font/fill/border/alignment``), so the same fill
+code runs against either backend. Anything outside that subset raises
+XlsxPatchError and callers fall back to openpyxl.
+"""
+
+from __future__ import annotations
+
+import copy
+import io
+import os
+import posixpath
+import re
+import shutil
+import threading
+import zipfile
+from bisect import bisect_left, insort
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree as ET
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string, range_boundaries
+from openpyxl.formula.translate import Translator
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+from openpyxl.xml.functions import tostring as _openpyxl_tostring
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+NS_XML = "http://www.w3.org/XML/1998/namespace"
+
+REL_WORKSHEET = f"{NS_REL}/worksheet"
+REL_SHARED_STRINGS = f"{NS_REL}/sharedStrings"
+REL_STYLES = f"{NS_REL}/styles"
+REL_CALC_CHAIN = f"{NS_REL}/calcChain"
+REL_OFFICE_DOCUMENT = f"{NS_REL}/officeDocument"
+
+CT_WORKSHEET = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+CT_SHARED_STRINGS = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+
+_XML_DECL = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_INT_TEXT = re.compile(r"-?\d+$")
+
+# CT_Worksheet child order — new elements must be inserted in schema position.
+_WORKSHEET_ORDER = [
+    "sheetPr", "dimension", "sheetViews", "sheetFormatPr", "cols", "sheetData",
+    "sheetCalcPr", "sheetProtection", "protectedRanges", "scenarios", "autoFilter",
+    "sortState", "dataConsolidate", "customSheetViews", "mergeCells", "phoneticPr",
+    "conditionalFormatting", "dataValidations", "hyperlinks", "printOptions",
+    "pageMargins", "pageSetup", "headerFooter", "rowBreaks", "colBreaks",
+    "customProperties", "cellWatches", "ignoredErrors", "smartTags", "drawing",
+    "legacyDrawing", "legacyDrawingHF", "drawingHF", "picture", "oleObjects",
+    "controls", "webPublishItems", "tableParts", "extLst",
+]
+_WORKBOOK_ORDER = [
+    "fileVersion", "fileSharing", "workbookPr", "workbookProtection", "bookViews",
+    "sheets", "functionGroups", "externalReferences", "definedNames", "calcPr",
+    "oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes",
+    "webPublishing", "fileRecoveryPr", "webPublishObjects", "extLst",
+]
+
+# ElementTree's prefix registry is process-global; serialise under a lock so
+# concurrent fills cannot swap the default namespace out from under each other.
+_SERIALIZE_LOCK = threading.Lock()
+
+
+class XlsxPatchError(Exception):
+    """The template uses something the XML patch writer does not handle."""
+
+
+def _q(tag: str, ns: str = NS_MAIN) -> str:
+    return f"{{{ns}}}{tag}"
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse(data: bytes) -> Tuple[ET.Element, Dict[str, str]]:
+    """Parse an XML part, keeping its namespace prefixes so they survive re-serialisation."""
+    nsmap: Dict[str, str] = {}
+    root: Optional[ET.Element] = None
+    for event, item in ET.iterparse(io.BytesIO(data), events=("start-ns", "start")):
+        if event == "start-ns":
+            nsmap.setdefault(item[0], item[1])
+        elif root is None:
+            root = item
+    if root is None:
+        raise XlsxPatchError("empty XML part")
+    return root, nsmap
+
+
+def _serialize(root: ET.Element, nsmap: Dict[str, str]) -> bytes:
+    """Serialise with the part's original prefixes (mc:Ignorable refers to them by name)."""
+    with _SERIALIZE_LOCK:
+        for prefix, uri in nsmap.items():
+            if re.match(r"ns\d+$", prefix):
+                continue
+            ET.register_namespace(prefix, uri)
+        text = ET.tostring(root, encoding="unicode")
+    end = text.index(">")
+    head = text[:end]
+    extra = "".join(
+        f' xmlns:{prefix}="{uri}"'
+        for prefix, uri in nsmap.items()
+        if prefix and f"xmlns:{prefix}=" not in head
+    )
+    return _XML_DECL + (head + extra + text[end:]).encode("utf-8")
+
+
+def _insert_ordered(parent: ET.Element, child: ET.Element, order: List[str]) -> None:
+    """Insert child after the last sibling that precedes it in the schema sequence."""
+    rank = order.index(_local(child.tag))
+    pos = 0
+    for i, existing in enumerate(list(parent)):
+        name = _local(existing.tag)
+        if name in order and order.index(name) <= rank:
+            pos = i + 1
+    parent.insert(pos, child)
+
+
+def _style_element(obj: Any) -> ET.Element:
+    """Convert an openpyxl style object to a namespaced ElementTree element."""
+    el = ET.fromstring(_openpyxl_tostring(obj.to_tree()))
+    for node in el.iter():
+        if not node.tag.startswith("{"):
+            node.tag = _q(node.tag)
+    return el
+
+
+def _resolve_target(base_dir: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+
+def _rels_path(part: str) -> str:
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+class _ColumnDimension:
+    __slots__ = ("_ws", "_index")
+
+    def __init__(self, ws: "PatchWorksheet", index: int) -> None:
+        self._ws = ws
+        self._index = index
+
+    @property
+    def width(self) -> Optional[float]:
+        col = self._ws._find_col(self._index)
+        return float(col.get("width")) if col is not None and col.get("width") else None
+
+    @width.setter
+    def width(self, value: float) -> None:
+        self._ws._set_col_width(self._index, value)
+
+
+class _ColumnDimensions:
+    def __init__(self, ws: "PatchWorksheet") -> None:
+        self._ws = ws
+
+    def __getitem__(self, letter: str) -> _ColumnDimension:
+        return _ColumnDimension(self._ws, column_index_from_string(letter))
+
+
+class PatchCell:
+    """Lightweight handle onto one cell of a PatchWorksheet."""
+
+    __slots__ = ("_ws", "row", "column")
+
+    def __init__(self, ws: "PatchWorksheet", row: int, column: int) -> None:
+        self._ws = ws
+        self.row = row
+        self.column = column
+
+    @property
+    def coordinate(self) -> str:
+        return f"{get_column_letter(self.column)}{self.row}"
+
+    @property
+    def value(self) -> Any:
+        return self._ws._get_value(self.row, self.column)
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        self._ws._set_value(self.row, self.column, value)
+
+    def _style_getter(self) -> Any:
+        raise XlsxPatchError("reading cell styles is not supported")
+
+    style = property(_style_getter, lambda self, v: self._ws._set_named_style(self.row, self.column, v))
+    font = property(_style_getter, lambda self, v: self._ws._set_style(self.row, self.column, "font", v))
+    fill = property(_style_getter, lambda self, v: self._ws._set_style(self.row, self.column, "fill", v))
+    border = property(_style_getter, lambda self, v: self._ws._set_style(self.row, self.column, "border", v))
+    alignment = property(_style_getter, lambda self, v: self._ws._set_style(self.row, self.column, "alignment", v))
+
+
+class PatchWorksheet:
+    """One worksheet part, parsed on first access and rewritten on save if modified."""
+
+    def __init__(self, wb: "PatchWorkbook", title: str, part: str,
+                 root: ET.Element, nsmap: Dict[str, str]) -> None:
+        self._wb = wb
+        self.title = title
+        self.part = part
+        self._root = root
+        self._nsmap = nsmap
+        self.dirty = False
+        self.column_dimensions = _ColumnDimensions(self)
+
+        sheet_data = root.find(_q("sheetData"))
+        if sheet_data is None:
+            sheet_data = ET.Element(_q("sheetData"))
+            _insert_ordered(root, sheet_data, _WORKSHEET_ORDER)
+        self._sheet_data = sheet_data
+        self._rows: Dict[int, ET.Element] = {}
+        self._row_nums: List[int] = []
+        self._cells: Dict[Tuple[int, int], ET.Element] = {}
+        self._shared_formulas: Dict[str, Tuple[str, str]] = {}
+        self._max_row = 0
+        self._max_col = 0
+        self._index()
+
+    @property
+    def parent(self) -> "PatchWorkbook":
+        return self._wb
+
+    # ── indexing ─────────────────────────────────────────────────────
+
+    def _index(self) -> None:
+        next_row = 1
+        for row_el in self._sheet_data.findall(_q("row")):
+            r = int(row_el.get("r") or next_row)
+            row_el.set("r", str(r))
+            next_row = r + 1
+            self._rows[r] = row_el
+            self._row_nums.append(r)
+            next_col = 1
+            for c_el in row_el.findall(_q("c")):
+                ref = c_el.get("r")
+                if ref:
+                    col = column_index_from_string(coordinate_from_string(ref)[0])
+                else:
+                    col = next_col
+                    c_el.set("r", f"{get_column_letter(col)}{r}")
+                next_col = col + 1
+                f_el = c_el.find(_q("f"))
+                if f_el is not None and f_el.get("t") == "shared" and f_el.get("ref"):
+                    self._shared_formulas[f_el.get("si")] = (c_el.get("r"), f_el.text or "")
+                self._cells[(r, col)] = c_el
+                self._touch(r, col)
+        self._row_nums.sort()
+
+    def _touch(self, row: int, col: int) -> None:
+        if row > self._max_row:
+            self._max_row = row
+        if col > self._max_col:
+            self._max_col = col
+
+    @property
+    def max_row(self) -> int:
+        return self._max_row or 1
+
+    @property
+    def max_column(self) -> int:
+        return self._max_col or 1
+
+    # ── openpyxl-compatible accessors ────────────────────────────────
+
+    def cell(self, row: int, column: int, value: Any = None) -> PatchCell:
+        if row < 1 or column < 1:
+            raise ValueError("Row or column values must be at least 1")
+        # openpyxl creates the cell on access, which extends max_row/max_column;
+        # mirror that so dimension-dependent fill logic behaves identically.
+        self._touch(row, column)
+        if value is not None:
+            self._set_value(row, column, value)
+        return PatchCell(self, row, column)
+
+    def __getitem__(self, coordinate: str) -> PatchCell:
+        col_letter, row = coordinate_from_string(coordinate)
+        return self.cell(row, column_index_from_string(col_letter))
+
+    def __setitem__(self, coordinate: str, value: Any) -> None:
+        self[coordinate].value = value
+
+    def iter_rows(self, min_row: Optional[int] = None, max_row: Optional[int] = None,
+                  min_col: Optional[int] = None, max_col: Optional[int] = None,
+                  values_only: bool = False) -> Iterator[tuple]:
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self.max_row
+        max_col = max_col or self.max_column
+        for r in range(min_row, max_row + 1):
+            cells = tuple(self.cell(r, c) for c in range(min_col, max_col + 1))
+            yield tuple(c.value for c in cells) if values_only else cells
+
+    def merge_cells(self, range_string: Optional[str] = None, start_row: Optional[int] = None,
+                    start_column: Optional[int] = None, end_row: Optional[int] = None,
+                    end_column: Optional[int] = None) -> None:
+        if range_string is None:
+            range_string = (
+                f"{get_column_letter(start_column)}{start_row}:"
+                f"{get_column_letter(end_column)}{end_row}"
+            )
+        min_col, min_row, max_col, max_row = range_boundaries(range_string)
+        merge_cells = self._root.find(_q("mergeCells"))
+        if merge_cells is None:
+            merge_cells = ET.Element(_q("mergeCells"))
+            _insert_ordered(self._root, merge_cells, _WORKSHEET_ORDER)
+        if any(m.get("ref") == range_string for m in merge_cells):
+            return
+        ET.SubElement(merge_cells, _q("mergeCell"), ref=range_string)
+        merge_cells.set("count", str(len(merge_cells)))
+        # Like openpyxl, only the top-left cell of a merged range keeps its value.
+        for r in range(min_row, max_row + 1):
+            for c in range(min_col, max_col + 1):
+                if (r, c) != (min_row, min_col) and (r, c) in self._cells:
+                    self._set_value(r, c, None)
+                self._touch(r, c)
+        self.dirty = True
+
+    # ── cell values ──────────────────────────────────────────────────
+
+    def _get_value(self, row: int, col: int) -> Any:
+        c_el = self._cells.get((row, col))
+        if c_el is None:
+            return None
+        f_el = c_el.find(_q("f"))
+        if f_el is not None:
+            shared = self._shared_formulas.get(f_el.get("si")) if f_el.get("t") == "shared" else None
+            if shared and not f_el.get("ref"):
+                origin, text = shared
+                return Translator("=" + text, origin=origin).translate_formula(c_el.get("r"))
+            return "=" + (f_el.text or "")
+        t = c_el.get("t", "n")
+        if t == "inlineStr":
+            is_el = c_el.find(_q("is"))
+            return self._wb._rich_text(is_el) if is_el is not None else None
+        v_el = c_el.find(_q("v"))
+        if v_el is None or v_el.text is None:
+            return None
+        text = v_el.text
+        if t == "s":
+            return self._wb._shared_string(int(text))
+        if t == "b":
+            return text == "1"
+        if t in ("str", "e"):
+            return text
+        number: Any = int(text) if _INT_TEXT.match(text) else float(text)
+        if self._wb._is_date_style(int(c_el.get("s", "0"))):
+            return from_excel(number, self._wb._epoch)
+        return number
+
+    def _get_or_create(self, row: int, col: int) -> ET.Element:
+        c_el = self._cells.get((row, col))
+        if c_el is not None:
+            return c_el
+        row_el = self._rows.get(row)
+        if row_el is None:
+            row_el = ET.Element(_q("row"), r=str(row))
+            pos = bisect_left(self._row_nums, row)
+            self._sheet_data.insert(pos, row_el)
+            insort(self._row_nums, row)
+            self._rows[row] = row_el
+        c_el = ET.Element(_q("c"), r=f"{get_column_letter(col)}{row}")
+        pos = 0
+        for i, existing in enumerate(list(row_el)):
+            if existing.tag != _q("c"):
+                continue
+            if column_index_from_string(coordinate_from_string(existing.get("r"))[0]) < col:
+                pos = i + 1
+        row_el.insert(pos, c_el)
+        # spans is an optional hint; drop it rather than keep a stale range.
+        row_el.attrib.pop("spans", None)
+        self._cells[(row, col)] = c_el
+        self._touch(row, col)
+        return c_el
+
+    def _unshare_formula(self, master: ET.Element, f_el: ET.Element) -> None:
+        """Give every dependent of a shared-formula master its own explicit formula.
+
+        Dependents only carry ``<f t="shared" si=..>`` and are computed from the
+        master's text, so overwriting the master would otherwise orphan them.
+        """
+        si = f_el.get("si")
+        origin = master.get("r")
+        min_col, min_row, max_col, max_row = range_boundaries(f_el.get("ref"))
+        translator = Translator("=" + (f_el.text or ""), origin=origin)
+        for r in range(min_row, max_row + 1):
+            for c in range(min_col, max_col + 1):
+                c_el = self._cells.get((r, c))
+                if c_el is None or c_el is master:
+                    continue
+                dep = c_el.find(_q("f"))
+                if dep is None or dep.get("t") != "shared" or dep.get("si") != si:
+                    continue
+                dep.attrib.clear()
+                dep.text = translator.translate_formula(c_el.get("r"))[1:]
+        self._shared_formulas.pop(si, None)
+
+    def _set_value(self, row: int, col: int, value: Any) -> None:
+        c_el = self._get_or_create(row, col)
+        f_el = c_el.find(_q("f"))
+        if f_el is not None and f_el.get("t") == "shared" and f_el.get("ref"):
+            self._unshare_formula(c_el, f_el)
+        for tag in ("f", "v", "is"):
+            for child in c_el.findall(_q(tag)):
+                c_el.remove(child)
+        c_el.attrib.pop("t", None)
+        self.dirty = True
+        if value is None or value == "":
+            return
+        if isinstance(value, bool):
+            c_el.set("t", "b")
+            self._set_v(c_el, "1" if value else "0")
+        elif isinstance(value, int):
+            self._set_v(c_el, str(value))
+        elif isinstance(value, float):
+            self._set_v(c_el, repr(value))
+        elif isinstance(value, str):
+            if _ILLEGAL_XML_CHARS.search(value):
+                raise XlsxPatchError(f"illegal XML character in {value!r}")
+            if value.startswith("=") and len(value) > 1:
+                f_el = ET.Element(_q("f"))
+                f_el.text = value[1:]
+                c_el.insert(0, f_el)
+            else:
+                c_el.set("t", "s")
+                self._set_v(c_el, str(self._wb._add_shared_string(value)))
+        elif isinstance(value, (datetime, date, time, timedelta)):
+            raise XlsxPatchError("writing date/time values is not supported")
+        else:
+            raise XlsxPatchError(f"unsupported cell value type {type(value).__name__}")
+
+    @staticmethod
+    def _set_v(c_el: ET.Element, text: str) -> None:
+        v_el = ET.Element(_q("v"))
+        v_el.text = text
+        c_el.insert(0, v_el)
+
+    # ── styles / layout ──────────────────────────────────────────────
+
+    def _set_style(self, row: int, col: int, kind: str, obj: Any) -> None:
+        c_el = self._get_or_create(row, col)
+        base = int(c_el.get("s", "0"))
+        c_el.set("s", str(self._wb._derive_xf(base, kind, obj)))
+        self.dirty = True
+
+    def _set_named_style(self, row: int, col: int, name: str) -> None:
+        c_el = self._get_or_create(row, col)
+        c_el.set("s", str(self._wb._named_xf(name)))
+        self.dirty = True
+
+    def _cols(self, create: bool) -> Optional[ET.Element]:
+        cols = self._root.find(_q("cols"))
+        if cols is None and create:
+            cols = ET.Element(_q("cols"))
+            _insert_ordered(self._root, cols, _WORKSHEET_ORDER)
+        return cols
+
+    def _find_col(self, index: int) -> Optional[ET.Element]:
+        cols = self._cols(create=False)
+        if cols is None:
+            return None
+        for col in cols:
+            if int(col.get("min")) <= index <= int(col.get("max")):
+                return col
+        return None
+
+    def _set_col_width(self, index: int, width: float) -> None:
+        cols = self._cols(create=True)
+        children = list(cols)
+        for pos, col in enumerate(children):
+            lo, hi = int(col.get("min")), int(col.get("max"))
+            if not lo <= index <= hi:
+                continue
+            # Split a shared <col min..max> range so only this column changes.
+            cols.remove(col)
+            pieces = []
+            if lo < index:
+                left = copy.deepcopy(col)
+                left.set("max", str(index - 1))
+                pieces.append(left)
+            own = copy.deepcopy(col)
+            own.set("min", str(index))
+            own.set("max", str(index))
+            own.set("width", repr(float(width)))
+            own.set("customWidth", "1")
+            pieces.append(own)
+            if index < hi:
+                right = copy.deepcopy(col)
+                right.set("min", str(index + 1))
+                pieces.append(right)
+            for offset, piece in enumerate(pieces):
+                cols.insert(pos + offset, piece)
+            break
+        else:
+            new = ET.Element(_q("col"), min=str(index), max=str(index),
+                             width=repr(float(width)), customWidth="1")
+            pos = sum(1 for col in children if int(col.get("min")) < index)
+            cols.insert(pos, new)
+        self.dirty = True
+
+    def to_xml(self) -> bytes:
+        dimension = self._root.find(_q("dimension"))
+        if dimension is None:
+            dimension = ET.Element(_q("dimension"))
+            _insert_ordered(self._root, dimension, _WORKSHEET_ORDER)
+        if self._cells:
+            rows = [r for r, _ in self._cells]
+            cols = [c for _, c in self._cells]
+            dimension.set(
+                "ref",
+                f"{get_column_letter(min(cols))}{min(rows)}:{get_column_letter(max(cols))}{max(rows)}",
+            )
+        else:
+            dimension.set("ref", "A1")
+        return _serialize(self._root, self._nsmap)
+
+
+class PatchWorkbook:
+    """An .xlsx package opened for in-place XML patching."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        try:
+            self._zip = zipfile.ZipFile(path)
+        except (zipfile.BadZipFile, OSError) as e:
+            raise XlsxPatchError(f"cannot open {path} as a zip package: {e}") from e
+        self._names = set(self._zip.namelist())
+        self._parts: Dict[str, bytes] = {}
+        self._deleted: set[str] = set()
+
+        self._ct_root, self._ct_ns = self._load("[Content_Types].xml")
+        root_rels, _ = self._load("_rels/.rels")
+        wb_part = next(
+            (_resolve_target("", rel.get("Target"))
+             for rel in root_rels if rel.get("Type") == REL_OFFICE_DOCUMENT),
+            None,
+        )
+        if not wb_part:
+            raise XlsxPatchError("package has no workbook part")
+        self._wb_part = wb_part
+        self._wb_dir = posixpath.dirname(wb_part)
+        self._wb_root, self._wb_ns = self._load(wb_part)
+        self._rels_part = _rels_path(wb_part)
+        self._rels_root, self._rels_ns = self._load(self._rels_part)
+
+        pr = self._wb_root.find(_q("workbookPr"))
+        self._epoch = CALENDAR_MAC_1904 if pr is not None and pr.get("date1904") in ("1", "true") else CALENDAR_WINDOWS_1900
+
+        targets = {rel.get("Id"): rel for rel in self._rels_root}
+        self._sheet_entries: List[Tuple[str, ET.Element, Optional[str]]] = []
+        for sheet in self._sheets_el():
+            rel = targets.get(sheet.get(_q("id", NS_REL)))
+            part = None
+            if rel is not None and rel.get("Type") == REL_WORKSHEET:
+                part = _resolve_target(self._wb_dir, rel.get("Target"))
+            self._sheet_entries.append((sheet.get("name"), sheet, part))
+        self._sheets: Dict[str, PatchWorksheet] = {}
+
+        self._strings: Optional[List[str]] = None
+        self._string_index: Dict[str, int] = {}
+        self._sst_root: Optional[ET.Element] = None
+        self._sst_ns: Dict[str, str] = {}
+        self._sst_part: Optional[str] = None
+        self._sst_dirty = False
+
+        self._styles_root: Optional[ET.Element] = None
+        self._styles_ns: Dict[str, str] = {}
+        self._styles_part: Optional[str] = None
+        self._styles_dirty = False
+        self._component_ids: Dict[Tuple[str, Any], int] = {}
+        self._xf_cache: Dict[Tuple[int, str, Any], int] = {}
+        self._named_xfs: Dict[str, int] = {}
+        self._date_styles: Dict[int, bool] = {}
+
+        self._rels_dirty = False
+        self._ct_dirty = False
+
+    # ── package helpers ──────────────────────────────────────────────
+
+    def _read(self, name: str) -> bytes:
+        if name not in self._names:
+            raise XlsxPatchError(f"missing part {name}")
+        return self._zip.read(name)
+
+    def _load(self, name: str) -> Tuple[ET.Element, Dict[str, str]]:
+        try:
+            return _parse(self._read(name))
+        except ET.ParseError as e:
+            raise XlsxPatchError(f"cannot parse {name}: {e}") from e
+
+    def _sheets_el(self) -> ET.Element:
+        sheets = self._wb_root.find(_q("sheets"))
+        if sheets is None:
+            raise XlsxPatchError("workbook has no <sheets>")
+        return sheets
+
+    def _rel_target(self, rel_type: str) -> Optional[str]:
+        for rel in self._rels_root:
+            if rel.get("Type") == rel_type:
+                return _resolve_target(self._wb_dir, rel.get("Target"))
+        return None
+
+    def _next_rel_id(self) -> str:
+        used = {rel.get("Id") for rel in self._rels_root}
+        n = 1
+        while f"rId{n}" in used:
+            n += 1
+        return f"rId{n}"
+
+    def _add_override(self, part: str, content_type: str) -> None:
+        ET.SubElement(self._ct_root, _q("Override", NS_CT),
+                      PartName=f"/{part}", ContentType=content_type)
+        self._ct_dirty = True
+
+    def _remove_part(self, part: str) -> None:
+        self._deleted.add(part)
+        for override in list(self._ct_root):
+            if override.get("PartName") == f"/{part}":
+                self._ct_root.remove(override)
+                self._ct_dirty = True
+
+    # ── openpyxl-compatible workbook API ─────────────────────────────
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return [name for name, _, _ in self._sheet_entries]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sheetnames
+
+    def __getitem__(self, name: str) -> PatchWorksheet:
+        if name in self._sheets:
+            return self._sheets[name]
+        for title, _, part in self._sheet_entries:
+            if title != name:
+                continue
+            if part is None:
+                raise XlsxPatchError(f"sheet '{name}' is not a worksheet")
+            root, ns = self._load(part)
+            ws = PatchWorksheet(self, title, part, root, ns)
+            self._sheets[name] = ws
+            return ws
+        raise KeyError(f"Worksheet {name} does not exist.")
+
+    def create_sheet(self, title: str) -> PatchWorksheet:
+        if title in self.sheetnames:
+            raise XlsxPatchError(f"sheet '{title}' already exists")
+        existing = self._names | {ws.part for ws in self._sheets.values()}
+        n = 1
+        while posixpath.join(self._wb_dir, f"worksheets/sheet{n}.xml") in existing:
+            n += 1
+        part = posixpath.join(self._wb_dir, f"worksheets/sheet{n}.xml")
+        rel_id = self._next_rel_id()
+        ET.SubElement(self._rels_root, _q("Relationship", NS_PKG_REL),
+                      Id=rel_id, Type=REL_WORKSHEET, Target=f"worksheets/sheet{n}.xml")
+        self._rels_dirty = True
+        self._add_override(part, CT_WORKSHEET)
+
+        sheets = self._sheets_el()
+        sheet_id = max((int(s.get("sheetId", "0")) for s in sheets), default=0) + 1
+        sheet_el = ET.SubElement(sheets, _q("sheet"), name=title, sheetId=str(sheet_id))
+        sheet_el.set(_q("id", NS_REL), rel_id)
+        self._sheet_entries.append((title, sheet_el, part))
+
+        root = ET.Element(_q("worksheet"))
+        ET.SubElement(root, _q("sheetData"))
+        ws = PatchWorksheet(self, title, part, root, {"": NS_MAIN, "r": NS_REL})
+        ws.dirty = True
+        self._sheets[title] = ws
+        return ws
+
+    def __delitem__(self, name: str) -> None:
+        for pos, (title, sheet_el, part) in enumerate(self._sheet_entries):
+            if title != name:
+                continue
+            if part is None:
+                raise XlsxPatchError(f"sheet '{name}' is not a worksheet")
+            self._sheets_el().remove(sheet_el)
+            del self._sheet_entries[pos]
+            self._sheets.pop(name, None)
+            rel_id = sheet_el.get(_q("id", NS_REL))
+            for rel in list(self._rels_root):
+                if rel.get("Id") == rel_id:
+                    self._rels_root.remove(rel)
+            self._rels_dirty = True
+            self._remove_part(part)
+            self._deleted.add(_rels_path(part))
+            self._reindex_local_sheet_ids(pos)
+            return
+        raise KeyError(f"Worksheet {name} does not exist.")
+
+    def _reindex_local_sheet_ids(self, removed: int) -> None:
+        defined = self._wb_root.find(_q("definedNames"))
+        if defined is not None:
+            for dn in list(defined):
+                local = dn.get("localSheetId")
+                if local is None:
+                    continue
+                if int(local) == removed:
+                    defined.remove(dn)
+                elif int(local) > removed:
+                    dn.set("localSheetId", str(int(local) - 1))
+        count = len(self._sheet_entries)
+        for view in self._wb_root.iter(_q("workbookView")):
+            for attr in ("activeTab", "firstSheet"):
+                if int(view.get(attr, "0")) >= count:
+                    view.set(attr, str(max(count - 1, 0)))
+
+    def close(self) -> None:
+        self._zip.close()
+
+    # ── shared strings ───────────────────────────────────────────────
+
+    def _rich_text(self, el: ET.Element) -> str:
+        t = el.find(_q("t"))
+        if t is not None:
+            return t.text or ""
+        return "".join(
+            (run.findtext(_q("t")) or "") for run in el.findall(_q("r"))
+        )
+
+    def _load_strings(self) -> None:
+        if self._strings is not None:
+            return
+        self._sst_part = self._rel_target(REL_SHARED_STRINGS)
+        if self._sst_part and self._sst_part in self._names:
+            self._sst_root, self._sst_ns = self._load(self._sst_part)
+        else:
+            self._sst_root = ET.Element(_q("sst"))
+            self._sst_ns = {"": NS_MAIN}
+        self._strings = []
+        for i, si in enumerate(self._sst_root.findall(_q("si"))):
+            text = self._rich_text(si)
+            self._strings.append(text)
+            if si.find(_q("t")) is not None:
+                self._string_index.setdefault(text, i)
+
+    def _shared_string(self, index: int) -> str:
+        self._load_strings()
+        return self._strings[index]
+
+    def _add_shared_string(self, text: str) -> int:
+        self._load_strings()
+        index = self._string_index.get(text)
+        if index is not None:
+            return index
+        si = ET.SubElement(self._sst_root, _q("si"))
+        t = ET.SubElement(si, _q("t"))
+        t.text = text
+        if text != text.strip() or "\n" in text:
+            t.set(f"{{{NS_XML}}}space", "preserve")
+        index = len(self._strings)
+        self._strings.append(text)
+        self._string_index[text] = index
+        self._sst_dirty = True
+        return index
+
+    # ── styles ───────────────────────────────────────────────────────
+
+    def _load_styles(self) -> ET.Element:
+        if self._styles_root is None:
+            self._styles_part = self._rel_target(REL_STYLES)
+            if not self._styles_part:
+                raise XlsxPatchError("workbook has no styles part")
+            self._styles_root, self._styles_ns = self._load(self._styles_part)
+        return self._styles_root
+
+    def _collection(self, tag: str) -> ET.Element:
+        el = self._load_styles().find(_q(tag))
+        if el is None:
+            raise XlsxPatchError(f"styles part has no <{tag}>")
+        return el
+
+    def _is_date_style(self, style_id: int) -> bool:
+        cached = self._date_styles.get(style_id)
+        if cached is not None:
+            return cached
+        xfs = list(self._collection("cellXfs"))
+        result = False
+        if style_id < len(xfs):
+            fmt_id = int(xfs[style_id].get("numFmtId", "0"))
+            code = BUILTIN_FORMATS.get(fmt_id)
+            num_fmts = self._load_styles().find(_q("numFmts"))
+            if num_fmts is not None:
+                for nf in num_fmts:
+                    if int(nf.get("numFmtId")) == fmt_id:
+                        code = nf.get("formatCode")
+            result = bool(code) and is_date_format(code)
+        self._date_styles[style_id] = result
+        return result
+
+    def _component_id(self, kind: str, obj: Any) -> int:
+        key = (kind, obj)
+        index = self._component_ids.get(key)
+        if index is None:
+            container = self._collection(f"{kind}s")
+            container.append(_style_element(obj))
+            index = len(container) - 1
+            container.set("count", str(len(container)))
+            self._component_ids[key] = index
+            self._styles_dirty = True
+        return index
+
+    def _derive_xf(self, base: int, kind: str, obj: Any) -> int:
+        """Return the cellXfs index of `base` with one style component replaced."""
+        key = (base, kind, obj)
+        cached = self._xf_cache.get(key)
+        if cached is not None:
+            return cached
+        xfs = self._collection("cellXfs")
+        children = list(xfs)
+        if base >= len(children):
+            raise XlsxPatchError(f"cell style index {base} out of range")
+        xf = copy.deepcopy(children[base])
+        if kind == "alignment":
+            for old in xf.findall(_q("alignment")):
+                xf.remove(old)
+            xf.insert(0, _style_element(obj))
+            xf.set("applyAlignment", "1")
+        else:
+            xf.set(f"{kind}Id", str(self._component_id(kind, obj)))
+            xf.set(f"apply{kind.capitalize()}", "1")
+        xfs.append(xf)
+        xfs.set("count", str(len(xfs)))
+        index = len(xfs) - 1
+        self._xf_cache[key] = index
+        self._date_styles.pop(index, None)
+        self._styles_dirty = True
+        return index
+
+    @property
+    def named_styles(self) -> List[str]:
+        cell_styles = self._load_styles().find(_q("cellStyles"))
+        return [cs.get("name") for cs in cell_styles] if cell_styles is not None else []
+
+    def add_named_style(self, style: Any) -> None:
+        """Register an openpyxl NamedStyle (cellStyleXfs + cellStyles entry)."""
+        if style.name in self.named_styles:
+            raise ValueError(f"Style {style.name} exists already")
+        if style.number_format not in (None, "General"):
+            raise XlsxPatchError("named styles with number formats are not supported")
+        attrs = {
+            "numFmtId": "0",
+            "fontId": str(self._component_id("font", style.font)),
+            "fillId": str(self._component_id("fill", style.fill)),
+            "borderId": str(self._component_id("border", style.border)),
+        }
+        style_xfs = self._collection("cellStyleXfs")
+        style_xf = ET.SubElement(style_xfs, _q("xf"), attrs)
+        style_xf.append(_style_element(style.alignment))
+        style_xfs.set("count", str(len(style_xfs)))
+        xf_id = len(style_xfs) - 1
+
+        cell_styles = self._collection("cellStyles")
+        ET.SubElement(cell_styles, _q("cellStyle"), name=style.name, xfId=str(xf_id))
+        cell_styles.set("count", str(len(cell_styles)))
+        self._styles_dirty = True
+
+    def _named_xf(self, name: str) -> int:
+        """cellXfs index of a cell formatted purely with the named style `name`."""
+        index = self._named_xfs.get(name)
+        if index is not None:
+            return index
+        cell_styles = self._collection("cellStyles")
+        entry = next((cs for cs in cell_styles if cs.get("name") == name), None)
+        if entry is None:
+            raise ValueError(f"{name} is not a known style")
+        xf_id = int(entry.get("xfId", "0"))
+        style_xf = list(self._collection("cellStyleXfs"))[xf_id]
+        xf = copy.deepcopy(style_xf)
+        xf.set("xfId", str(xf_id))
+        for kind in ("Font", "Fill", "Border", "Alignment"):
+            xf.set(f"apply{kind}", "1")
+        xfs = self._collection("cellXfs")
+        xfs.append(xf)
+        xfs.set("count", str(len(xfs)))
+        index = len(xfs) - 1
+        self._named_xfs[name] = index
+        self._styles_dirty = True
+        return index
+
+    # ── save ─────────────────────────────────────────────────────────
+
+    def _finalize(self) -> Dict[str, bytes]:
+        out: Dict[str, bytes] = {}
+
+        calc_chain = self._rel_target(REL_CALC_CHAIN)
+        if calc_chain:
+            # Cell edits invalidate the cached calc chain; Excel rebuilds it on load.
+            for rel in list(self._rels_root):
+                if rel.get("Type") == REL_CALC_CHAIN:
+                    self._rels_root.remove(rel)
+            self._rels_dirty = True
+            self._remove_part(calc_chain)
+
+        calc_pr = self._wb_root.find(_q("calcPr"))
+        if calc_pr is None:
+            calc_pr = ET.Element(_q("calcPr"))
+            _insert_ordered(self._wb_root, calc_pr, _WORKBOOK_ORDER)
+        calc_pr.set("fullCalcOnLoad", "1")
+        out[self._wb_part] = _serialize(self._wb_root, self._wb_ns)
+
+        for ws in self._sheets.values():
+            if ws.dirty:
+                out[ws.part] = ws.to_xml()
+
+        if self._sst_dirty:
+            self._sst_root.attrib.pop("count", None)
+            self._sst_root.set("uniqueCount", str(len(self._strings)))
+            if not self._sst_part:
+                self._sst_part = posixpath.join(self._wb_dir, "sharedStrings.xml")
+                ET.SubElement(self._rels_root, _q("Relationship", NS_PKG_REL),
+                              Id=self._next_rel_id(), Type=REL_SHARED_STRINGS,
+                              Target="sharedStrings.xml")
+                self._rels_dirty = True
+                self._add_override(self._sst_part, CT_SHARED_STRINGS)
+            out[self._sst_part] = _serialize(self._sst_root, self._sst_ns)
+
+        if self._styles_dirty:
+            out[self._styles_part] = _serialize(self._styles_root, self._styles_ns)
+        if self._rels_dirty:
+            out[self._rels_part] = _serialize(self._rels_root, self._rels_ns)
+        if self._ct_dirty:
+            out["[Content_Types].xml"] = _serialize(self._ct_root, self._ct_ns)
+        return out
+
+    def save(self, path: str) -> None:
+        """Write the patched package to `path` (atomically, via a temp file in the same folder)."""
+        patched = self._finalize()
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as out:
+                for info in self._zip.infolist():
+                    name = info.filename
+                    if name in self._deleted:
+                        continue
+                    if name in patched:
+                        out.writestr(name, patched.pop(name))
+                        continue
+                    with self._zip.open(info) as src, out.open(info, "w") as dst:
+                        shutil.copyfileobj(src, dst, 1 << 16)
+                for name, data in patched.items():
+                    out.writestr(name, data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+def load_workbook(path: str) -> PatchWorkbook:
+    """Open an .xlsx template for XML patching (raises XlsxPatchError if unsupported)."""
+    return PatchWorkbook(path)